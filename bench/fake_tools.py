@@ -0,0 +1,108 @@
+"""
+模拟的 ping / tracert 可执行程序：按录制的输出（bench/fixtures）回放，可配置延迟，不发出任何网络报文。
+
+install(directory) 在 directory 中生成名为 ping、tracert、traceroute 的可执行包装脚本，
+把 directory 放到 PATH 最前面后，功能类调用的系统命令就会由本脚本代替。
+
+环境变量：
+    FAKE_PING_DELAY       每个回复之间的间隔（秒），默认 0
+    FAKE_PING_RTT         回复中的延迟数值（毫秒），默认 1
+    FAKE_PING_DEAD_EVERY  地址最后一段能被该值整除时视为不通，默认 0（全部可达）
+    FAKE_TRACE_DELAY      每一跳之间的间隔（秒），默认 0
+
+说明：Windows 的 CreateProcess 只会在 PATH 中查找 .exe，.bat 包装无法代替 ping.exe，
+因此回放 ping / tracert 的场景只在 Linux / macOS 上运行。
+"""
+import os
+import re
+import stat
+import sys
+import time
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+TOOLS = ("ping", "tracert", "traceroute")
+
+# 带参数值的选项（Windows 与 Linux 的 ping / traceroute）
+_VALUE_FLAGS = {"-n", "-c", "-w", "-W", "-S", "-I", "-h", "-m", "-l", "-i", "-s"}
+
+
+def install(directory: str) -> str:
+    """在 directory 中生成包装脚本并返回该目录"""
+    os.makedirs(directory, exist_ok=True)
+    script = os.path.abspath(__file__)
+    for tool in TOOLS:
+        path = os.path.join(directory, tool)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" {tool} "$@"\n')
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return directory
+
+
+def _parse_args(args):
+    """返回 (目标, 次数)；次数为 None 表示持续运行（ping -t 或 Linux 不带 -c）"""
+    host, count = None, None
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ("-n", "-c") and i + 1 < len(args):
+            count = int(args[i + 1])
+        if arg in _VALUE_FLAGS:
+            i += 2
+            continue
+        if not arg.startswith("-") and host is None:
+            host = arg
+        i += 1
+    return host, count
+
+
+def _load(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def _emit(line):
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+
+def fake_ping(args):
+    host, count = _parse_args(args)
+    lines = _load("ping_zh.txt")
+    recorded = re.search(r"Ping (\S+)", "\n".join(lines)).group(1)
+    header = [line for line in lines[:2] if line]
+    reply = next(line for line in lines if "TTL=" in line)
+    timeout = next(line for line in lines if "超时" in line)
+    footer = lines[lines.index(next(line for line in lines if "统计" in line)) - 1:]
+
+    delay = float(os.environ.get("FAKE_PING_DELAY", "0"))
+    rtt = os.environ.get("FAKE_PING_RTT", "1")
+    dead_every = int(os.environ.get("FAKE_PING_DEAD_EVERY", "0"))
+    last = host.rsplit(".", 1)[-1] if host else ""
+    dead = dead_every > 0 and last.isdigit() and int(last) % dead_every == 0
+
+    reply = re.sub(r"(时间)[=<]\d+ms", rf"\g<1>={rtt}ms", reply.replace(recorded, host))
+    for line in header:
+        _emit(line.replace(recorded, host))
+    sent = 0
+    while count is None or sent < count:
+        if delay:
+            time.sleep(delay)
+        _emit(timeout if dead else reply)
+        sent += 1
+    for line in footer:
+        _emit(line.replace(recorded, host))
+    return 0 if not dead else 1
+
+
+def fake_tracert(args):
+    delay = float(os.environ.get("FAKE_TRACE_DELAY", "0"))
+    for line in _load("tracert_zh.txt"):
+        if delay and line.strip()[:1].isdigit():
+            time.sleep(delay)
+        _emit(line)
+    return 0
+
+
+if __name__ == "__main__":
+    tool, rest = sys.argv[1], sys.argv[2:]
+    sys.exit(fake_ping(rest) if tool == "ping" else fake_tracert(rest))
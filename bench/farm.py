@@ -0,0 +1,225 @@
+import selectors
+import socket
+import threading
+import time
+from typing import List
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class LoopbackFarm:
+    """
+    LoopbackFarm: 本机回环地址上的一组模拟端口，供基准测试使用，不需要任何外部网络。
+
+        - open:       正常监听并立即 accept 的端口（握手完成 → 开放）
+        - closed:     没有监听的端口（收到 RST → 关闭）
+        - blackholed: 监听但从不 accept、且 backlog 已被占满的端口，
+                      后续 SYN 被内核丢弃（→ 超时 / 被过滤，Linux 上有效）
+        - slow:       监听但每 slow_delay 秒才 accept 一个连接的端口
+
+    用法：
+        with LoopbackFarm(open_ports=50, closed_ports=50, blackholed_ports=10) as farm:
+            farm.open / farm.closed / farm.blackholed / farm.slow   # 端口号列表
+            farm.ports()                                           # 全部端口
+    """
+
+    def __init__(self, open_ports: int = 50, closed_ports: int = 50, blackholed_ports: int = 10,
+                 slow_ports: int = 0, slow_delay: float = 0.2, host: str = "127.0.0.1"):
+        self.host = host
+        self.slow_delay = slow_delay
+        self.open: List[int] = []
+        self.closed: List[int] = []
+        self.blackholed: List[int] = []
+        self.slow: List[int] = []
+
+        self._listeners: List[socket.socket] = []
+        self._fillers: List[socket.socket] = []
+        self._stop = threading.Event()
+        self._sel = selectors.DefaultSelector()
+        self._threads: List[threading.Thread] = []
+        self._counts = (open_ports, closed_ports, blackholed_ports, slow_ports)
+
+    def _listen(self, backlog: int) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, 0))
+        sock.listen(backlog)
+        self._listeners.append(sock)
+        return sock
+
+    def start(self):
+        n_open, n_closed, n_black, n_slow = self._counts
+
+        for _ in range(n_open):
+            sock = self._listen(128)
+            sock.setblocking(False)
+            self._sel.register(sock, selectors.EVENT_READ)
+            self.open.append(sock.getsockname()[1])
+
+        # 绑定后立即关闭得到当前未被占用的端口，连接时收到 RST
+        for _ in range(n_closed):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.bind((self.host, 0))
+            self.closed.append(sock.getsockname()[1])
+            sock.close()
+
+        for _ in range(n_black):
+            sock = self._listen(0)
+            port = sock.getsockname()[1]
+            # 占满 accept 队列，之后的 SYN 会被丢弃
+            for _ in range(4):
+                filler = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                filler.setblocking(False)
+                filler.connect_ex((self.host, port))
+                self._fillers.append(filler)
+            self.blackholed.append(port)
+
+        slow_socks = []
+        for _ in range(n_slow):
+            sock = self._listen(128)
+            slow_socks.append(sock)
+            self.slow.append(sock.getsockname()[1])
+
+        self._threads.append(threading.Thread(target=self._accept_loop, daemon=True))
+        for sock in slow_socks:
+            self._threads.append(threading.Thread(target=self._slow_accept_loop, args=(sock,), daemon=True))
+        for thread in self._threads:
+            thread.start()
+        # 等待占位连接进入队列
+        time.sleep(0.05)
+        return self
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            for key, _ in self._sel.select(timeout=0.1):
+                try:
+                    conn, _ = key.fileobj.accept()
+                    conn.close()
+                except OSError:
+                    pass
+
+    def _slow_accept_loop(self, sock: socket.socket):
+        sock.settimeout(0.1)
+        while not self._stop.is_set():
+            try:
+                conn, _ = sock.accept()
+                conn.close()
+            except OSError:
+                continue
+            self._stop.wait(self.slow_delay)
+
+    def ports(self) -> List[int]:
+        return self.open + self.closed + self.blackholed + self.slow
+
+    def close(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        for sock in self._fillers + self._listeners:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._sel.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ServiceFarm:
+    """
+    ServiceFarm: 本机回环地址上的一组模拟服务，供服务识别（banner）测试使用。
+
+        - ssh:    连接后立即发送 SSH 标识
+        - http:   读到请求后返回带 Server 头的 HTTP 响应
+        - redis:  对 PING 返回 +PONG，对其它命令返回 -ERR（与真实 Redis 一致）
+        - silent: 接受连接但从不发送任何数据（测试识别期限）
+
+    用法：
+        with ServiceFarm(ssh=5, http=5, redis=5, silent=2) as farm:
+            farm.ports["ssh"]      # 端口号列表
+            farm.all_ports()
+    """
+
+    _GREETINGS = {"ssh": b"SSH-2.0-OpenSSH_9.6 stand-in\r\n"}
+
+    def __init__(self, host: str = "127.0.0.1", **counts: int):
+        self.host = host
+        self._counts = counts
+        self.ports = {service: [] for service in counts}
+        self._listeners: List[socket.socket] = []
+        self._conns: List[socket.socket] = []
+        self._stop = threading.Event()
+        self._sel = selectors.DefaultSelector()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def start(self):
+        for service, count in self._counts.items():
+            for _ in range(count):
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                sock.bind((self.host, 0))
+                sock.listen(128)
+                sock.setblocking(False)
+                self._sel.register(sock, selectors.EVENT_READ, ("listen", service))
+                self._listeners.append(sock)
+                self.ports[service].append(sock.getsockname()[1])
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        while not self._stop.is_set():
+            for key, _ in self._sel.select(timeout=0.1):
+                role, service = key.data
+                try:
+                    if role == "listen":
+                        self._accept(key.fileobj, service)
+                    else:
+                        self._respond(key.fileobj, service)
+                except OSError:
+                    pass
+
+    def _accept(self, sock: socket.socket, service: str):
+        conn, _ = sock.accept()
+        self._conns.append(conn)
+        if service == "silent":
+            return
+        greeting = self._GREETINGS.get(service)
+        if greeting:
+            conn.sendall(greeting)
+        conn.setblocking(False)
+        self._sel.register(conn, selectors.EVENT_READ, ("conn", service))
+
+    def _respond(self, conn: socket.socket, service: str):
+        self._sel.unregister(conn)
+        request = conn.recv(1024)
+        if service == "http":
+            conn.sendall(b"HTTP/1.0 200 OK\r\nServer: stand-in/1.0\r\nContent-Length: 0\r\n\r\n")
+        elif service == "redis":
+            conn.sendall(b"+PONG\r\n" if b"PING" in request.upper() else b"-ERR unknown command\r\n")
+        self._conns.remove(conn)
+        conn.close()
+
+    def all_ports(self) -> List[int]:
+        return [port for ports in self.ports.values() for port in ports]
+
+    def close(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=1)
+        for sock in self._conns + self._listeners:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._sel.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,668 @@
+"""
+可复现的基准测试：全部使用本机模拟目标（LoopbackFarm + 回放的 ping / tracert），不需要网络。
+
+    python -m bench.run                          # 运行全部场景，结果写入 bench_results.json
+    python -m bench.run scan_async ping_stream   # 只运行指定场景
+    python -m bench.run --out new.json --compare old.json   # 与之前版本的结果对比
+
+每个场景在独立子进程中运行，互不影响峰值内存与线程数。每个场景报告：
+    probes / elapsed_s / probes_per_sec   探测数量、耗时与吞吐
+    p50_ms / p99_ms                       单次探测耗时分位数
+    peak_rss_mb / peak_threads            子进程峰值内存与线程数
+    tk_events                             结果框控件调用次数（insert / see / delete）+ 进度标签更新次数
+    pipe_flushes / pipe_items             OutputPipe 实际刷新次数与合并的写入条数
+    stop_ms / within_bound                stop_latency 场景：各任务从 stop 到 done 事件的毫秒数，是否都在 STOP_BOUND_MS 内
+
+界面输出走真实的 OutputPipe / BoundedLogView，只把 Tk 控件换成计数用的替身，
+主线程按 50ms 节拍调用 flush()，与 Tk 主循环的节奏一致。
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from bench import fake_tools                     # noqa: E402
+from bench.farm import LoopbackFarm, ServiceFarm  # noqa: E402
+from core.Function.events import EVENT_DONE, EventSink  # noqa: E402
+from core.Function.icmp_engine import IcmpPinger  # noqa: E402
+from core.Function.ipconfig_parser import parse_ipconfig  # noqa: E402
+from core.Function.ping_fun import PingFun       # noqa: E402
+from core.Function.rate_budget import RateBudget  # noqa: E402
+from core.Function.resolver import Resolver, system_lookup  # noqa: E402
+from core.Function.telnet_fun import PortScanner  # noqa: E402
+from core.Function.trace_engine import SimulatedTopology  # noqa: E402
+from core.Function.tracert_fun import TracertFun  # noqa: E402
+from core.ui.log_view import BoundedLogView      # noqa: E402
+from core.ui.output_pipe import OutputPipe       # noqa: E402
+
+_POSIX = os.name == "posix"
+
+
+# -------------------------
+# Tk 替身与资源采样
+# -------------------------
+class _StubBox:
+    """计数用的 ScrolledText 替身：只记录调用次数，不保存文本"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def after(self, ms, func):
+        pass  # 节拍由 _Harness.pump() 驱动
+
+    def insert(self, index, text):
+        self.calls += 1
+
+    def see(self, index):
+        self.calls += 1
+
+    def delete(self, first, last=None):
+        self.calls += 1
+
+
+class _StubVar:
+    def __init__(self):
+        self.sets = 0
+
+    def set(self, value):
+        self.sets += 1
+
+
+def _peak_rss_mb():
+    if _POSIX:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = Counters()
+        counters.cb = ctypes.sizeof(Counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb)
+        return round(counters.PeakWorkingSetSize / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+def _quantile(values: List[float], q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+
+class _Harness:
+    """一个场景的运行环境：替身结果框 + OutputPipe + 事件收集 + 线程数采样"""
+
+    def __init__(self, bounded: bool = False):
+        self.box = _StubBox()
+        self.progress = _StubVar()
+        self.events: List[Dict] = []
+        self._log_dir = None
+        view = None
+        if bounded:
+            self._log_dir = tempfile.mkdtemp(prefix="bench-log-")
+            view = BoundedLogView(self.box, os.path.join(self._log_dir, "output.log"), max_lines=2000)
+        self.view = view
+        self.pipe = OutputPipe(self.box, progress_var=self.progress, view=view, on_event=self.events.append)
+        self.peak_threads = threading.active_count()
+        self._sampling = True
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+
+    def _sample(self):
+        while self._sampling:
+            # 不计采样线程本身
+            self.peak_threads = max(self.peak_threads, threading.active_count() - 1)
+            time.sleep(0.005)
+
+    def pump(self, timeout: float = 120.0):
+        """模拟 Tk 主循环：每 50ms 刷新一次输出管道，直到收到 done 事件"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.pipe.interval / 1000)
+            self.pipe.flush()
+            if self.events and self.events[-1]["type"] == EVENT_DONE:
+                return
+        raise TimeoutError("场景运行超时")
+
+    def result(self, probes: int, elapsed: float, latencies: List[float]) -> Dict:
+        self._sampling = False
+        self._sampler.join()
+        if self.view is not None:
+            self.view.close()
+        return {
+            "probes": probes,
+            "elapsed_s": round(elapsed, 4),
+            "probes_per_sec": round(probes / elapsed, 1) if elapsed > 0 else None,
+            "p50_ms": _quantile(latencies, 0.5),
+            "p99_ms": _quantile(latencies, 0.99),
+            "peak_rss_mb": _peak_rss_mb(),
+            "peak_threads": self.peak_threads,
+            "tk_events": self.box.calls + self.progress.sets,
+            "pipe_flushes": self.pipe.flushes,
+            "pipe_items": self.pipe.items,
+        }
+
+
+# -------------------------
+# 场景
+# -------------------------
+def _scan(engine: str, targets: str, ports: str, farm_sizes=None, budget=None, resolver=None) -> Dict:
+    farm = LoopbackFarm(*farm_sizes).start() if farm_sizes else None
+    try:
+        if farm is not None:
+            ports = ",".join(str(p) for p in farm.ports())
+        harness = _Harness()
+        scanner = PortScanner(harness.pipe, engine=engine, budget=budget, resolver=resolver)
+        begin = time.perf_counter()
+        if not scanner.start_sweep_scan(targets, ports):
+            raise RuntimeError("扫描未能启动")
+        harness.pump()
+        elapsed = time.perf_counter() - begin
+        latencies = [e["elapsed_ms"] for e in harness.events if e["type"] == "port" and e["elapsed_ms"] is not None]
+        return harness.result(len(latencies), elapsed, latencies)
+    finally:
+        if farm is not None:
+            farm.close()
+
+
+def scan_async():
+    """async 引擎扫描模拟端口：500 开放 + 500 关闭 + 20 黑洞"""
+    return _scan("async", "127.0.0.1", "", (500, 500, 20))
+
+
+def scan_thread():
+    """thread 引擎扫描模拟端口：500 开放 + 500 关闭 + 20 黑洞"""
+    return _scan("thread", "127.0.0.1", "", (500, 500, 20))
+
+
+def scan_async_bulk():
+    """async 引擎扫描 127.0.0.1 的 1-20000 端口（大部分关闭）"""
+    return _scan("async", "127.0.0.1", "1-20000")
+
+
+def scan_thread_bulk():
+    """thread 引擎扫描 127.0.0.1 的 1-20000 端口（大部分关闭）"""
+    return _scan("thread", "127.0.0.1", "1-20000")
+
+
+def scan_async_limited():
+    """async 引擎扫描 127.0.0.1 的 1-10000 端口，发包预算 2000/s、每网段在途 100：probes_per_sec 应接近 2000"""
+    budget = RateBudget(rate=2000, subnet_inflight=100)
+    result = _scan("async", "127.0.0.1", "1-10000", budget=budget)
+    result["budget"] = budget.snapshot()
+    return result
+
+
+def scan_hostname():
+    """async 引擎按主机名扫描 localhost 的 1-20000 端口：lookups 为实际的解析次数（应为 1，而不是每个端口一次）"""
+    lookups = []
+
+    def counting(host, family):
+        lookups.append(host)
+        return system_lookup(host, family)
+
+    resolver = Resolver(lookup=counting)
+    result = _scan("async", "localhost", "1-20000", resolver=resolver)
+    result["lookups"] = len(lookups)
+    result["resolver"] = resolver.stats()
+    return result
+
+
+def scan_banner():
+    """async 引擎扫描并识别服务：300 开放 + 300 关闭 + 模拟 ssh / http / redis 各 20 个 + 10 个不发言的服务"""
+    with LoopbackFarm(300, 300, 0) as farm, ServiceFarm(ssh=20, http=20, redis=20, silent=10) as services:
+        ports = ",".join(str(p) for p in farm.ports() + services.all_ports())
+        harness = _Harness()
+        scanner = PortScanner(harness.pipe, engine="async", fingerprint=True)
+        begin = time.perf_counter()
+        if not scanner.start_sweep_scan("127.0.0.1", ports):
+            raise RuntimeError("扫描未能启动")
+        harness.pump()
+        elapsed = time.perf_counter() - begin
+        ports_events = [e for e in harness.events if e["type"] == "port"]
+        latencies = [e["elapsed_ms"] for e in ports_events if e["elapsed_ms"] is not None]
+        result = harness.result(len(ports_events), elapsed, latencies)
+        result["identified"] = sum(1 for e in ports_events if e.get("service"))
+        return result
+
+
+def interactive_during_sweep():
+    """thread 引擎扫描 250 个黑洞端口（占满批量线程）期间，逐个执行 50 次单端口测试：p99 为单次测试的耗时"""
+    with LoopbackFarm(5, 0, 250) as farm:
+        harness = _Harness()
+        scanner = PortScanner(harness.pipe, engine="thread")
+        if not scanner.start_list_scan("127.0.0.1", farm.blackholed, timeout=1.0, max_workers=250):
+            raise RuntimeError("扫描未能启动")
+        time.sleep(0.2)
+        latencies = []
+        begin = time.perf_counter()
+        for index in range(50):
+            start = time.perf_counter()
+            scanner.test_connect("127.0.0.1", farm.open[index % len(farm.open)]).result()
+            latencies.append((time.perf_counter() - start) * 1000)
+        elapsed = time.perf_counter() - begin
+        busy = scanner.scheduler.stats()["bulk_running"]
+        harness.pump()
+        result = harness.result(len(latencies), elapsed, latencies)
+        result["bulk_running"] = busy
+        return result
+
+
+def batch_ping_native():
+    """进程内 ICMP 引擎批量 Ping 127.0.0.1-127.0.3.254"""
+    if not IcmpPinger.available():
+        return {"skipped": "ICMP 套接字不可用"}
+    harness = _Harness()
+    pinger = PingFun(harness.pipe)
+    begin = time.perf_counter()
+    pinger.start_batch_ping("127.0.0.1-127.0.3.254")
+    harness.pump()
+    elapsed = time.perf_counter() - begin
+    pings = [e for e in harness.events if e["type"] == "ping"]
+    return harness.result(len(pings), elapsed, [e["rtt_ms"] for e in pings if e["rtt_ms"] is not None])
+
+
+def batch_ping_names():
+    """
+    同 batch_ping_native，并对存活地址反查主机名（替身 PTR 查询，每次 5ms）：
+    sweep_s 为探测阶段的耗时（应与 batch_ping_native 的 elapsed_s 相当，elapsed_s 另含结束时等待主机名的时间），
+    names 为查到的主机名数，lookups 为实际查询次数
+    """
+    if not IcmpPinger.available():
+        return {"skipped": "ICMP 套接字不可用"}
+    lookups = []
+
+    def reverse(address):
+        lookups.append(address)
+        time.sleep(0.005)
+        return f"host-{address.replace('.', '-')}.bench"
+
+    harness = _Harness()
+    pinger = PingFun(harness.pipe, resolver=Resolver(reverse_lookup=reverse), reverse_dns=True)
+    sweep = []
+    native = pinger._native_batch_ping
+
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        native(*args, **kwargs)
+        sweep.append(time.perf_counter() - start)
+
+    pinger._native_batch_ping = timed
+    begin = time.perf_counter()
+    pinger.start_batch_ping("127.0.0.1-127.0.3.254")
+    harness.pump()
+    elapsed = time.perf_counter() - begin
+    pings = [e for e in harness.events if e["type"] == "ping"]
+    result = harness.result(len(pings), elapsed, [e["rtt_ms"] for e in pings if e["rtt_ms"] is not None])
+    result["sweep_s"] = round(sweep[0], 4)
+    result["names"] = len(harness.events[-1]["names"])
+    result["lookups"] = len(lookups)
+    return result
+
+
+def batch_ping_subprocess():
+    """ping 子进程方式批量 Ping 200 个地址（回放的 ping，每 7 个一个不通）"""
+    if not _POSIX:
+        return {"skipped": "回放 ping 只支持 Linux / macOS"}
+    os.environ["FAKE_PING_DEAD_EVERY"] = "7"
+    harness = _Harness()
+    pinger = PingFun(harness.pipe)
+    pinger.use_native = False
+
+    durations = []
+    ping_one = pinger._ping_one_ip
+
+    def timed(ip, local_ip=None):
+        begin = time.perf_counter()
+        try:
+            return ping_one(ip, local_ip)
+        finally:
+            durations.append((time.perf_counter() - begin) * 1000)
+
+    pinger._ping_one_ip = timed
+    begin = time.perf_counter()
+    pinger.start_batch_ping("10.0.0.1-200")
+    harness.pump()
+    elapsed = time.perf_counter() - begin
+    pings = [e for e in harness.events if e["type"] == "ping"]
+    return harness.result(len(pings), elapsed, durations)
+
+
+def ping_stream():
+    """持续 Ping 输出 20000 行（回放的 ping，无延迟），经 BoundedLogView 显示"""
+    if not _POSIX:
+        return {"skipped": "回放 ping 只支持 Linux / macOS"}
+    harness = _Harness(bounded=True)
+    pinger = PingFun(harness.pipe)
+    begin = time.perf_counter()
+    pinger.strat_ping("10.0.0.1", count=20000)
+    harness.pump()
+    elapsed = time.perf_counter() - begin
+    replies = [e["rtt_ms"] for e in harness.events if e["type"] == "reply"]
+    return harness.result(len(replies), elapsed, replies)
+
+
+def tracert():
+    """路由追踪（系统命令方式，回放的 tracert，每跳间隔 20ms）"""
+    if not _POSIX:
+        return {"skipped": "回放 tracert 只支持 Linux / macOS"}
+    os.environ["FAKE_TRACE_DELAY"] = "0.02"
+    harness = _Harness(bounded=True)
+    tracer = TracertFun(harness.pipe)
+    tracer.use_native = False
+    begin = time.perf_counter()
+    tracer.start_tracert("202.89.233.100")
+    harness.pump()
+    elapsed = time.perf_counter() - begin
+    hops = [e for e in harness.events if e["type"] == "hop"]
+    return harness.result(len(hops), elapsed, [max(e["rtts_ms"]) for e in hops if e["rtts_ms"]])
+
+
+def tracert_parallel():
+    """并行路由追踪（模拟的 12 跳路径，其中 3 跳不回应，目标往返 30ms）"""
+    hops = [(None if ttl in (3, 7, 8) else f"10.0.{ttl}.1", 0.002 * ttl) for ttl in range(1, 13)]
+    harness = _Harness(bounded=True)
+    tracer = TracertFun(harness.pipe, transport=SimulatedTopology(hops, dest_rtt=0.03))
+    begin = time.perf_counter()
+    tracer.start_tracert("192.0.2.10")
+    harness.pump()
+    elapsed = time.perf_counter() - begin
+    hops = [e for e in harness.events if e["type"] == "hop"]
+    return harness.result(len(hops), elapsed, [max(e["rtts_ms"]) for e in hops if e["rtts_ms"]])
+
+
+def tracert_multi():
+    """多目标路由追踪 50 个目标（共用 5 跳主干，5 条分支，每个目标独有最后两跳）"""
+    trunk = [(f"10.0.{ttl}.1", 0.001 * ttl) for ttl in range(1, 6)]
+    routes = {}
+    for index in range(50):
+        branch = index % 5
+        path = trunk + [(f"172.16.{branch}.1", 0.007), (None, 0), (f"172.17.{branch}.{index % 10}", 0.009),
+                        (f"192.168.{index}.1", 0.01)]
+        routes[f"198.51.100.{index}"] = (path, 0.012)
+    harness = _Harness(bounded=True)
+    tracer = TracertFun(harness.pipe, transport=SimulatedTopology([], routes=routes))
+    begin = time.perf_counter()
+    tracer.start_multi_tracert("198.51.100.0-49")
+    harness.pump()
+    elapsed = time.perf_counter() - begin
+    done = harness.events[-1]
+    result = harness.result(done["probes"], elapsed, [])
+    result["targets"] = len(routes)
+    result["cached_hops"] = done["cached_hops"]
+    return result
+
+
+def mtr():
+    """持续逐跳监测 100 轮（模拟的 12 跳路径，第 3 跳不回应，2% 随机丢包，间隔 10ms）"""
+    hops = [(None if ttl == 3 else f"10.0.{ttl}.1", 0.0005 * ttl) for ttl in range(1, 13)]
+    harness = _Harness(bounded=True)
+    tracer = TracertFun(harness.pipe, transport=SimulatedTopology(hops, dest_rtt=0.008, loss=0.02))
+    begin = time.perf_counter()
+    tracer.start_mtr("192.0.2.10", interval=0.01, rounds=100)
+    harness.pump()
+    elapsed = time.perf_counter() - begin
+    done = harness.events[-1]
+    result = harness.result(sum(row["sent"] for row in done["hops"]), elapsed,
+                            [row["avg"] for row in done["hops"] if row["avg"] is not None])
+    result["rounds"] = done["rounds"]
+    return result
+
+
+# 停止延迟的上限（毫秒）：stop_latency 场景中任一任务超过该值即视为不达标
+STOP_BOUND_MS = 100
+
+
+def _stop_latency(start, stop, settle: float = 0.3) -> float:
+    """
+    启动任务，运行 settle 秒后调用 stop，返回从 stop 到 done 事件的毫秒数。
+    使用 EventSink（事件在生产线程中立即回调并记录时间），不经 OutputPipe 的 50ms 刷新节拍。
+    """
+    finished = threading.Event()
+    stamp = []
+
+    def on_event(event):
+        if event["type"] == EVENT_DONE:
+            stamp.append(time.perf_counter())
+            finished.set()
+
+    start(EventSink(on_event))
+    time.sleep(settle)
+    if finished.is_set():
+        raise RuntimeError("任务在停止前已经结束")
+    begin = time.perf_counter()
+    stop()
+    if not finished.wait(30):
+        raise TimeoutError("停止后未结束")
+    return round((stamp[0] - begin) * 1000, 3)
+
+
+def stop_latency():
+    """
+    各类任务运行 0.3 秒后停止，测量 stop 到 done 事件的耗时（毫秒），均应在 STOP_BOUND_MS 内：
+    黑洞端口的 async / thread 扫描、识别不发言服务的扫描、ping / tracert 子进程、ICMP 批量 Ping、持续监测
+    """
+    jobs = {}
+
+    def scan(engine, fingerprint=False):
+        def run(pipe):
+            nonlocal scanner
+            scanner = PortScanner(pipe, engine=engine, fingerprint=fingerprint)
+            ports = farm.blackholed if not fingerprint else services.all_ports()
+            if not scanner.start_list_scan("127.0.0.1", ports, timeout=5.0, max_workers=200):
+                raise RuntimeError("扫描未能启动")
+        scanner = None
+        return run, lambda: scanner.stop_scan()
+
+    with LoopbackFarm(0, 0, 200) as farm, ServiceFarm(silent=50) as services:
+        for name, engine, fingerprint in (("scan_async", "async", False), ("scan_thread", "thread", False),
+                                          ("scan_banner", "async", True)):
+            jobs[name] = _stop_latency(*scan(engine, fingerprint))
+
+    def pinger(batch, targets, native=False):
+        holder = {}
+
+        def run(pipe):
+            holder["ping"] = ping = PingFun(pipe)
+            ping.use_native = native
+            if batch:
+                ping.start_batch_ping(targets)
+            else:
+                ping.strat_ping(targets)
+        return run, lambda: holder["ping"].stop_batch_ping() if batch else holder["ping"].stop_ping()
+
+    def tracer(start, **kwargs):
+        holder = {}
+
+        def run(pipe):
+            holder["tracer"] = t = TracertFun(pipe, **kwargs)
+            t.use_native = bool(kwargs)
+            start(t)
+        return run, lambda: holder["tracer"].stop_tracert()
+
+    if IcmpPinger.available():
+        jobs["batch_ping_native"] = _stop_latency(*pinger(True, "192.0.2.0/24", native=True))
+    slow_hops = [(f"10.0.{ttl}.1", 0.3 * ttl) for ttl in range(1, 13)]
+    jobs["mtr"] = _stop_latency(*tracer(lambda t: t.start_mtr("192.0.2.10", interval=1.0),
+                                        transport=SimulatedTopology(slow_hops, dest_rtt=4.0)))
+    if _POSIX:
+        os.environ["FAKE_PING_DELAY"] = "1.5"
+        os.environ["FAKE_TRACE_DELAY"] = "1.5"
+        jobs["batch_ping_subprocess"] = _stop_latency(*pinger(True, "10.0.0.1-100"))
+        jobs["ping_stream"] = _stop_latency(*pinger(False, "10.0.0.1"))
+        jobs["tracert_subprocess"] = _stop_latency(*tracer(lambda t: t.start_tracert("202.89.233.100")))
+
+    latencies = list(jobs.values())
+    result = _Harness().result(len(latencies), sum(latencies) / 1000, latencies)
+    result["stop_ms"] = jobs
+    result["bound_ms"] = STOP_BOUND_MS
+    result["within_bound"] = max(latencies) <= STOP_BOUND_MS
+    return result
+
+
+def ipconfig_parse():
+    """解析 ipconfig /all：中英文录制输出的网卡段落各重复到约 64 个网卡（大量 Hyper-V / VPN / Docker 虚拟网卡的机器），各解析 100 次"""
+    latencies = []
+    adapters = 0
+    begin = time.perf_counter()
+    for name in ("ipconfig_zh.txt", "ipconfig_en.txt"):
+        with open(os.path.join(fake_tools.FIXTURES, name), encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        # 第一个顶格且以冒号结尾的行之前是全局段落
+        first = next(i for i, line in enumerate(lines) if line[:1].strip() and line.rstrip().endswith(":"))
+        globals_part, blocks = "\n".join(lines[:first]), "\n".join(lines[first:])
+        per_copy = len(parse_ipconfig(blocks))
+        copies = 64 // per_copy
+        # 每份的网卡名加上编号，避免完全相同
+        large = globals_part + "\n" + "\n\n".join(
+            blocks.replace(" adapter ", f" adapter {i}-").replace("适配器 ", f"适配器 {i}-") for i in range(copies))
+        for _ in range(100):
+            start = time.perf_counter()
+            parsed = parse_ipconfig(large)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if len(parsed) != per_copy * copies:
+                raise AssertionError(f"{name}: 解析出 {len(parsed)} 个网卡，应为 {per_copy * copies}")
+            adapters += len(parsed)
+    elapsed = time.perf_counter() - begin
+    return _Harness().result(adapters, elapsed, latencies)
+
+
+def output_pipe():
+    """界面输出路径：4 个线程共写入 200000 行"""
+    harness = _Harness()
+    pipe = harness.pipe
+    lines, writers = 200000, 4
+
+    def writer(index):
+        for i in range(lines // writers):
+            pipe.write(f"10.0.{index}.{i % 256}:80 ✅ 开放\n")
+
+    begin = time.perf_counter()
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pipe.emit(EVENT_DONE, task="output_pipe")
+    harness.pump()
+    elapsed = time.perf_counter() - begin
+    return harness.result(lines, elapsed, [])
+
+
+SCENARIOS = {func.__name__: func for func in (
+    scan_async, scan_thread, scan_async_bulk, scan_thread_bulk, scan_async_limited, scan_hostname, scan_banner,
+    interactive_during_sweep, stop_latency,
+    batch_ping_native, batch_ping_names, batch_ping_subprocess, ping_stream, tracert, tracert_parallel, tracert_multi, mtr,
+    ipconfig_parse, output_pipe,
+)}
+
+
+# -------------------------
+# 运行与对比
+# -------------------------
+def _run_child(name: str) -> Dict:
+    """在当前进程中运行一个场景（由父进程以 --child 调用）"""
+    if _POSIX:
+        tools = fake_tools.install(tempfile.mkdtemp(prefix="bench-tools-"))
+        os.environ["PATH"] = tools + os.pathsep + os.environ.get("PATH", "")
+    return SCENARIOS[name]()
+
+
+def _run_isolated(name: str) -> Dict:
+    proc = subprocess.run([sys.executable, "-m", "bench.run", "--child", name],
+                          cwd=ROOT, capture_output=True, text=True, encoding="utf-8")
+    if proc.returncode != 0:
+        return {"error": (proc.stderr or proc.stdout).strip().splitlines()[-1:]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _print_table(results: Dict, previous: Dict = None):
+    header = f"{'场景':<24}{'探测/秒':>12}{'p99(ms)':>10}{'峰值内存MB':>12}{'线程':>6}{'Tk事件':>8}"
+    if previous:
+        header += f"{'吞吐变化':>10}"
+    print(header)
+    for name, r in results.items():
+        if "probes_per_sec" not in r:
+            print(f"{name:<24}{r.get('skipped') or r.get('error')}")
+            continue
+        line = (f"{name:<24}{r['probes_per_sec'] or 0:>12.1f}{r['p99_ms'] if r['p99_ms'] is not None else '-':>10}"
+                f"{r['peak_rss_mb'] if r['peak_rss_mb'] is not None else '-':>12}{r['peak_threads']:>6}{r['tk_events']:>8}")
+        old = (previous or {}).get(name, {})
+        if old.get("probes_per_sec") and r["probes_per_sec"]:
+            line += f"{(r['probes_per_sec'] / old['probes_per_sec'] - 1) * 100:>+9.1f}%"
+        print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.run", description="Network-tools 基准测试")
+    parser.add_argument("scenarios", nargs="*", help=f"场景名，默认全部：{', '.join(SCENARIOS)}")
+    parser.add_argument("--out", default=os.path.join(ROOT, "bench_results.json"), help="结果 JSON 文件")
+    parser.add_argument("--compare", default=None, help="与之前的结果 JSON 对比吞吐")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_run_child(args.child), ensure_ascii=False))
+        return 0
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"未知场景: {', '.join(unknown)}")
+
+    results = {}
+    for name in names:
+        print(f"运行 {name} ...", file=sys.stderr)
+        results[name] = _run_isolated(name)
+
+    report = {
+        "revision": _git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f).get("results", {})
+    _print_table(results, previous)
+    print(f"\n结果已写入 {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+import errno
+import selectors
+import socket
+import sys
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Optional, Tuple
+
+from core.Function.rate_budget import RateBudget
+from core.Function.rtt import AdaptivePacer
+
+
+# 端口探测结果
+PORT_OPEN = "open"          # 握手完成
+PORT_CLOSED = "closed"      # 收到 RST 或其它错误（主机不可达等）
+PORT_TIMEOUT = "timeout"    # 超时未响应，通常是被防火墙过滤
+
+# connect_ex 返回这些错误码表示连接仍在进行中
+_IN_PROGRESS = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, 10035}  # 10035 = WSAEWOULDBLOCK
+# 超时检查的最长间隔（秒）
+_TICK = 0.01
+
+# 连接被拒绝（收到 RST），其耗时可作为 RTT 样本
+_REFUSED = {errno.ECONNREFUSED, 10061}  # 10061 = WSAECONNREFUSED
+
+
+def is_rtt_sample(err: int) -> bool:
+    """握手完成或收到 RST 的耗时才是有效的 RTT 样本"""
+    return err == 0 or err in _REFUSED
+
+
+def _fd_limit(default: int = 4096) -> int:
+    """返回当前进程可用的文件描述符上限（Windows 上 select() 最多 512 个句柄）"""
+    if sys.platform.startswith("win"):
+        return 512
+    try:
+        import resource
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft == resource.RLIM_INFINITY:
+            return default
+        return int(soft)
+    except Exception:
+        return default
+
+
+class AsyncConnectEngine:
+    """
+    AsyncConnectEngine: 基于 selectors + 非阻塞 connect_ex 的 TCP 端口扫描引擎。
+
+    与 ThreadPoolExecutor 每个线程阻塞一个 connect 不同，这里在单个线程内
+    同时保持成千上万个 connect 在途，由操作系统通知握手完成/被拒绝。
+    在途连接按目标主机分组、按发起时间排队，每个节拍用该主机"当前"的超时
+    检查队首，因此 RTT 估计一旦收敛，已经在途的探测也会按新超时提前结束。
+
+    构造：
+        engine = AsyncConnectEngine(concurrency=2000)
+
+    方法：
+        run(targets, timeout, on_result, should_stop=None, pacer=None)
+            - targets: 可迭代的 (ip, port)，按需惰性读取，不会一次性展开
+            - timeout: 固定超时（秒），传入 pacer 时忽略
+            - on_result(ip, port, state, elapsed)：每个端口完成时在调用线程中回调，
+              state 为 PORT_OPEN / PORT_CLOSED / PORT_TIMEOUT
+            - should_stop(): 返回 True 后一个节拍（_TICK）内返回：不再发起新的连接，
+              在途连接直接关闭且不再回调（断点续扫时重新探测）
+            - pacer: AdaptivePacer，按目标 RTT 自适应超时，并在超时突增时收缩并发窗口
+            - on_open(ip, port, sock, elapsed)：传入时开放端口的连接不关闭，改为调用 on_open
+              转交连接（所有权归回调方，用于读取 banner），此时不再为该端口调用 on_result
+            - budget: RateBudget，每个连接发起前取令牌、完成后归还；预算不足时暂缓发起，
+              已在途的连接照常处理
+            - 阻塞直到所有目标完成或被停止，应在后台线程中调用
+    """
+
+    def __init__(self, concurrency: int = 2000):
+        # 保留一部分描述符给日志、GUI 等其它用途，避免 EMFILE
+        self.concurrency = max(1, min(int(concurrency), _fd_limit() - 12))
+
+    def run(self, targets: Iterable[Tuple[str, int]], timeout: float,
+            on_result: Callable[[str, int, str, float], None],
+            should_stop: Optional[Callable[[], bool]] = None,
+            pacer: Optional[AdaptivePacer] = None,
+            on_open: Optional[Callable[[str, int, socket.socket, float], None]] = None,
+            budget: Optional[RateBudget] = None):
+        target_iter = iter(targets)
+        sel = selectors.DefaultSelector()
+        # 主机 -> [(发起时间, sock)]，按发起时间有序；已完成的条目惰性删除
+        inflight: Dict[str, Deque[Tuple[float, socket.socket]]] = {}
+        exhausted = False
+        next_check = 0.0
+        # 预算不足时暂缓的目标与可以重试的时间
+        held: Optional[Tuple[str, int]] = None
+        held_until = 0.0
+
+        def finish(ip, port, err, elapsed):
+            if budget is not None:
+                budget.release(ip)
+            if err is None:
+                state = PORT_TIMEOUT
+            else:
+                state = PORT_OPEN if err == 0 else PORT_CLOSED
+            if pacer is not None:
+                pacer.record(ip, elapsed if err is not None and is_rtt_sample(err) else None, err is None)
+            on_result(ip, port, state, elapsed)
+
+        try:
+            while True:
+                if should_stop and should_stop():
+                    # 在途连接在 finally 中关闭并归还预算
+                    break
+                # 1. 补齐在途连接数（有 pacer 时受其窗口限制）
+                limit = self.concurrency if pacer is None else max(1, min(self.concurrency, pacer.window))
+                while not exhausted and len(sel.get_map()) < limit:
+                    if should_stop and should_stop():
+                        break
+                    if held is not None:
+                        if time.perf_counter() < held_until:
+                            break
+                        (ip, port), held = held, None
+                    else:
+                        try:
+                            ip, port = next(target_iter)
+                        except StopIteration:
+                            exhausted = True
+                            break
+                    if budget is not None:
+                        wait = budget.try_acquire(ip)
+                        if wait > 0:
+                            held, held_until = (ip, port), time.perf_counter() + wait
+                            break
+                    begin = time.perf_counter()
+                    sock, err = self._connect(ip, port)
+                    if sock is None:
+                        finish(ip, port, err, time.perf_counter() - begin)
+                        continue
+                    sel.register(sock, selectors.EVENT_WRITE, (ip, port, begin))
+                    queue = inflight.get(ip)
+                    if queue is None:
+                        queue = inflight[ip] = deque()
+                    queue.append((begin, sock))
+
+                if not sel.get_map():
+                    if exhausted:
+                        break
+                    if held is not None:
+                        time.sleep(max(0.0, min(held_until - time.perf_counter(), _TICK)))
+                    continue
+
+                # 2. 等待握手结果，最多等一个节拍（有暂缓的目标时到可重试为止）
+                wake = next_check if held is None else min(next_check, held_until)
+                for key, _ in sel.select(max(0.0, wake - time.perf_counter())):
+                    sock = key.fileobj
+                    ip, port, begin = key.data
+                    err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    sel.unregister(sock)
+                    if err == 0 and on_open is not None:
+                        elapsed = time.perf_counter() - begin
+                        if pacer is not None:
+                            pacer.record(ip, elapsed, False)
+                        if budget is not None:
+                            budget.release(ip)
+                        # 转交描述符：原 sock 对象变为已关闭（fileno() < 0），超时检查据此惰性删除
+                        on_open(ip, port, socket.socket(sock.family, sock.type, fileno=sock.detach()), elapsed)
+                        continue
+                    sock.close()
+                    finish(ip, port, err, time.perf_counter() - begin)
+
+                # 3. 每个节拍按各主机当前的超时处理超时连接
+                now = time.perf_counter()
+                if now < next_check:
+                    continue
+                next_check = now + _TICK
+                for host in list(inflight):
+                    queue = inflight[host]
+                    limit_at = now - (timeout if pacer is None else pacer.timeout_for(host))
+                    while queue and (queue[0][1].fileno() < 0 or queue[0][0] <= limit_at):
+                        begin, sock = queue.popleft()
+                        if sock.fileno() < 0:
+                            continue  # 已完成并关闭
+                        ip, port, _ = sel.get_key(sock).data
+                        sel.unregister(sock)
+                        sock.close()
+                        finish(ip, port, None, now - begin)
+                    if not queue:
+                        del inflight[host]
+        finally:
+            for key in list(sel.get_map().values()):
+                key.fileobj.close()
+                if budget is not None:
+                    budget.release(key.data[0])
+            sel.close()
+
+    @staticmethod
+    def _connect(ip: str, port: int):
+        """
+        发起非阻塞连接。
+        返回 (sock, None) 表示连接进行中；返回 (None, err) 表示已立即得到结果（err == 0 为开放）。
+        """
+        family = socket.AF_INET6 if ":" in ip else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        try:
+            err = sock.connect_ex((ip, port))
+        except OSError as e:
+            # 例如主机名无法解析
+            err = e.errno or -1
+        if err in _IN_PROGRESS:
+            return sock, None
+        sock.close()
+        return None, err
@@ -0,0 +1,244 @@
+import socket
+import ssl
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from core.Function.cancel import CancelToken, Cancelled, connect, shutdown_socket
+from core.Function.scheduler import Job, Scheduler, shared_scheduler
+
+import logging
+logger = logging.getLogger(__name__)
+
+# 主动探测报文
+_PROBE_HTTP = b"HEAD / HTTP/1.0\r\nUser-Agent: Network-tools\r\n\r\n"
+_PROBE_REDIS = b"*1\r\n$4\r\nPING\r\n"
+_PROBE_SSH = b"SSH-2.0-Network-tools\r\n"
+_PROBES = {"http": _PROBE_HTTP, "redis": _PROBE_REDIS, "ssh": _PROBE_SSH}
+
+# 端口 -> 首选探测方式；未收录的端口先被动等待欢迎信息，没有再发 HTTP HEAD
+_PORT_HINTS = {
+    22: "ssh", 2222: "ssh",
+    6379: "redis",
+    443: "tls", 8443: "tls", 465: "tls", 636: "tls", 993: "tls", 995: "tls", 5986: "tls",
+}
+# 被动等待欢迎信息的时间占总期限的比例（SSH / FTP / SMTP 等服务连接后立即发送）
+_PASSIVE_SHARE = 0.4
+# 读取的最大字节数与显示的 banner 最大长度
+_READ_LIMIT = 1024
+_BANNER_LIMIT = 120
+
+# 识别结果：(服务名, banner 摘要)；服务名为 None 表示没有任何响应
+Fingerprint = Tuple[Optional[str], str]
+
+
+def _banner_text(data: bytes) -> str:
+    """取第一行可打印文本作为 banner 摘要"""
+    line = data.split(b"\n", 1)[0].rstrip(b"\r")
+    text = line.decode("utf-8", errors="replace")
+    text = "".join(ch if ch.isprintable() else "." for ch in text)
+    return text[:_BANNER_LIMIT]
+
+
+def _http_banner(data: bytes) -> str:
+    """HTTP 响应：状态行 + Server 头"""
+    lines = data.split(b"\r\n")
+    banner = _banner_text(lines[0])
+    for line in lines[1:]:
+        if not line:
+            break
+        if line[:7].lower() == b"server:":
+            banner += f"; Server: {_banner_text(line[7:].strip())}"
+            break
+    return banner[:_BANNER_LIMIT]
+
+
+def classify(data: bytes, port: int = 0) -> Fingerprint:
+    """根据服务返回的数据识别协议，返回 (服务名, banner 摘要)"""
+    if not data:
+        return None, ""
+    if data.startswith(b"SSH-"):
+        return "ssh", _banner_text(data)
+    if data.startswith(b"HTTP/"):
+        return "http", _http_banner(data)
+    if data.startswith((b"+PONG", b"-NOAUTH", b"-DENIED")):
+        return "redis", _banner_text(data)
+    if data[:1] in (b"\x15", b"\x16") and data[1:2] == b"\x03":
+        # 对明文探测回应了 TLS 告警 / 握手记录
+        return "tls", ""
+    if data.startswith(b"220"):
+        lower = data.lower()
+        service = "ftp" if b"ftp" in lower or port == 21 else "smtp"
+        return service, _banner_text(data)
+    if data.startswith(b"+OK"):
+        return "pop3", _banner_text(data)
+    if data.startswith(b"* OK"):
+        return "imap", _banner_text(data)
+    if len(data) > 5 and data[4] == 0x0a and data[3] == 0:
+        # MySQL 握手包：3 字节长度 + 序号 0 + 协议版本 10 + 以 NUL 结尾的版本号
+        return "mysql", _banner_text(data[5:].split(b"\0", 1)[0])
+    if data.startswith(b"-ERR"):
+        return "redis", _banner_text(data)
+    return "unknown", _banner_text(data)
+
+
+def _recv(sock: socket.socket, deadline: float) -> bytes:
+    """在 deadline（perf_counter 时间）之前读取一段数据；超时或对端关闭返回已读到的内容"""
+    remaining = deadline - time.perf_counter()
+    if remaining <= 0:
+        return b""
+    sock.settimeout(remaining)
+    try:
+        return sock.recv(_READ_LIMIT)
+    except (socket.timeout, OSError):
+        return b""
+
+
+def _tls_probe(sock: socket.socket, deadline: float, token: Optional[CancelToken]) -> Fingerprint:
+    """发送 TLS ClientHello 完成握手，再在加密通道上发送 HTTP HEAD 判断是否为 HTTPS"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    sock.settimeout(max(0.01, deadline - time.perf_counter()))
+    # wrap_socket 接管 sock 的描述符（之后 sock.close() 不再生效），由这里关闭
+    tls = context.wrap_socket(sock, do_handshake_on_connect=False)
+    key = token.register(lambda: shutdown_socket(tls)) if token is not None else None
+    try:
+        tls.do_handshake()
+        cipher = tls.cipher()
+        banner = f"{tls.version()} {cipher[0] if cipher else ''}".strip()
+        tls.sendall(_PROBE_HTTP)
+        data = _recv(tls, deadline)
+    except (ssl.SSLError, socket.timeout, OSError):
+        return None, ""
+    finally:
+        if token is not None:
+            token.unregister(key)
+        tls.close()
+    if data.startswith(b"HTTP/"):
+        return "https", f"{banner}; {_http_banner(data)}"[:_BANNER_LIMIT]
+    return "tls", banner
+
+
+def fingerprint(sock: socket.socket, port: int, timeout: float, token: Optional[CancelToken] = None) -> Fingerprint:
+    """
+    在已建立的连接上识别服务，总耗时不超过 timeout 秒：
+    - 常见 TLS 端口直接握手
+    - 其它端口先被动等待欢迎信息（SSH / FTP / SMTP / MySQL 等会先发言），
+      没有再按端口发送对应探测（SSH 标识、Redis PING，默认 HTTP HEAD）
+    token 被取消时 shutdown 连接，正在等待的读取 / 握手立即返回，结果为 (None, "")
+    """
+    deadline = time.perf_counter() + timeout
+    hint = _PORT_HINTS.get(port)
+    if hint == "tls":
+        return _tls_probe(sock, deadline, token)
+
+    key = token.register(lambda: shutdown_socket(sock)) if token is not None else None
+    try:
+        data = _recv(sock, time.perf_counter() + timeout * _PASSIVE_SHARE)
+        if data:
+            return classify(data, port)
+        if token is not None and token.cancelled:
+            return None, ""
+        try:
+            sock.sendall(_PROBES.get(hint, _PROBE_HTTP))
+        except OSError:
+            return None, ""
+        return classify(_recv(sock, deadline), port)
+    finally:
+        if token is not None:
+            token.unregister(key)
+
+
+class BannerGrabber:
+    """
+    BannerGrabber: 开放端口的第二阶段——读取 banner / 发送协议探测识别服务。
+
+    在调度器中作为独立的批量任务运行，最多 concurrency 个同时识别，慢服务只会占用这些名额，
+    不影响主扫描的在途连接窗口；每个端口的识别耗时不超过 timeout 秒。
+
+    构造：
+        grabber = BannerGrabber(concurrency=32, timeout=1.5, scheduler=None)
+        - scheduler: 为 None 时使用全程序共用的 shared_scheduler()
+
+    方法：
+        submit(host, port, callback, sock=None)
+            - sock: 主扫描刚建立的连接，直接复用（所有权转交给 grabber）；为 None 时重新连接
+            - callback(service, banner) 在调度器线程中调用；service 为 None 表示无响应
+            - 排队的连接数超过 concurrency * 4 时先关闭连接，轮到时再重新连接，
+              避免大量开放端口占满文件描述符
+        wait(timeout=None)
+            - 等待已提交的任务全部完成，返回是否在 timeout 内完成
+        cancel()
+            - 尚未开始的任务不再探测，正在识别的连接被 shutdown（等待中的读取立即返回），
+              均以 (None, "") 回调；之后 submit 的任务不受影响
+        shutdown()
+            - 取消尚未开始的识别并释放调度器中的任务；之后再 submit 会新建任务
+    """
+
+    def __init__(self, concurrency: int = 32, timeout: float = 1.5, scheduler: Optional[Scheduler] = None):
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        self.scheduler = scheduler or shared_scheduler()
+        self._job: Optional[Job] = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._token = CancelToken()     # 当前这一批任务的停止信号，cancel() 时换新
+
+    def submit(self, host: str, port: int, callback: Callable[[Optional[str], str], None],
+               sock: Optional[socket.socket] = None):
+        with self._lock:
+            if self._job is None:
+                self._job = self.scheduler.job("banner", limit=self.concurrency)
+            if sock is not None and self._pending >= self.concurrency * 4:
+                sock.close()
+                sock = None
+            self._pending += 1
+            token = self._token
+            job = self._job
+        job.submit(self._run, host, port, callback, sock, token)
+
+    def _run(self, host: str, port: int, callback, sock: Optional[socket.socket], token: CancelToken):
+        service, banner = None, ""
+        try:
+            if not token.cancelled:
+                if sock is None:
+                    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+                    connect(sock, (host, port), self.timeout, token)
+                service, banner = fingerprint(sock, port, self.timeout, token)
+        except (OSError, Cancelled):
+            pass
+        except Exception as e:
+            logger.error(f"识别 {host}:{port} 的服务失败: {e}")
+        finally:
+            if sock is not None:
+                sock.close()
+        try:
+            callback(service, banner)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._idle.notify_all()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def cancel(self):
+        with self._lock:
+            token, self._token = self._token, CancelToken()
+        token.cancel()
+
+    def shutdown(self):
+        self.cancel()
+        with self._lock:
+            job, self._job = self._job, None
+        if job is not None:
+            # 排队中的任务仍会以 (None, "") 回调，pending 计数归零
+            job.closed = True
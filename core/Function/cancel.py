@@ -0,0 +1,139 @@
+import errno
+import itertools
+import select
+import socket
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+# 停止检查的最长间隔（秒）：所有可能阻塞的等待都切成不超过这个长度的片段，停止后 2 个片段内结束
+STOP_SLICE = 0.05
+
+# connect_ex 返回这些错误码表示连接仍在进行中（10035 = WSAEWOULDBLOCK）
+_IN_PROGRESS = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, 10035}
+
+
+class Cancelled(Exception):
+    """操作因任务被停止而中止"""
+
+
+class CancelToken:
+    """
+    CancelToken: 一次任务运行的停止信号，停止时直接中断正在进行的阻塞操作。
+
+    - 可以像 should_stop 一样调用：token() 返回是否已停止
+    - register(closer): 登记停止时要执行的动作（关闭套接字、结束子进程），返回登记编号；
+      已经停止时立即执行。操作完成后用 unregister(key) 取消登记
+    - cancel(): 设置停止标志并执行所有已登记的动作（只执行一次），可从任意线程调用
+    - wait(timeout): 等待停止信号，用于代替 time.sleep，停止时立即返回 True
+
+    用法：
+        token = CancelToken()
+        key = token.register(lambda: shutdown_socket(sock))
+        try:
+            sock.recv(1024)          # 另一个线程调用 token.cancel() 时立即返回
+        finally:
+            token.unregister(key)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._closers: Dict[int, Callable[[], None]] = {}
+        self._ids = itertools.count()
+
+    def __call__(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def register(self, closer: Callable[[], None]) -> Optional[int]:
+        with self._lock:
+            if not self._event.is_set():
+                key = next(self._ids)
+                self._closers[key] = closer
+                return key
+        _call_quietly(closer)
+        return None
+
+    def unregister(self, key: Optional[int]):
+        if key is not None:
+            with self._lock:
+                self._closers.pop(key, None)
+
+    def cancel(self):
+        with self._lock:
+            self._event.set()
+            closers, self._closers = list(self._closers.values()), {}
+        for closer in closers:
+            _call_quietly(closer)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._event.wait(timeout)
+
+
+def _call_quietly(closer: Callable[[], None]):
+    try:
+        closer()
+    except Exception:
+        pass
+
+
+def shutdown_socket(sock: socket.socket):
+    """
+    中断其它线程在 sock 上阻塞的 recv / send / TLS 握手（它们立即返回或抛出 OSError）。
+    只 shutdown 不 close：描述符仍由使用它的线程关闭，避免被新连接复用后误操作。
+    """
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def kill_process(process):
+    """结束子进程（已结束时忽略）"""
+    if process.poll() is None:
+        process.kill()
+
+
+def _wait_writable(sock: socket.socket, timeout: float) -> bool:
+    """等待 sock 可写；有 poll 时使用 poll（select 不支持大于 FD_SETSIZE 的描述符，Windows 没有 poll）"""
+    if hasattr(select, "poll"):
+        poller = select.poll()
+        poller.register(sock, select.POLLOUT)
+        return bool(poller.poll(timeout * 1000))
+    _, writable, _ = select.select([], [sock], [], timeout)
+    return bool(writable)
+
+
+def connect(sock: socket.socket, address: Tuple, timeout: float,
+            should_stop: Optional[Callable[[], bool]] = None):
+    """
+    可中断的 connect：非阻塞发起连接，按 STOP_SLICE 分片等待，期间检查 should_stop。
+    - 成功返回 None，之后 sock 为阻塞模式
+    - 超时抛出 socket.timeout，被拒绝等错误抛出对应的 OSError（如 ConnectionRefusedError），
+      停止时抛出 Cancelled
+    阻塞的 socket.connect 无法被其它线程中断（close / shutdown 都不能唤醒），因此需要分片等待。
+    """
+    sock.setblocking(False)
+    try:
+        err = sock.connect_ex(address)
+    except OSError as e:
+        err = e.errno or errno.EINVAL
+    if err in _IN_PROGRESS:
+        deadline = time.perf_counter() + timeout
+        while True:
+            if should_stop and should_stop():
+                raise Cancelled()
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise socket.timeout("timed out")
+            if _wait_writable(sock, min(remaining, STOP_SLICE)):
+                err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                break
+    if err:
+        # OSError(errno, ...) 会按错误码构造对应的子类（ConnectionRefusedError 等）
+        raise OSError(err, errno.errorcode.get(err, "connect failed"))
+    sock.setblocking(True)
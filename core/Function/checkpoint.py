@@ -0,0 +1,77 @@
+import threading
+import time
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# 两次检查点之间的最短间隔（秒）
+CHECKPOINT_INTERVAL = 2.0
+
+
+class ScanCursor:
+    """
+    ScanCursor: 目标空间（按产出顺序编号的探测序列）上的低水位游标，用于断点续扫。
+
+    探测是并发完成的，完成顺序与产出顺序不同：
+        - low: 低水位，编号 < low 的探测全部已完成
+        - done_above: 编号 >= low 且已完成的探测（最多为在途窗口大小）
+    恢复时从 low 开始重新产出，跳过 done_above 中的编号，已完成的目标不会再次探测。
+
+    用法：
+        cursor = ScanCursor(low, done_above)          # 新任务为 ScanCursor()
+        for pair in cursor.track(interleave(targets, ports, start=cursor.low)):
+            ...                                       # 产出的每一项登记编号
+        cursor.complete(pair)                          # 任意线程中标记完成
+        low, done_above = cursor.state()               # 写入检查点
+    """
+
+    def __init__(self, low: int = 0, done_above: Iterable[int] = ()):
+        self.low = low
+        self._done = {index for index in done_above if index >= low}
+        # key -> 在途的编号（目标中有重复项时同一个 key 可能对应多个编号，按产出顺序完成）
+        self._issued: Dict[Hashable, List[int]] = {}
+        self._lock = threading.Lock()
+        self._next_checkpoint = time.monotonic() + CHECKPOINT_INTERVAL
+
+    def track(self, items: Iterable[T], key: Callable[[T], Hashable] = lambda item: item) -> Iterator[T]:
+        """items 为从 low 开始产出的序列；登记每一项的编号，跳过已完成的编号"""
+        skip = set(self._done)
+        for index, item in enumerate(items, self.low):
+            if index in skip:
+                continue
+            with self._lock:
+                self._issued.setdefault(key(item), []).append(index)
+            yield item
+
+    def complete(self, key: Hashable):
+        """标记一项已完成（key 与 track 中的 key 一致），推进低水位"""
+        with self._lock:
+            indices = self._issued.get(key)
+            if not indices:
+                return
+            index = indices.pop(0)
+            if not indices:
+                del self._issued[key]
+            if index != self.low:
+                self._done.add(index)
+                return
+            self.low += 1
+            while self.low in self._done:
+                self._done.remove(self.low)
+                self.low += 1
+
+    @property
+    def completed(self) -> int:
+        return self.low + len(self._done)
+
+    def state(self) -> Tuple[int, List[int]]:
+        with self._lock:
+            return self.low, sorted(self._done)
+
+    def due(self) -> bool:
+        """距上次检查点已超过 CHECKPOINT_INTERVAL 时返回 True（并重新计时）"""
+        now = time.monotonic()
+        if now < self._next_checkpoint:
+            return False
+        self._next_checkpoint = now + CHECKPOINT_INTERVAL
+        return True
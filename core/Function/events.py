@@ -0,0 +1,102 @@
+import queue
+import sys
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import logging
+logger = logging.getLogger(__name__)
+
+# 任务结束事件的类型，每个后台任务最后都会发出一次
+EVENT_DONE = "done"
+
+
+class EventSink:
+    """
+    EventSink: 功能类（PingFun / PortScanner / TracertFun / NetworkManager）的输出接口。
+
+    功能类只通过这组方法输出，不直接接触任何 Tk 控件：
+        write(text)                  人类可读的结果文本
+        clear()                      开始新任务前清空之前的文本
+        set_progress(text)           进度说明（只保留最新值）
+        post(func)                   任务结束后的回调，在消费端的线程中执行
+        notice(title, message, level="warning")  输入错误等提示（level: info / warning / error）
+        emit(kind, **fields)         结构化结果事件，如 {"type": "port", "host": ..., "port": ..., "state": ...}
+
+    基类不保存任何内容：文本丢弃，事件交给 on_event 回调（可为 None），回调立即执行，
+    提示写入日志。图形界面使用 OutputPipe，命令行使用 EventStream。
+    """
+
+    def __init__(self, on_event: Optional[Callable[[Dict], None]] = None):
+        self.on_event = on_event
+
+    def write(self, text: str):
+        pass
+
+    def clear(self):
+        pass
+
+    def set_progress(self, text: str):
+        pass
+
+    def post(self, func):
+        func()
+
+    def notice(self, title: str, message: str, level: str = "warning"):
+        log = logger.error if level == "error" else logger.warning if level == "warning" else logger.info
+        log(f"{title}: {message}")
+
+    def emit(self, kind: str, **fields):
+        if self.on_event is not None:
+            event = {"type": kind}
+            event.update(fields)
+            self.on_event(event)
+
+
+class EventStream(EventSink):
+    """
+    EventStream: 把结构化事件放入队列，供调用方以迭代器方式逐个读取，不依赖 Tk。
+
+        stream = EventStream()
+        scanner = PortScanner(stream)
+        if scanner.start_sweep_scan("10.0.0.0/24", "22,80"):
+            for event in stream:        # 收到 type 为 "done" 的事件后结束
+                ...
+
+    - on_text: 可选，接收 write() 的文本（例如 sys.stdout.write），默认丢弃
+    - notice() 的提示写到标准错误，并保存在 notices 列表中
+    """
+
+    def __init__(self, on_text: Optional[Callable[[str], None]] = None,
+                 on_event: Optional[Callable[[Dict], None]] = None):
+        super().__init__(on_event)
+        self.on_text = on_text
+        self.notices: List[Tuple[str, str, str]] = []
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+
+    def write(self, text: str):
+        if text and self.on_text is not None:
+            self.on_text(text)
+
+    def notice(self, title: str, message: str, level: str = "warning"):
+        self.notices.append((level, title, message))
+        sys.stderr.write(f"{title}: {message}\n")
+
+    def emit(self, kind: str, **fields):
+        event = {"type": kind}
+        event.update(fields)
+        self._queue.put(event)
+        if self.on_event is not None:
+            self.on_event(event)
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """取出下一个事件，timeout 内没有事件时返回 None"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def __iter__(self) -> Iterator[Dict]:
+        while True:
+            event = self._queue.get()
+            yield event
+            if event["type"] == EVENT_DONE:
+                return
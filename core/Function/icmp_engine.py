@@ -0,0 +1,350 @@
+import ipaddress
+import os
+import select
+import socket
+import struct
+import sys
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Optional, Tuple
+
+from core.Function.cancel import STOP_SLICE
+from core.Function.rate_budget import RateBudget
+
+import logging
+logger = logging.getLogger(__name__)
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMP6_ECHO_REQUEST = 128
+ICMP6_ECHO_REPLY = 129
+
+
+def _checksum(data: bytes) -> int:
+    """RFC 1071 校验和"""
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_echo_request(ident: int, seq: int, payload: bytes) -> bytes:
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    checksum = _checksum(header + payload)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, checksum, ident, seq) + payload
+
+
+def build_echo_request6(ident: int, seq: int, payload: bytes) -> bytes:
+    """ICMPv6 校验和包含 IPv6 伪首部，由内核计算，这里填 0"""
+    return struct.pack("!BBHHH", ICMP6_ECHO_REQUEST, 0, 0, ident, seq) + payload
+
+
+def parse_echo_reply(data: bytes, family: int = socket.AF_INET) -> Optional[Tuple[int, int]]:
+    """
+    解析回显应答，返回 (id, seq)；不是回显应答时返回 None。
+    原始套接字（以及 macOS 的 SOCK_DGRAM）收到的 IPv4 数据带 IPv4 头，需要先跳过；ICMPv6 套接字收到的数据不带 IP 头。
+    """
+    if family == socket.AF_INET6:
+        reply_type = ICMP6_ECHO_REPLY
+    else:
+        reply_type = ICMP_ECHO_REPLY
+        if len(data) >= 20 and data[0] >> 4 == 4:
+            data = data[(data[0] & 0x0F) * 4:]
+    if len(data) < 8:
+        return None
+    icmp_type, _, _, ident, seq = struct.unpack("!BBHHH", data[:8])
+    if icmp_type != reply_type:
+        return None
+    return ident, seq
+
+
+def _parse_address(host: str) -> Optional[Tuple[str, int]]:
+    """IP 字面量返回 (规范写法, 地址族)，与 recvfrom 返回的来源地址写法一致；不是字面量时返回 None"""
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return None
+    return str(address), socket.AF_INET6 if address.version == 6 else socket.AF_INET
+
+
+class IcmpPinger:
+    """
+    IcmpPinger: 进程内 ICMP 回显引擎，每个地址族一个套接字完成整段地址的批量 Ping。
+
+    - Linux / macOS 优先使用无需特权的 SOCK_DGRAM + IPPROTO_ICMP / IPPROTO_ICMPV6
+      （Linux 需要 net.ipv4.ping_group_range 包含当前用户组），
+      不可用时退回 SOCK_RAW（需要 root / 管理员权限）
+    - 连续发送回显请求，最多 window 个在途，按 (id, seq) 和来源地址匹配应答
+    - IPv4 套接字打不开时 available() 返回 False，调用方应退回 ping 子进程
+    - open() 在发出任何请求之前打开并绑定套接字，出错时调用方还可以整批改用 ping 子进程
+    - IPv6 套接字不可用时 IPv6 目标不发送，交给 on_skipped，不会当作未响应
+    - 传入 budget（RateBudget）时每个请求发送前取令牌，收到应答或超时后归还
+    - should_stop 返回 True 后最多 STOP_SLICE 秒内返回，在途请求不再等待应答（也不回调）
+
+    用法：
+        if IcmpPinger.available():
+            IcmpPinger(timeout=2.0, budget=None).sweep(hosts, on_result, should_stop)
+
+        pinger = IcmpPinger(local_ip="10.0.0.2")
+        pinger.open(ipv6=True)       # 绑定失败 / 缺少 IPv6 支持时在这里抛出 OSError
+        try:
+            pinger.sweep(hosts, on_result, should_stop)
+        finally:
+            pinger.close()
+
+        on_result(ip, rtt_ms)：rtt_ms 为 None 表示超时未响应
+    """
+
+    PAYLOAD = b"Network-tools" + b"\0" * 19   # 与 Windows ping 默认一样 32 字节
+
+    def __init__(self, timeout: float = 2.0, window: int = 1024, local_ip: Optional[str] = None,
+                 budget: Optional[RateBudget] = None):
+        self.timeout = timeout
+        self.budget = budget
+        # seq 只有 16 位，在途数量必须远小于 65536 才能无歧义地匹配
+        self.window = max(1, min(int(window), 16384))
+        self.local_ip = local_ip or None
+        self._socks: Dict[int, Tuple[socket.socket, bool]] = {}   # 地址族 -> (sock, is_dgram)
+
+    @staticmethod
+    def _open_socket(family: int = socket.AF_INET) -> Tuple[socket.socket, bool]:
+        """返回 (sock, is_dgram)"""
+        proto = socket.IPPROTO_ICMPV6 if family == socket.AF_INET6 else socket.IPPROTO_ICMP
+        try:
+            return socket.socket(family, socket.SOCK_DGRAM, proto), True
+        except OSError:
+            return socket.socket(family, socket.SOCK_RAW, proto), False
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            sock, _ = cls._open_socket()
+            sock.close()
+            return True
+        except OSError:
+            return False
+
+    def open(self, ipv6: Optional[bool] = None):
+        """
+        打开并绑定套接字，失败时抛出 OSError（此时还没有发出任何请求）。
+        ipv6: True 时 IPv6 套接字也必须可用；None 时尽量打开；False 时不打开
+        """
+        self.close()
+        try:
+            self._socks[socket.AF_INET] = self._prepare(socket.AF_INET)
+            if ipv6 is not False:
+                try:
+                    self._socks[socket.AF_INET6] = self._prepare(socket.AF_INET6)
+                except OSError as e:
+                    if ipv6:
+                        raise
+                    logger.debug(f"ICMPv6 套接字不可用: {e}")
+        except OSError:
+            self.close()
+            raise
+
+    def _prepare(self, family: int) -> Tuple[socket.socket, bool]:
+        sock, is_dgram = self._open_socket(family)
+        try:
+            # 本地地址只绑定到同一地址族的套接字上
+            local = (_parse_address(self.local_ip) or (self.local_ip, socket.AF_INET)) if self.local_ip else None
+            if local is not None and local[1] == family:
+                sock.bind((local[0], 0))
+            elif sys.platform.startswith("win"):
+                # Windows 原始套接字必须先绑定到具体接口地址才能接收
+                sock.bind((_default_source_address(family), 0))
+            sock.setblocking(False)
+            # 在途较多时加大接收缓冲，避免应答集中到达时被内核丢弃
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            except OSError:
+                pass
+            return sock, is_dgram
+        except OSError:
+            sock.close()
+            raise
+
+    def close(self):
+        socks, self._socks = self._socks, {}
+        for sock, _ in socks.values():
+            sock.close()
+
+    def sweep(self, hosts: Iterable[str], on_result: Callable[[str, Optional[float]], None],
+              should_stop: Optional[Callable[[], bool]] = None,
+              on_skipped: Optional[Callable[[str], None]] = None):
+        """
+        对 hosts 逐个发送一次回显请求并等待应答，阻塞直到全部完成或被停止。
+        hosts 可以是生成器，按需读取。
+        没有先调用 open() 时在这里打开（IPv6 尽量打开），结束时关闭。
+        所属地址族的套接字没有打开的目标不发送，调用 on_skipped(ip)（未传入时只记录日志）。
+        """
+        opened_here = not self._socks
+        if opened_here:
+            self.open()
+        try:
+            self._run(dict(self._socks), iter(hosts), on_result, should_stop, on_skipped)
+        finally:
+            if opened_here:
+                self.close()
+
+    def _run(self, socks, host_iter, on_result, should_stop, on_skipped):
+        # SOCK_DGRAM 下内核会把 id 改写为套接字的本地端口，只会收到属于自己的应答
+        ident = os.getpid() & 0xFFFF
+        seq = 0
+        pending: Dict[int, Tuple[str, float, str]] = {}  # seq -> (目标, 发送时间, 目标 IP)
+        order: Deque[Tuple[float, int]] = deque()       # (发送时间, seq)，超时时间相同，按发送顺序即按截止顺序
+        exhausted = False
+        budget = self.budget
+        held: Optional[str] = None                        # 暂缓发送的目标（预算不足或发送缓冲已满）
+        held_until = 0.0                                  # 到此时间再试
+
+        def finish(entry: Tuple[str, float, str], rtt: Optional[float]):
+            if budget is not None:
+                budget.release(entry[2])
+            on_result(entry[0], rtt)
+
+        try:
+            while True:
+                if should_stop and should_stop():
+                    # 停止：在途请求直接放弃，预算在 finally 中归还
+                    return
+                # 1. 补齐在途请求
+                while not exhausted and len(pending) < self.window:
+                    if held is not None:
+                        if time.perf_counter() < held_until:
+                            break
+                        ip, held = held, None
+                    else:
+                        try:
+                            ip = next(host_iter)
+                        except StopIteration:
+                            exhausted = True
+                            break
+                    parsed = _parse_address(ip)
+                    if parsed is None:
+                        try:
+                            parsed = socket.gethostbyname(ip), socket.AF_INET
+                        except OSError:
+                            on_result(ip, None)
+                            continue
+                    dest, family = parsed
+                    if family not in socks:
+                        if on_skipped is not None:
+                            on_skipped(ip)
+                        else:
+                            logger.warning(f"{ip}: 没有可用的 ICMPv6 套接字，未探测")
+                        continue
+                    sock, _ = socks[family]
+                    if budget is not None:
+                        wait = budget.try_acquire(dest)
+                        if wait > 0:
+                            held, held_until = ip, time.perf_counter() + wait
+                            break
+                    seq = (seq + 1) & 0xFFFF
+                    while seq in pending:
+                        seq = (seq + 1) & 0xFFFF
+                    if family == socket.AF_INET6:
+                        packet = build_echo_request6(ident, seq, self.PAYLOAD)
+                    else:
+                        packet = build_echo_request(ident, seq, self.PAYLOAD)
+                    sent_at = time.perf_counter()
+                    try:
+                        sock.sendto(packet, (dest, 0))
+                    except BlockingIOError:
+                        # 发送缓冲已满：先处理应答，下一轮再发
+                        if budget is not None:
+                            budget.release(dest)
+                        held, held_until = ip, 0.0
+                        break
+                    except OSError as e:
+                        logger.debug(f"ICMP 发送到 {ip} 失败: {e}")
+                        finish((ip, sent_at, dest), None)
+                        continue
+                    pending[seq] = (ip, sent_at, dest)
+                    order.append((sent_at, seq))
+                    # 大批量发送期间也及时收取应答，避免 RTT 被发送阶段拉长
+                    if seq % 64 == 0:
+                        self._receive_all(socks, ident, pending, finish)
+
+                if not pending:
+                    if exhausted:
+                        return
+                    # 只可能是预算不足：等到可以再发（分片等待，及时响应停止）
+                    time.sleep(max(0.0, min(held_until - time.perf_counter(), STOP_SLICE)))
+                    continue
+
+                # 2. 接收应答，最多等到最早的截止时间（有暂缓的请求时到可以再发为止）
+                wake = order[0][0] + self.timeout
+                if held is not None and held_until:
+                    # 预算暂缓：到可以再发为止；发送缓冲已满（held_until 为 0）时等应答或超时
+                    wake = min(wake, held_until)
+                wait = max(0.0, wake - time.perf_counter())
+                if should_stop:
+                    wait = min(wait, STOP_SLICE)
+                readable, _, _ = select.select([sock for sock, _ in socks.values()], [], [], wait)
+                if readable:
+                    self._receive_all(socks, ident, pending, finish)
+
+                # 3. 处理超时（seq 会回绕，用发送时间确认是同一次请求）
+                now = time.perf_counter()
+                while order and order[0][0] + self.timeout <= now:
+                    sent_at, expired_seq = order.popleft()
+                    entry = pending.get(expired_seq)
+                    if entry is not None and entry[1] == sent_at:
+                        del pending[expired_seq]
+                        finish(entry, None)
+                # 清理队首已收到应答的条目
+                while order and (order[0][1] not in pending or pending[order[0][1]][1] != order[0][0]):
+                    order.popleft()
+        finally:
+            if budget is not None:
+                for entry in pending.values():
+                    budget.release(entry[2])
+
+    @classmethod
+    def _receive_all(cls, socks, ident, pending, finish):
+        for family, (sock, is_dgram) in socks.items():
+            cls._receive(sock, is_dgram, family, ident, pending, finish)
+
+    @staticmethod
+    def _receive(sock, is_dgram, family, ident, pending, finish):
+        """非阻塞地收取当前所有应答并与在途请求匹配，finish(entry, rtt_ms) 处理匹配到的请求"""
+        while True:
+            try:
+                data, addr = sock.recvfrom(2048)
+            except OSError:
+                return  # 包括 BlockingIOError：已经没有待读数据
+            now = time.perf_counter()
+            parsed = parse_echo_reply(data, family)
+            if parsed is None:
+                continue
+            reply_id, reply_seq = parsed
+            if not is_dgram and reply_id != ident:
+                continue  # 原始套接字会收到其它进程的应答
+            entry = pending.get(reply_seq)
+            if entry is None or entry[2] != addr[0]:
+                continue
+            del pending[reply_seq]
+            finish(entry, (now - entry[1]) * 1000)
+
+
+def _default_source_address(family: int = socket.AF_INET) -> str:
+    """默认路由对应的本机地址（UDP connect 不会发出任何报文）"""
+    if family == socket.AF_INET6:
+        target, fallback = "2001:db8::1", "::"
+    else:
+        target, fallback = "192.0.2.1", "0.0.0.0"
+    try:
+        probe = socket.socket(family, socket.SOCK_DGRAM)
+    except OSError:
+        return fallback
+    try:
+        probe.connect((target, 9))
+        return probe.getsockname()[0]
+    except OSError:
+        return fallback
+    finally:
+        probe.close()
+
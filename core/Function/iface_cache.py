@@ -0,0 +1,451 @@
+"""
+网卡信息缓存：不启动子进程，直接读取系统接口，只有系统报告网卡 / 地址 / 路由变化时才重新读取。
+
+    - Linux：rtnetlink 读取网卡与地址，/proc/net 读取默认网关，/etc/resolv.conf 读取 DNS；
+      订阅 rtnetlink 组播得到变化通知
+    - Windows：iphlpapi.GetAdaptersAddresses；NotifyAddrChange 得到地址变化通知
+    - 其它系统或读取失败：使用传入的 fallback（例如 NetworkManager.get_network_info，即 ipconfig /all 解析）
+
+返回的网卡记录与 ipconfig_parser.parse_ipconfig 字段相同。
+"""
+import ctypes
+import ipaddress
+import os
+import select
+import socket
+import struct
+import sys
+import threading
+from typing import Callable, Dict, List, Optional
+
+from core.Function.ipconfig_parser import _new_adapter, _finish
+
+import logging
+logger = logging.getLogger(__name__)
+
+_WINDOWS = sys.platform.startswith("win")
+_LINUX = sys.platform.startswith("linux")
+
+# ---------------- Linux：rtnetlink ----------------
+_NETLINK_ROUTE = 0
+_RTM_NEWLINK, _RTM_GETLINK, _RTM_NEWADDR, _RTM_GETADDR = 16, 18, 20, 22
+_NLM_F_REQUEST, _NLM_F_DUMP = 0x1, 0x300
+_NLMSG_ERROR, _NLMSG_DONE = 2, 3
+_IFLA_ADDRESS, _IFLA_IFNAME, _IFLA_OPERSTATE = 1, 3, 16
+_IFA_ADDRESS, _IFA_LOCAL = 1, 2
+_IFF_LOOPBACK = 0x8
+_IFA_F_PERMANENT = 0x80
+_IF_OPER_DOWN = 2
+# 订阅的组播组：链路、IPv4 / IPv6 地址、IPv4 / IPv6 路由变化
+_RTMGRP_LINK, _RTMGRP_IPV4_IFADDR, _RTMGRP_IPV4_ROUTE = 0x1, 0x10, 0x40
+_RTMGRP_IPV6_IFADDR, _RTMGRP_IPV6_ROUTE = 0x100, 0x400
+_NLMSG_HEADER = struct.Struct("=IHHII")
+_RTATTR = struct.Struct("=HH")
+
+# ---------------- Windows：iphlpapi ----------------
+_GAA_FLAG_SKIP_ANYCAST, _GAA_FLAG_SKIP_MULTICAST, _GAA_FLAG_INCLUDE_GATEWAYS = 0x2, 0x4, 0x80
+_ERROR_BUFFER_OVERFLOW = 111
+_IP_ADAPTER_DHCP_ENABLED = 0x4
+_IF_TYPE_SOFTWARE_LOOPBACK = 24
+_IF_OPER_STATUS_UP = 1
+_WIN_AF_INET6 = 23
+
+# 断开的网卡（对应 ipconfig 的 "媒体已断开连接"）
+MEDIA_DISCONNECTED = "已断开"
+
+
+def _mac_text(raw: bytes) -> str:
+    return "-".join(f"{b:02X}" for b in raw)
+
+
+def _native_adapter(name: str) -> Dict:
+    """与 ipconfig_parser 字段相同的空记录，标题与连接名都是系统中的网卡名"""
+    adapter = _new_adapter(name)
+    adapter["interface"] = name
+    return adapter
+
+
+# -------------------------
+# Linux
+# -------------------------
+def _rtattrs(data: bytes, offset: int, end: int):
+    """遍历 rtattr，生成 (类型, 值)"""
+    while offset + _RTATTR.size <= end:
+        length, kind = _RTATTR.unpack_from(data, offset)
+        if length < _RTATTR.size:
+            break
+        yield kind, data[offset + _RTATTR.size:offset + length]
+        offset += (length + 3) & ~3
+
+
+def _netlink_dump(sock: socket.socket, msg_type: int, body: bytes):
+    """发送一个 dump 请求，生成 (消息类型, 消息内容) 直到 NLMSG_DONE"""
+    seq = int.from_bytes(os.urandom(4), "little")
+    sock.send(_NLMSG_HEADER.pack(_NLMSG_HEADER.size + len(body), msg_type,
+                                 _NLM_F_REQUEST | _NLM_F_DUMP, seq, 0) + body)
+    while True:
+        data = sock.recv(65536)
+        offset = 0
+        while offset + _NLMSG_HEADER.size <= len(data):
+            length, kind, _, msg_seq, _ = _NLMSG_HEADER.unpack_from(data, offset)
+            if length < _NLMSG_HEADER.size:
+                return
+            if msg_seq == seq:
+                if kind == _NLMSG_DONE:
+                    return
+                if kind == _NLMSG_ERROR:
+                    raise OSError("netlink 请求失败")
+                yield kind, data[offset + _NLMSG_HEADER.size:offset + length]
+            offset += (length + 3) & ~3
+
+
+def _linux_default_gateways() -> Dict[str, List[str]]:
+    """网卡名 -> 默认网关（/proc/net/route 与 /proc/net/ipv6_route）"""
+    gateways: Dict[str, List[str]] = {}
+    try:
+        with open("/proc/net/route") as f:
+            next(f)
+            for line in f:
+                fields = line.split()
+                # Destination 为 0 且带 RTF_GATEWAY 标志的是默认路由
+                if len(fields) > 3 and fields[1] == "00000000" and int(fields[3], 16) & 0x2:
+                    gw = socket.inet_ntoa(struct.pack("<I", int(fields[2], 16)))
+                    gateways.setdefault(fields[0], []).append(gw)
+    except OSError:
+        pass
+    try:
+        with open("/proc/net/ipv6_route") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) == 10 and fields[0] == "0" * 32 and fields[1] == "00" and fields[4] != "0" * 32:
+                    gw = str(ipaddress.IPv6Address(bytes.fromhex(fields[4])))
+                    gateways.setdefault(fields[9], []).append(gw)
+    except OSError:
+        pass
+    return gateways
+
+
+def _linux_dns_servers() -> List[str]:
+    servers = []
+    try:
+        with open("/etc/resolv.conf") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0] == "nameserver":
+                    servers.append(fields[1])
+    except OSError:
+        pass
+    return servers
+
+
+def _linux_description(name: str) -> str:
+    """网卡驱动名（/sys/class/net/<名称>/device/driver），虚拟网卡返回 "虚拟网卡" """
+    try:
+        return os.path.basename(os.readlink(f"/sys/class/net/{name}/device/driver"))
+    except OSError:
+        return "虚拟网卡"
+
+
+def linux_interfaces() -> List[Dict]:
+    """通过 rtnetlink 读取网卡与地址，网关取自 /proc/net，DNS 取自 /etc/resolv.conf"""
+    adapters: Dict[int, Dict] = {}
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, _NETLINK_ROUTE) as sock:
+        sock.settimeout(2.0)
+        sock.bind((0, 0))
+        # ifinfomsg: family, pad, type, index, flags, change
+        for _, msg in _netlink_dump(sock, _RTM_GETLINK, struct.pack("=BxHiII", socket.AF_UNSPEC, 0, 0, 0, 0)):
+            _, _, index, flags, _ = struct.unpack_from("=BxHiII", msg)
+            if flags & _IFF_LOOPBACK:
+                continue
+            attrs = dict(_rtattrs(msg, 16, len(msg)))
+            name = attrs.get(_IFLA_IFNAME, b"").rstrip(b"\0").decode(errors="replace")
+            adapter = _native_adapter(name)
+            if _IFLA_ADDRESS in attrs:
+                adapter["mac"] = _mac_text(attrs[_IFLA_ADDRESS])
+            if attrs.get(_IFLA_OPERSTATE, b"\0")[0] == _IF_OPER_DOWN:
+                adapter["media_state"] = MEDIA_DISCONNECTED
+            adapters[index] = adapter
+
+        # ifaddrmsg: family, prefixlen, flags, scope, index
+        for _, msg in _netlink_dump(sock, _RTM_GETADDR, struct.pack("=BBBBI", socket.AF_UNSPEC, 0, 0, 0, 0)):
+            family, prefix, flags, _, index = struct.unpack_from("=BBBBI", msg)
+            adapter = adapters.get(index)
+            if adapter is None:
+                continue
+            attrs = dict(_rtattrs(msg, 8, len(msg)))
+            if family == socket.AF_INET:
+                raw = attrs.get(_IFA_LOCAL) or attrs.get(_IFA_ADDRESS)
+                if raw:
+                    adapter["ipv4_addresses"].append(socket.inet_ntoa(raw))
+                    adapter["netmasks"].append(str(ipaddress.IPv4Network(f"0.0.0.0/{prefix}").netmask))
+                    # 由 DHCP 客户端设置的地址带有效期，没有 IFA_F_PERMANENT 标志（ip addr 中的 dynamic）
+                    adapter["dhcp_enabled"] = "否" if flags & _IFA_F_PERMANENT else "是"
+            elif family == socket.AF_INET6 and _IFA_ADDRESS in attrs:
+                address = ipaddress.IPv6Address(attrs[_IFA_ADDRESS])
+                text = f"{address}%{index}" if address.is_link_local else str(address)
+                adapter["ipv6_addresses"].append(text)
+
+    gateways = _linux_default_gateways()
+    dns = _linux_dns_servers()
+    result = []
+    for adapter in adapters.values():
+        adapter["description"] = _linux_description(adapter["name"])
+        adapter["gateways"] = gateways.get(adapter["name"], [])
+        if adapter["gateways"]:
+            adapter["dns_servers"] = list(dns)
+        if not adapter["dhcp_enabled"]:
+            adapter["dhcp_enabled"] = "否"
+        result.append(_finish(adapter))
+    return result
+
+
+def _linux_watch(stop: threading.Event, on_change: Callable[[], None]):
+    """订阅 rtnetlink 组播，链路 / 地址 / 路由变化时调用 on_change（一批变化合并为一次）"""
+    groups = _RTMGRP_LINK | _RTMGRP_IPV4_IFADDR | _RTMGRP_IPV6_IFADDR | _RTMGRP_IPV4_ROUTE | _RTMGRP_IPV6_ROUTE
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, _NETLINK_ROUTE) as sock:
+        sock.bind((0, groups))
+        while not stop.is_set():
+            ready, _, _ = select.select([sock], [], [], 0.5)
+            if not ready:
+                continue
+            # 配置变化通常是一连串消息（例如 DHCP 续约同时改地址和路由），读空后再刷新
+            while select.select([sock], [], [], 0.2)[0]:
+                sock.recv(65536)
+            on_change()
+
+
+# -------------------------
+# Windows
+# -------------------------
+if _WINDOWS:
+    from ctypes import wintypes
+
+    class _SOCKET_ADDRESS(ctypes.Structure):
+        _fields_ = [("lpSockaddr", ctypes.c_void_p), ("iSockaddrLength", ctypes.c_int)]
+
+    class _IP_ADAPTER_ADDRESS_ENTRY(ctypes.Structure):
+        """单播地址 / 网关 / DNS 服务器链表项的公共前缀"""
+        pass
+
+    _IP_ADAPTER_ADDRESS_ENTRY._fields_ = [
+        ("Length", wintypes.ULONG), ("Flags", wintypes.DWORD),
+        ("Next", ctypes.POINTER(_IP_ADAPTER_ADDRESS_ENTRY)), ("Address", _SOCKET_ADDRESS),
+    ]
+
+    class _IP_ADAPTER_UNICAST_ADDRESS(ctypes.Structure):
+        pass
+
+    _IP_ADAPTER_UNICAST_ADDRESS._fields_ = [
+        ("Length", wintypes.ULONG), ("Flags", wintypes.DWORD),
+        ("Next", ctypes.POINTER(_IP_ADAPTER_UNICAST_ADDRESS)), ("Address", _SOCKET_ADDRESS),
+        ("PrefixOrigin", ctypes.c_int), ("SuffixOrigin", ctypes.c_int), ("DadState", ctypes.c_int),
+        ("ValidLifetime", wintypes.ULONG), ("PreferredLifetime", wintypes.ULONG),
+        ("LeaseLifetime", wintypes.ULONG), ("OnLinkPrefixLength", ctypes.c_uint8),
+    ]
+
+    class _IP_ADAPTER_ADDRESSES(ctypes.Structure):
+        """IP_ADAPTER_ADDRESSES_LH 中用到的前半部分（只通过指针访问，不需要完整定义）"""
+        pass
+
+    _IP_ADAPTER_ADDRESSES._fields_ = [
+        ("Length", wintypes.ULONG), ("IfIndex", wintypes.DWORD),
+        ("Next", ctypes.POINTER(_IP_ADAPTER_ADDRESSES)),
+        ("AdapterName", ctypes.c_char_p),
+        ("FirstUnicastAddress", ctypes.POINTER(_IP_ADAPTER_UNICAST_ADDRESS)),
+        ("FirstAnycastAddress", ctypes.c_void_p),
+        ("FirstMulticastAddress", ctypes.c_void_p),
+        ("FirstDnsServerAddress", ctypes.POINTER(_IP_ADAPTER_ADDRESS_ENTRY)),
+        ("DnsSuffix", ctypes.c_wchar_p),
+        ("Description", ctypes.c_wchar_p),
+        ("FriendlyName", ctypes.c_wchar_p),
+        ("PhysicalAddress", ctypes.c_ubyte * 8),
+        ("PhysicalAddressLength", wintypes.DWORD),
+        ("Flags", wintypes.DWORD),
+        ("Mtu", wintypes.DWORD),
+        ("IfType", wintypes.DWORD),
+        ("OperStatus", ctypes.c_int),
+        ("Ipv6IfIndex", wintypes.DWORD),
+        ("ZoneIndices", wintypes.DWORD * 16),
+        ("FirstPrefix", ctypes.c_void_p),
+        ("TransmitLinkSpeed", ctypes.c_uint64),
+        ("ReceiveLinkSpeed", ctypes.c_uint64),
+        ("FirstWinsServerAddress", ctypes.c_void_p),
+        ("FirstGatewayAddress", ctypes.POINTER(_IP_ADAPTER_ADDRESS_ENTRY)),
+    ]
+
+
+def _windows_sockaddr(address) -> Optional[str]:
+    if not address.lpSockaddr:
+        return None
+    raw = ctypes.string_at(address.lpSockaddr, address.iSockaddrLength)
+    family = struct.unpack_from("<H", raw)[0]
+    if family == socket.AF_INET:
+        return socket.inet_ntoa(raw[4:8])
+    if family == _WIN_AF_INET6:
+        ip = ipaddress.IPv6Address(raw[8:24])
+        scope = struct.unpack_from("<I", raw, 24)[0]
+        return f"{ip}%{scope}" if ip.is_link_local and scope else str(ip)
+    return None
+
+
+def _windows_entries(entry):
+    while entry:
+        yield entry.contents
+        entry = entry.contents.Next
+
+
+def windows_interfaces() -> List[Dict]:
+    """通过 GetAdaptersAddresses 读取网卡、地址、网关与 DNS"""
+    iphlpapi = ctypes.WinDLL("iphlpapi")
+    flags = _GAA_FLAG_SKIP_ANYCAST | _GAA_FLAG_SKIP_MULTICAST | _GAA_FLAG_INCLUDE_GATEWAYS
+    size = wintypes.ULONG(16 * 1024)
+    for _ in range(4):
+        buffer = ctypes.create_string_buffer(size.value)
+        status = iphlpapi.GetAdaptersAddresses(socket.AF_UNSPEC, flags, None, buffer, ctypes.byref(size))
+        if status != _ERROR_BUFFER_OVERFLOW:
+            break
+    if status != 0:
+        raise OSError(status, "GetAdaptersAddresses 调用失败")
+
+    result = []
+    entry = ctypes.cast(buffer, ctypes.POINTER(_IP_ADAPTER_ADDRESSES))
+    for info in _windows_entries(entry):
+        if info.IfType == _IF_TYPE_SOFTWARE_LOOPBACK:
+            continue
+        adapter = _native_adapter(info.FriendlyName or "")
+        adapter["description"] = info.Description or ""
+        adapter["mac"] = _mac_text(bytes(info.PhysicalAddress[:info.PhysicalAddressLength]))
+        adapter["dhcp_enabled"] = "是" if info.Flags & _IP_ADAPTER_DHCP_ENABLED else "否"
+        if info.OperStatus != _IF_OPER_STATUS_UP:
+            adapter["media_state"] = MEDIA_DISCONNECTED
+        for address in _windows_entries(info.FirstUnicastAddress):
+            text = _windows_sockaddr(address.Address)
+            if text is None:
+                continue
+            if "." in text:
+                adapter["ipv4_addresses"].append(text)
+                adapter["netmasks"].append(
+                    str(ipaddress.IPv4Network(f"0.0.0.0/{address.OnLinkPrefixLength}").netmask))
+            else:
+                adapter["ipv6_addresses"].append(text)
+        for gateway in _windows_entries(info.FirstGatewayAddress):
+            text = _windows_sockaddr(gateway.Address)
+            if text:
+                adapter["gateways"].append(text)
+        for server in _windows_entries(info.FirstDnsServerAddress):
+            text = _windows_sockaddr(server.Address)
+            if text:
+                adapter["dns_servers"].append(text)
+        result.append(_finish(adapter))
+    return result
+
+
+def _windows_watch(stop: threading.Event, on_change: Callable[[], None]):
+    """NotifyAddrChange 以同步方式阻塞到 IPv4 地址表变化"""
+    iphlpapi = ctypes.WinDLL("iphlpapi")
+    while not stop.is_set():
+        if iphlpapi.NotifyAddrChange(None, None) != 0:
+            return
+        if not stop.is_set():
+            on_change()
+
+
+# -------------------------
+# 缓存
+# -------------------------
+def native_interfaces() -> Optional[List[Dict]]:
+    """用本系统的原生接口读取网卡列表，不支持的系统返回 None"""
+    if _LINUX:
+        return linux_interfaces()
+    if _WINDOWS:
+        return windows_interfaces()
+    return None
+
+
+class InterfaceCache:
+    """
+    InterfaceCache: 网卡信息的内存缓存。
+
+    - load(): 同步读取一次（优先原生接口，失败时使用 fallback）并返回网卡列表
+    - start(): 后台读取一次，并在支持的系统上启动变化监听线程，系统报告变化时自动重新读取
+    - adapters(): 立即返回缓存（尚未读取时为 None），不会阻塞界面
+    - refresh(): 后台重新读取；有变化监听时缓存总是最新，只有 force=True 才会重新读取
+    - subscribe(callback): 每次读取到与之前不同的结果时在后台线程中调用 callback(adapters)
+
+    backend: 最近一次读取使用的方式，"netlink" / "iphlpapi" / "fallback"
+    """
+
+    def __init__(self, fallback: Optional[Callable[[], List[Dict]]] = None):
+        self.fallback = fallback
+        self.backend = None
+        self.watching = False
+        self._adapters: Optional[List[Dict]] = None
+        self._listeners: List[Callable[[List[Dict]], None]] = []
+        self._lock = threading.Lock()
+        self._loading = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def adapters(self) -> Optional[List[Dict]]:
+        with self._lock:
+            return self._adapters
+
+    def subscribe(self, callback: Callable[[List[Dict]], None]):
+        self._listeners.append(callback)
+
+    def load(self) -> List[Dict]:
+        """读取一次网卡信息并更新缓存；同一时间只有一个读取在进行"""
+        with self._loading:
+            adapters, backend = None, "fallback"
+            try:
+                adapters = native_interfaces()
+                backend = "iphlpapi" if _WINDOWS else "netlink"
+            except Exception as e:
+                logger.warning(f"原生网卡接口读取失败，改用 ipconfig: {e}")
+            if adapters is None:
+                if self.fallback is None:
+                    raise RuntimeError("当前系统不支持读取网卡信息")
+                adapters, backend = self.fallback(), "fallback"
+
+            with self._lock:
+                changed = adapters != self._adapters
+                self._adapters = adapters
+                self.backend = backend
+        if changed:
+            for callback in self._listeners:
+                try:
+                    callback(adapters)
+                except Exception as e:
+                    logger.error(f"网卡变化回调失败: {e}")
+        return adapters
+
+    def _load_quietly(self):
+        try:
+            self.load()
+        except Exception as e:
+            logger.error(f"读取网卡信息失败: {e}")
+
+    def start(self):
+        """后台读取一次，并启动变化监听（只需调用一次）"""
+        threading.Thread(target=self._load_quietly, daemon=True).start()
+        watch = _linux_watch if _LINUX else _windows_watch if _WINDOWS else None
+        if watch is None or self._watcher is not None:
+            return
+        self.watching = True
+        self._watcher = threading.Thread(target=self._watch, args=(watch,), daemon=True)
+        self._watcher.start()
+
+    def _watch(self, watch):
+        try:
+            watch(self._stop, self._load_quietly)
+        except Exception as e:
+            logger.warning(f"网卡变化监听不可用，改为手动刷新: {e}")
+        self.watching = False
+
+    def refresh(self, force: bool = False):
+        """后台重新读取（没有变化监听或 force=True 时）"""
+        if force or not self.watching:
+            threading.Thread(target=self._load_quietly, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
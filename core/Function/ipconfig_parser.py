@@ -0,0 +1,183 @@
+"""
+ipconfig /all 输出解析：逐行单次扫描，标签通过多语言对照表识别（简体中文、英文、德文），
+不依赖系统语言。
+
+    parse_ipconfig(text) -> [adapter, ...]
+
+adapter 字段：
+    name            标题行，如 "以太网适配器 以太网"、"Ethernet adapter Ethernet"
+    interface       连接名（netsh 使用的名称），如 "以太网"、"Ethernet"
+    description     描述
+    mac             物理地址
+    dhcp_enabled    "是" / "否"
+    ipv4 / netmask  第一个 IPv4 地址及其子网掩码
+    gateway         第一个 IPv4 网关
+    dns1 / dns2     前两个 DNS 服务器（IPv4 优先）
+    ipv4_addresses  全部 IPv4 地址
+    netmasks        与 ipv4_addresses 一一对应的子网掩码
+    ipv6_addresses  全部 IPv6 地址（含本地链接、临时地址，保留 %区域号）
+    gateways        全部网关（IPv4 与 IPv6）
+    dns_servers     全部 DNS 服务器
+    dhcp_server     DHCP 服务器（启用 DHCP 时）
+    media_state     媒体状态（仅在网卡断开时出现）
+"""
+import re
+from typing import Dict, List
+
+# 标签（小写） -> 字段；未收录的标签中含 IPv4 / IPv6 时按地址处理
+_LABELS = {
+    # 简体中文
+    "描述": "description",
+    "物理地址": "mac",
+    "dhcp 已启用": "dhcp",
+    "ipv4 地址": "ipv4",
+    "自动配置 ipv4 地址": "ipv4",
+    "ipv6 地址": "ipv6",
+    "临时 ipv6 地址": "ipv6",
+    "本地链接 ipv6 地址": "ipv6",
+    "子网掩码": "netmask",
+    "默认网关": "gateway",
+    "dns 服务器": "dns",
+    "dhcp 服务器": "dhcp_server",
+    "媒体状态": "media_state",
+    # 英文
+    "description": "description",
+    "physical address": "mac",
+    "dhcp enabled": "dhcp",
+    "ip address": "ipv4",
+    "ipv4 address": "ipv4",
+    "autoconfiguration ipv4 address": "ipv4",
+    "ipv6 address": "ipv6",
+    "temporary ipv6 address": "ipv6",
+    "link-local ipv6 address": "ipv6",
+    "subnet mask": "netmask",
+    "default gateway": "gateway",
+    "dns servers": "dns",
+    "dhcp server": "dhcp_server",
+    "media state": "media_state",
+    # 德文
+    "beschreibung": "description",
+    "physische adresse": "mac",
+    "dhcp aktiviert": "dhcp",
+    "ipv4-adresse": "ipv4",
+    "autokonfiguration ipv4-adresse": "ipv4",
+    "ipv6-adresse": "ipv6",
+    "temporäre ipv6-adresse": "ipv6",
+    "verbindungslokale ipv6-adresse": "ipv6",
+    "subnetzmaske": "netmask",
+    "standardgateway": "gateway",
+    "dns-server": "dns",
+    "dhcp-server": "dhcp_server",
+    "medienstatus": "media_state",
+}
+_YES = {"是", "yes", "ja"}
+# 可以跨多行（后续行只有值）的字段
+_MULTI_LINE = {"gateway", "dns"}
+
+_IPV4_PATTERN = re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}\b')
+_IPV6_PATTERN = re.compile(r'[0-9a-fA-F]{0,4}(?::[0-9a-fA-F]{0,4}){2,7}(?:%\w+)?')
+# 标题行中的连接名："以太网适配器 以太网"、"Wireless LAN adapter Wi-Fi"、"Ethernet-Adapter Ethernet"
+_INTERFACE_PATTERN = re.compile(r'^.*?(?:适配器|[Aa]dapter)\s+(.+)$')
+
+
+def _new_adapter(header: str) -> Dict:
+    match = _INTERFACE_PATTERN.match(header)
+    return {
+        "name": header,
+        "interface": match.group(1).strip() if match else header,
+        "description": "",
+        "mac": "",
+        "dhcp_enabled": "",
+        "ipv4_addresses": [],
+        "netmasks": [],
+        "ipv6_addresses": [],
+        "gateways": [],
+        "dns_servers": [],
+    }
+
+
+def _add_addresses(adapter: Dict, field: str, value: str):
+    """把一行（或续行）中的地址加入 field 对应的列表"""
+    if field == "ipv4":
+        adapter["ipv4_addresses"].extend(_IPV4_PATTERN.findall(value)[:1])
+    elif field == "ipv6":
+        adapter["ipv6_addresses"].extend(_IPV6_PATTERN.findall(value)[:1])
+    elif field == "netmask":
+        adapter["netmasks"].extend(_IPV4_PATTERN.findall(value)[:1])
+    else:
+        target = adapter["gateways"] if field == "gateway" else adapter["dns_servers"]
+        found = _IPV4_PATTERN.findall(value) or _IPV6_PATTERN.findall(value)
+        target.extend(found)
+
+
+def _finish(adapter: Dict) -> Dict:
+    """补齐与旧版兼容的单值字段"""
+    adapter["ipv4"] = adapter["ipv4_addresses"][0] if adapter["ipv4_addresses"] else ""
+    adapter["netmask"] = adapter["netmasks"][0] if adapter["netmasks"] else ""
+    adapter["gateway"] = next((gw for gw in adapter["gateways"] if "." in gw), "")
+    dns = [d for d in adapter["dns_servers"] if "." in d] or adapter["dns_servers"]
+    adapter["dns1"] = dns[0] if dns else ""
+    adapter["dns2"] = dns[1] if len(dns) > 1 else ""
+    return adapter
+
+
+def parse_ipconfig(text: str) -> List[Dict]:
+    """解析 ipconfig /all 的输出，返回每个网卡的信息（字段见模块说明），顺序与输出一致"""
+    adapters = []
+    adapter = None
+    field = None
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if not line[0].isspace():
+            # 顶格且以冒号结尾的是网卡标题行；"Windows IP 配置" 等全局段落不以冒号结尾
+            header = line.rstrip()
+            if header.endswith(":"):
+                if adapter is not None:
+                    adapters.append(_finish(adapter))
+                adapter = _new_adapter(header[:-1].strip())
+            else:
+                if adapter is not None:
+                    adapters.append(_finish(adapter))
+                adapter = None
+            field = None
+            continue
+        if adapter is None:
+            continue
+
+        # "   IPv4 地址 . . . . . . . . . . . . : 192.168.1.23(首选)"：标签与值以 " : " 分隔，
+        # 且分隔符前必须是点引导符，这样续行中的 IPv6 地址（含冒号）不会被误认为标签
+        sep = line.find(" : ")
+        if sep < 0 and line.endswith(" :"):
+            sep = len(line) - 2
+        if sep < 1 or line[sep - 1] != ".":
+            # 续行：只对可以多行的字段有效
+            if field in _MULTI_LINE:
+                _add_addresses(adapter, field, line)
+            continue
+
+        label = line[:sep].rstrip(" .").strip().lower()
+        value = line[sep + 3:].strip()
+        field = _LABELS.get(label)
+        if field is None:
+            if "ipv4" in label:
+                field = "ipv4"
+            elif "ipv6" in label and "dhcp" not in label:
+                field = "ipv6"
+            else:
+                continue
+
+        if field == "description":
+            adapter["description"] = value
+        elif field == "mac":
+            adapter["mac"] = value
+        elif field == "dhcp":
+            adapter["dhcp_enabled"] = "是" if value.lower() in _YES else "否"
+        elif field in ("dhcp_server", "media_state"):
+            adapter[field] = value
+        elif value:
+            _add_addresses(adapter, field, value)
+
+    if adapter is not None:
+        adapters.append(_finish(adapter))
+    return adapters
@@ -0,0 +1,109 @@
+import threading
+from typing import Callable, Dict, Optional
+
+from core.Function.cancel import CancelToken
+from core.Function.resolver import Resolver, shared_resolver
+from core.Function.scheduler import Job, Scheduler, shared_scheduler
+
+import logging
+logger = logging.getLogger(__name__)
+
+# 任务结束时等待反向解析的最长时间（秒）：之后到达的主机名仍会回调，只是不再进入总结
+NAME_WAIT = 3.0
+
+
+class NameEnricher:
+    """
+    NameEnricher: 扫描 / 批量 Ping 结果的附加阶段——对有响应的地址做反向解析（PTR），补上主机名。
+
+    在调度器中作为独立的批量任务运行，最多 concurrency 个同时查询，不占用探测的线程与在途窗口，
+    慢的 DNS 服务器不会拖慢扫描；查询经过 Resolver 的缓存，同一个地址在多个任务之间只查询一次。
+
+    构造：
+        enricher = NameEnricher(resolver=None, concurrency=16, scheduler=None)
+        - resolver: 为 None 时使用全程序共用的 shared_resolver()（测试中可传入 reverse_lookup 为替身的 Resolver）
+        - scheduler: 为 None 时使用全程序共用的 shared_scheduler()
+
+    方法：
+        reset()
+            - 开始新的一批：清空已查到的主机名，上一批尚未完成的查询不再回调
+        submit(address, callback)
+            - 提交一个地址，本批内重复提交的地址忽略
+            - 查到主机名时 callback(address, name) 在调度器线程中调用；没有 PTR 记录时不回调
+        names -> {地址: 主机名}
+            - 本批已查到的主机名（副本）
+        wait(timeout=None)
+            - 等待已提交的查询全部完成，返回是否在 timeout 内完成；期间调用 cancel() 时立即返回 False
+        cancel()
+            - 尚未开始的查询不再进行，正在进行的查询结束后不再回调（系统反向解析无法中断）
+    """
+
+    def __init__(self, resolver: Optional[Resolver] = None, concurrency: int = 16,
+                 scheduler: Optional[Scheduler] = None):
+        self.resolver = resolver or shared_resolver()
+        self.concurrency = max(1, int(concurrency))
+        self.scheduler = scheduler or shared_scheduler()
+        self._job: Optional[Job] = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._token = CancelToken()     # 当前这一批的停止信号，reset() / cancel() 时换新
+        self._seen = set()
+        self._names: Dict[str, str] = {}
+
+    def reset(self):
+        with self._lock:
+            token, self._token = self._token, CancelToken()
+            self._seen = set()
+            self._names = {}
+        token.cancel()
+
+    def submit(self, address: str, callback: Callable[[str, str], None]):
+        with self._lock:
+            if address in self._seen:
+                return
+            self._seen.add(address)
+            if self._job is None:
+                self._job = self.scheduler.job("reverse_dns", limit=self.concurrency)
+            self._pending += 1
+            token = self._token
+            job = self._job
+        job.submit(self._run, address, callback, token)
+
+    def _run(self, address: str, callback, token: CancelToken):
+        try:
+            name = None if token.cancelled else self.resolver.reverse(address)
+            if name and not token.cancelled:
+                with self._lock:
+                    if token is self._token:
+                        self._names[address] = name
+                callback(address, name)
+        except Exception as e:
+            logger.error(f"反向解析 {address} 出错: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._idle.notify_all()
+
+    @property
+    def names(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._names)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        with self._lock:
+            token = self._token
+            # cancel() 时立即返回：正在进行的系统查询无法中断，不等它们结束
+            return self._idle.wait_for(lambda: self._pending == 0 or token.cancelled, timeout) \
+                and not token.cancelled
+
+    def cancel(self):
+        with self._lock:
+            token, self._token = self._token, CancelToken()
+            token.cancel()
+            self._idle.notify_all()
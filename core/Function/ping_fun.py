@@ -1,157 +1,545 @@
-import tkinter as tk
-from tkinter import scrolledtext, messagebox
 import subprocess
-import concurrent.futures
-import threading
+import math
 import re
 import sys
+import logging
+from typing import Optional
+
+from core.Function.task_window import bounded_map
+from core.Function.cancel import CancelToken, kill_process
+from core.Function.checkpoint import ScanCursor
+from core.Function.ping_stats import StreamingStats
+from core.Function.icmp_engine import IcmpPinger
+from core.Function.targets import TargetSet, subnet_of
+from core.Function.events import EventSink, EVENT_DONE
+from core.Function.name_enricher import NameEnricher, NAME_WAIT
+from core.Function.rate_budget import shared_budget
+from core.Function.resolver import ResolveError, shared_resolver
+from core.Function.result_store import ResultStore
+from core.Function.scheduler import shared_scheduler
+
+logger = logging.getLogger(__name__)
+
+_WINDOWS = sys.platform.startswith("win")
+# 回复行中的延迟（中文 / 英文 Windows，Linux / macOS）
+_RTT_PATTERN = re.compile(r'(?:时间|time)\s*[=<]\s*(\d+(?:\.\d+)?)\s*ms', re.IGNORECASE)
+# 未收到回复的探测行（中文 / 英文 Windows）
+_LOSS_PATTERN = re.compile(r'请求超时|无法访问目标|传输失败|一般故障|Request timed out|unreachable|General failure',
+                           re.IGNORECASE)
+
+
+def ping_command(host, count=None, timeout_ms=None, local_ip=None):
+    """生成系统 ping 命令：Windows 使用 -t / -n / -w / -S，Linux / macOS 使用 -c / -W / -I"""
+    if _WINDOWS:
+        command = ['ping', host] + (['-n', str(count)] if count else ['-t'])
+        if timeout_ms:
+            command += ['-w', str(timeout_ms)]
+        if local_ip:
+            command += ['-S', local_ip]
+    else:
+        command = ['ping', host] + (['-c', str(count)] if count else [])
+        if timeout_ms:
+            command += ['-W', str(max(1, math.ceil(timeout_ms / 1000)))]
+        if local_ip:
+            command += ['-I', local_ip]
+    return command
+
 
 class PingFun:
-    def __init__(self, result_box: scrolledtext.ScrolledText):
-        self.result_box = result_box
+    """
+    PingFun: 持续 Ping 与批量 Ping，结果文本和结构化事件写入 EventSink。
+
+    事件：
+        {"type": "reply", "host", "rtt_ms"} / {"type": "loss", "host"}     持续 Ping 的每次探测
+        {"type": "done", "task": "ping", "host", "stats": {...}, "error", "job"}
+        {"type": "ping", "host", "alive", "rtt_ms"}                         批量 Ping 的每个地址
+        {"type": "name", "host", "name"}                                    开启 reverse_dns 时查到的主机名
+        {"type": "done", "task": "batch_ping", "stopped", "subnets": {网段: {"alive", "dead"}},
+         "names": {地址: 主机名}, "error", "job"}
 
-        # Ping 状态和统计
+    store: 可选的 ResultStore。持续 Ping 记为任务 "ping"（每次探测一行，state 为 reply / loss），
+    批量 Ping 记为任务 "batch_ping"（每个地址一行，state 为 alive / dead），port 均为 0。
+    有 store 时批量 Ping 定期写检查点，resume_batch_ping() 从检查点继续已停止或中断的任务。
+
+    budget: 批量 Ping 的发包预算（RateBudget），为 None 时使用全程序共用的 shared_budget()。
+    scheduler: 线程调度器（Scheduler），为 None 时使用全程序共用的 shared_scheduler()；
+    持续 Ping、批量 Ping 的主循环与 ping 子进程探测都在其中执行。
+    resolver: 主机名解析缓存（Resolver），为 None 时使用全程序共用的 shared_resolver()；
+    目标中的主机名在任务开始时解析一次（批量 Ping 并发解析），探测只使用 IP 地址，
+    结果中的 host 为解析得到的地址；无法解析的主机记为不通。
+    reverse_dns: 为 True 时批量 Ping 中存活的地址进入反向解析阶段（NameEnricher，经过 resolver 的缓存），
+    与探测并行、有独立的并发上限，不拖慢批量 Ping；查到的主机名随到随输出，结束时另列一张主机名表。
+
+    停止：stop_ping() / stop_batch_ping() 取消对应的 CancelToken，直接结束正在运行的 ping 子进程、
+    丢弃排队的探测，ICMP 引擎在 STOP_SLICE 内返回；done 事件在 50 ms 量级内输出。
+    """
+
+    def __init__(self, output: EventSink, store: Optional[ResultStore] = None, budget=None, scheduler=None,
+                 resolver=None, reverse_dns=False):
+        self.output = output
+        self.budget = budget or shared_budget()
+        self.scheduler = scheduler or shared_scheduler()
+        self.resolver = resolver or shared_resolver()
+        self.store = store
+        self.job_id = None
+
+        # Ping 状态和统计（常量内存，运行中也可随时查询）
         self.process = None
+        self.ping_task = None
+        self.host = None
         self.stop_flag = False
-        self.sent = 0
-        self.received = 0
-        self.rtts = []
+        self.stats = StreamingStats()
+        self._ping_token = CancelToken()     # 持续 Ping 的停止信号（结束 ping 子进程）
+
+        # 批量 Ping 优先使用进程内 ICMP 引擎，不可用时退回 ping 子进程
+        self.use_native = True
+        self.batch_task = None
+        self._batch_token = CancelToken()    # 批量 Ping 的停止信号
+        self._job = None        # ping 子进程方式的批量探测
+        self._cursor = None     # 有结果库时记录批量 Ping 的进度，用于断点续扫
+        self.reverse_dns = reverse_dns
+        self._enricher = NameEnricher(resolver=self.resolver, scheduler=self.scheduler)
+        self._naming = False    # 本次批量 Ping 是否反查主机名（启动时取 self.reverse_dns）
 
-    def strat_ping(self, host, local_ip=None, callback=None):
-        """开始 ping"""
+    def strat_ping(self, host, local_ip=None, callback=None, count=None):
+        """开始 ping，count 为 None 时持续运行直到 stop_ping()"""
         self.callback = callback
-        self.result_box.delete('1.0', tk.END)
-        self.sent = 0
-        self.received = 0
-        self.rtts.clear()
+        self.host = host
+        self.output.clear()
+        self.stats.reset()
         self.stop_flag = False
+        self._ping_token = token = CancelToken()
 
-        command = ['ping', host, '-t']
-        if local_ip:
-            command += ['-S', local_ip]
-
-        threading.Thread(target=self.ping, args=(command,), daemon=True).start()
+        self.job_id = self.store.begin_job("ping", host) if self.store else None
+        self.ping_task = self.scheduler.spawn(self._run_ping, host, count, local_ip, token)
 
     def stop_ping(self):
-        """手动停止 ping"""
-        if self.process:
-            self.process.terminate()
-            self.result_box.insert(tk.END, "\nPing 已手动停止。\n")
-            self.result_box.see(tk.END)
-            self.process = None
-            self.show_statistics()
-
-    def ping(self, command):
+        """手动停止 ping：结束子进程，读取输出的线程随即收到 EOF 并输出 done 事件"""
+        if self.ping_task is None or self.ping_task.done():
+            return
+        self.stop_flag = True
+        self._ping_token.cancel()
+        self.output.write("\nPing 已手动停止。\n")
+        self.show_statistics()
+
+    def _run_ping(self, host, count, local_ip, token):
+        """在调度器线程中解析目标（使用共用缓存）后启动 ping；无法解析时交给系统 ping 报告错误"""
+        try:
+            address = self.resolver.resolve(host)
+        except ResolveError:
+            address = host
+        self.ping(ping_command(address, count=count, local_ip=local_ip), token)
+
+    def ping(self, command, token=None):
         """执行 ping 命令并处理输出"""
-        rtt_pattern = re.compile(r'时间[=<](\d+)ms', re.IGNORECASE)
+        error = None
+        key = None
         try:
             # 👇关键：隐藏 CMD 窗口
-            creationflags = subprocess.CREATE_NO_WINDOW if sys.platform.startswith("win") else 0
+            creationflags = subprocess.CREATE_NO_WINDOW if _WINDOWS else 0
 
-            self.process = subprocess.Popen(
+            self.process = process = subprocess.Popen(
                 command,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
                 universal_newlines=True,
                 creationflags=creationflags 
             )
-            for line in iter(self.process.stdout.readline, ''):
+            if token is not None:
+                # 停止时直接结束子进程（已停止时立即结束），readline 随即返回 EOF
+                key = token.register(lambda: kill_process(process))
+            for line in iter(process.stdout.readline, ''):
                 if self.stop_flag:
                     break
                 if line:
-                    self.result_box.insert(tk.END, line)
-                    self.result_box.see(tk.END)
-                    self.sent += 1
-                    match = rtt_pattern.search(line)
+                    self.output.write(line)
+                    # 只统计探测结果行（标题行、空行不计入发送数）
+                    match = _RTT_PATTERN.search(line)
                     if match:
-                        self.received += 1
-                        self.rtts.append(float(match.group(1)))
+                        rtt = float(match.group(1))
+                        self.stats.add_reply(rtt)
+                        self.output.emit("reply", host=self.host, rtt_ms=rtt)
+                        self._record(self.host, "reply", rtt)
+                    elif _LOSS_PATTERN.search(line):
+                        self.stats.add_loss()
+                        self.output.emit("loss", host=self.host)
+                        self._record(self.host, "loss")
         except Exception as e:
-            self.result_box.insert(tk.END, f"Ping 失败: {e}\n")
+            error = str(e)
+            self.output.write(f"Ping 失败: {e}\n")
         finally:
-            self.process = None
-            if self.callback:
-                self.callback()
+            try:
+                if self.process is not None:
+                    if token is not None:
+                        token.unregister(key)
+                    kill_process(self.process)
+                    self.process.wait()
+                    self.process.stdout.close()
+                self.process = None
+                self._finish_job("failed" if error else "stopped" if self.stop_flag else "done")
+            finally:
+                # done 事件总是输出，即使结束子进程或写结果库时出错
+                self.output.emit(EVENT_DONE, task="ping", host=self.host, stats=self.stats_event(), error=error,
+                                 job=self.job_id)
+                if self.callback:
+                    self.output.post(self.callback)
+
+    def _record(self, host, state, rtt=None):
+        """追加一行结果到结果库（没有 store 时忽略）"""
+        if self.job_id is not None:
+            self.store.add(self.job_id, host, 0, state, rtt)
+
+    def _finish_job(self, status):
+        if self.job_id is not None:
+            self.store.finish_job(self.job_id, status)
+
+    def stats_event(self):
+        """当前统计的事件形式（直方图上边界 inf 记为 None，便于 JSON 输出）"""
+        snapshot = self.stats.snapshot()
+        snapshot["histogram"] = [[None if math.isinf(bound) else bound, count]
+                                 for bound, count in snapshot["histogram"]]
+        return snapshot
 
     def show_statistics(self):
-        if self.sent == 0:
+        """输出当前统计信息，ping 运行中也可调用"""
+        text = self.stats.format()
+        if not text:
             return
-        loss = (self.sent - self.received) / self.sent * 100
-        stats = f"\n==== Ping 统计 ====\n" \
-                f"发送: {self.sent}，接收: {self.received}，丢包率: {loss:.2f}%\n"
-        if self.rtts:
-            stats += f"最小延迟: {min(self.rtts)} ms，最大延迟: {max(self.rtts)} ms，平均延迟: {sum(self.rtts)/len(self.rtts):.2f} ms\n"
-        self.result_box.insert(tk.END, stats)
-        self.result_box.see(tk.END)
+        self.output.write(f"\n==== Ping 统计 ====\n{text}")
 
     # ================= 批量 Ping =================
-    def start_batch_ping(self, net_prefix, start, end, local_ip=None, callback=None):
+    def start_batch_ping(self, targets, local_ip=None, callback=None):
+        """
+        开始批量 Ping。
+        - targets: 目标表达式，支持 CIDR（任意大小）、跨网段的起止地址、主机名列表，
+          例如 "10.0.0.0/16, 192.168.1.10-192.168.2.20, db01"（见 TargetSet）
+        - 地址惰性生成并流式探测，完成后按 /24 网段汇总存活 / 不通数量
+        """
+        try:
+            target_set = TargetSet(targets)
+        except ValueError as e:
+            self.output.notice("输入错误", str(e))
+            return False
+
         self.callback = callback
         self.stop_flag = False
-        self.result_box.delete('1.0', tk.END)
-        self.result_box.insert(tk.END, f"开始并发 Ping：{net_prefix}{start} - {net_prefix}{end}\n\n")
+        self._batch_token = CancelToken()
+        self.output.clear()
+        self.output.set_progress("")
+        self.output.write(f"开始并发 Ping：{targets}（共 {len(target_set)} 个地址）\n\n")
+        self._naming = self.reverse_dns
+        self.job_id = self.store.begin_job("batch_ping", targets, {"targets": targets, "local_ip": local_ip,
+                                                                   "reverse_dns": self._naming}) \
+            if self.store else None
+        self._start_batch(target_set, local_ip, ScanCursor(), SubnetSummary())
+        return True
+
+    def resume_batch_ping(self, job_id=None, callback=None):
+        """
+        从检查点继续一个已停止（或程序异常退出时中断）的批量 Ping，需要结果库。
+        job_id 为 None 时选择最近一个可以继续的批量 Ping；已探测的地址不会再次探测，
+        网段统计包含之前的结果。
+        """
+        if self.store is None:
+            self.output.notice("提示", "继续批量 Ping 需要结果库。", level="info")
+            return False
+        if self._batch_running():
+            self.output.notice("提示", "批量 Ping 正在运行。", level="info")
+            return False
+        if job_id is None:
+            job_id = self.store.resumable_job("batch_ping")
+        info = self.store.job_info(job_id) if job_id is not None else None
+        if not info or info["kind"] != "batch_ping" or not info["params"] \
+                or info["status"] not in ("stopped", "running"):
+            self.output.notice("提示", "没有可以继续的批量 Ping 任务。", level="info")
+            return False
+        params = info["params"]
+        try:
+            target_set = TargetSet(params["targets"])
+        except ValueError as e:
+            self.output.notice("提示", f"任务 {job_id} 的参数无法恢复: {e}")
+            return False
+
+        self.store.reopen_job(job_id)
+        summary = SubnetSummary()
+        for _, host, _, state, *_ in self.store.iter_results(job_id):
+            summary.add(host, state == "alive")
+        cursor = ScanCursor(info["cursor"], info["done"])
+
+        self.callback = callback
+        self.stop_flag = False
+        self._batch_token = CancelToken()
+        self.output.clear()
+        self.output.set_progress("")
+        self.output.write(f"继续批量 Ping 任务 {job_id}：{params['targets']}"
+                          f"（已完成 {cursor.completed}/{len(target_set)} 个地址）\n\n")
+        self.job_id = job_id
+        self._naming = bool(params.get("reverse_dns"))
+        self._start_batch(target_set, params.get("local_ip"), cursor, summary)
+        return True
+
+    def _start_batch(self, target_set, local_ip, cursor, summary):
+        self._cursor = cursor if self.job_id is not None else None
+        self._enricher.reset()
+        self.batch_task = self.scheduler.spawn(self._concurrent_batch_ping, target_set, local_ip, cursor, summary)
+
+    def _batch_running(self):
+        return bool(self.batch_task and not self.batch_task.done())
 
-        self.batch_thread = threading.Thread(
-            target=self._concurrent_batch_ping, args=(net_prefix, start, end, local_ip), daemon=True)
-        self.batch_thread.start()
+    def checkpoint(self):
+        """立即为运行中的批量 Ping 写一个检查点（例如程序退出前）"""
+        if self._cursor is not None and self._batch_running():
+            self.store.checkpoint(self.job_id, *self._cursor.state())
+
+    def _advance(self, ip):
+        """标记一个地址已完成（结果已加入结果库队列之后），到期时写检查点"""
+        cursor = self._cursor
+        if cursor is None:
+            return
+        cursor.complete(ip)
+        if cursor.due():
+            self.store.checkpoint(self.job_id, *cursor.state())
+
+    def _pending_targets(self, target_set, cursor, addresses, summary):
+        """
+        从检查点开始产出待探测的地址；没有结果库时不记录进度。
+        主机名替换为解析得到的地址（游标登记替换后的地址，与结果一致），解析失败的主机不探测，直接记为不通
+        """
+        ips = target_set.iter_from(cursor.low) if self._cursor is not None else iter(target_set)
+        hostnames = set(target_set.hostnames())
+        if not hostnames:
+            return ips if self._cursor is None else cursor.track(ips)
+        ips = (addresses.get(ip, ip) for ip in ips)
+        if self._cursor is not None:
+            ips = cursor.track(ips)
+        return self._skip_unresolved(ips, hostnames, summary)
+
+    def _skip_unresolved(self, ips, hostnames, summary):
+        for ip in ips:
+            if ip not in hostnames:
+                yield ip
+                continue
+            self.output.write(f"{ip} ❌ 无法解析\n")
+            summary.add(ip, False)
+            self.output.emit("ping", host=ip, alive=False, rtt_ms=None)
+            self._record(ip, "dead")
+            self._advance(ip)
+
+    def _lookup_name(self, ip):
+        """存活的地址提交反向解析，不阻塞探测线程"""
+        if self._naming:
+            self._enricher.submit(ip, self._on_name)
+
+    def _on_name(self, ip, name):
+        self.output.write(f"{ip} 主机名: {name}\n")
+        self.output.emit("name", host=ip, name=name)
+
+    def _resolve_targets(self, target_set):
+        """并发解析目标中的主机名（每个只解析一次，结果进入共用缓存），返回 {主机名: 地址}"""
+        hostnames = target_set.hostnames()
+        if not hostnames:
+            return {}
+        addresses, errors = self.resolver.resolve_all(hostnames, should_stop=self._batch_token)
+        for host in hostnames:
+            if host in addresses:
+                self.output.write(f"{host} → {addresses[host]}\n")
+            elif host in errors:
+                self.output.write(f"{errors[host]}\n")
+        return addresses
 
     def _ping_one_ip(self, ip, local_ip=None):
-        """Ping 单个 IP 地址并返回结果"""
-        if self.stop_flag:
-            return None
+        """Ping 单个 IP 地址，返回 (是否存活, 延迟毫秒, 结果文本)；被停止时均为 None"""
+        token = self._batch_token
+        if token.cancelled:
+            return None, None, None
 
-        command = ['ping', ip, '-n', '1', '-w', '2000']
-        if local_ip:
-            command += ['-S', local_ip]
+        command = ping_command(ip, count=1, timeout_ms=2000, local_ip=local_ip)
+        if not self.budget.acquire(ip, token):
+            return None, None, None
 
+        process = None
+        key = None
         try:
             # 👇 同样隐藏 CMD 窗口
-            creationflags = subprocess.CREATE_NO_WINDOW if sys.platform.startswith("win") else 0
+            creationflags = subprocess.CREATE_NO_WINDOW if _WINDOWS else 0
 
-            result = subprocess.run(
+            process = subprocess.Popen(
                 command,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
-                timeout=2,
                 creationflags=creationflags  # ✅ 加上
             )
+            # 停止时直接结束子进程，communicate 随即返回
+            key = token.register(lambda: kill_process(process))
+            stdout, _ = process.communicate(timeout=2)
+            if token.cancelled:
+                return None, None, None
 
-            if "TTL=" in result.stdout.upper():
-                return f"{ip} ✅ 通\n"
+            if "TTL=" in stdout.upper():
+                match = _RTT_PATTERN.search(stdout)
+                return True, float(match.group(1)) if match else None, f"{ip} ✅ 通\n"
             else:
-                return f"{ip} ❌ 不通\n"
+                return False, None, f"{ip} ❌ 不通\n"
         except subprocess.TimeoutExpired:
-            return f"{ip} ⚠️ 超时\n"
+            return False, None, f"{ip} ⚠️ 超时\n"
         except Exception as e:
-            return f"{ip} 错误: {e}\n"
-
-    def _concurrent_batch_ping(self, net_prefix, start, end, local_ip=None):
-        '''并发批量 Ping'''
-        ip_list = [f"{net_prefix}{i}" for i in range(start, end + 1)]
-        max_workers = min(50, len(ip_list))
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_ip = {executor.submit(self._ping_one_ip, ip, local_ip): ip for ip in ip_list}
-            for future in concurrent.futures.as_completed(future_to_ip):
+            return False, None, f"{ip} 错误: {e}\n"
+        finally:
+            token.unregister(key)
+            if process is not None and process.poll() is None:
+                process.kill()
+                process.communicate()
+            self.budget.release(ip)
+
+    def _concurrent_batch_ping(self, target_set, local_ip, cursor, summary):
+        '''并发批量 Ping；探测出错时同样输出总结与 done 事件（任务记为 stopped，可从检查点继续）'''
+        error = None
+        try:
+            total = len(target_set)
+            addresses = self._resolve_targets(target_set)
+
+            # 在发出任何请求之前打开并绑定 ICMP 套接字：失败时整批改用子进程，不会重复探测已输出的地址；
+            # 开始发送之后的错误直接作为任务出错处理（可从检查点继续）
+            pinger = None
+            if self.use_native and IcmpPinger.available():
+                pinger = IcmpPinger(timeout=2.0, local_ip=local_ip, budget=self.budget)
+                ipv6 = target_set.has_ipv6() or any(":" in address for address in addresses.values())
+                try:
+                    pinger.open(ipv6=ipv6)
+                except OSError as e:
+                    # 例如绑定本地 IP 失败，或有 IPv6 目标但 ICMPv6 套接字不可用
+                    logger.info(f"进程内 ICMP 引擎不可用（{e}），使用 ping 子进程")
+                    pinger = None
+            else:
+                logger.info("ICMP 套接字不可用，使用 ping 子进程")
+
+            ips = self._pending_targets(target_set, cursor, addresses, summary)
+            if pinger is not None:
+                try:
+                    self._native_batch_ping(pinger, ips, total, summary, cursor.completed)
+                finally:
+                    pinger.close()
+            else:
+                self._subprocess_batch_ping(ips, total, summary, local_ip, cursor.completed)
+        except Exception as e:
+            error = str(e)
+            self.output.write(f"\n批量 Ping 出错: {e}\n")
+            raise
+        finally:
+            self._finish_batch(summary, error)
+
+    def _finish_batch(self, summary, error):
+        """输出网段统计与主机名表并结束任务；done 事件总是输出，即使写结果库时出错"""
+        names = {}
+        try:
+            if self._naming:
+                # 反向解析与探测并行，通常已经完成；最多再等 NAME_WAIT 秒，停止时不等待
+                if self.stop_flag or error:
+                    self._enricher.cancel()
+                else:
+                    self._enricher.wait(NAME_WAIT)
+            names = self._enricher.names
+            if error:
+                self.output.write("\n批量 Ping 已中止。\n")
+            elif not self.stop_flag:
+                self.output.write("\n并发批量 Ping 完成。\n")
+            else:
+                self.output.write("\n批量 Ping 已停止。\n")
+            self.output.write(summary.format())
+            if names:
+                self.output.write("\n==== 主机名 ====\n")
+                self.output.write("".join(f"{ip:<20} {name}\n" for ip, name in names.items()))
+            if self._cursor is not None:
+                # 最后一个检查点：停止后继续时从这里开始
+                self.store.checkpoint(self.job_id, *self._cursor.state())
+            self._finish_job("stopped" if self.stop_flag or error else "done")
+        finally:
+            self.output.emit(EVENT_DONE, task="batch_ping", stopped=self.stop_flag,
+                             subnets={subnet: {"alive": alive, "dead": dead}
+                                      for subnet, (alive, dead) in summary.counts.items()},
+                             names=names, error=error, job=self.job_id)
+            if self.callback:
+                self.output.post(self.callback)
+
+    def _native_batch_ping(self, pinger, ips, total, summary, done=0):
+        '''进程内 ICMP 引擎：pinger 已打开套接字，每个地址族一个套接字发送整段地址的回显请求，done 为之前已完成的数量'''
+
+        def on_result(ip, rtt):
+            nonlocal done
+            if rtt is None:
+                self.output.write(f"{ip} ❌ 不通\n")
+            else:
+                self.output.write(f"{ip} ✅ 通 ({rtt:.1f} ms)\n")
+                self._lookup_name(ip)
+            summary.add(ip, rtt is not None)
+            rtt_ms = round(rtt, 3) if rtt is not None else None
+            self.output.emit("ping", host=ip, alive=rtt is not None, rtt_ms=rtt_ms)
+            self._record(ip, "alive" if rtt is not None else "dead", rtt_ms)
+            self._advance(ip)
+            done += 1
+            self.output.set_progress(f"进度: {done}/{total}")
+
+        pinger.sweep(ips, on_result, should_stop=self._batch_token)
+
+    def _subprocess_batch_ping(self, ips, total, summary, local_ip=None, done=0):
+        '''子进程方式：每个地址调用一次系统 ping（兼容无 ICMP 权限的环境），done 为之前已完成的数量'''
+        max_workers = max(1, min(50, total))
+        self._job = job = self.scheduler.job("batch_ping", limit=max_workers)
+        try:
+            for (ip, _), future in bounded_map(job, self._ping_one_ip, ((ip, local_ip) for ip in ips),
+                                               window=max_workers * 2, should_stop=lambda: self.stop_flag):
                 if self.stop_flag:
                     break
-                result = future.result()
+                alive, rtt, result = future.result()
                 if result:
-                    self.result_box.insert(tk.END, result)
-                    self.result_box.see(tk.END)
-
-        if not self.stop_flag:
-            self.result_box.insert(tk.END, "\n并发批量 Ping 完成。\n")
-        else:
-            self.result_box.insert(tk.END, "\n批量 Ping 已停止。\n")
-        self.result_box.see(tk.END)
-        if self.callback:
-            self.callback()
+                    self.output.write(result)
+                    summary.add(ip, alive)
+                    self.output.emit("ping", host=ip, alive=alive, rtt_ms=rtt)
+                    self._record(ip, "alive" if alive else "dead", rtt)
+                    self._advance(ip)
+                    if alive:
+                        self._lookup_name(ip)
+                done += 1
+                self.output.set_progress(f"进度: {done}/{total}")
+        finally:
+            # 丢弃尚未开始的探测；正在运行的 ping 子进程已由 stop_batch_ping 结束
+            job.close()
+            self._job = None
 
     def stop_batch_ping(self):
-        if not self.batch_thread or not self.batch_thread.is_alive():
-            messagebox.showinfo("提示", "当前没有正在运行的批量 Ping。")
+        if not self._batch_running():
+            self.output.notice("提示", "当前没有正在运行的批量 Ping。", level="info")
             return
         self.stop_flag = True
-        self.result_box.insert(tk.END, "\n正在尝试停止批量 Ping...\n")
-        self.result_box.see(tk.END)
+        self._batch_token.cancel()
+        if self._naming:
+            self._enricher.cancel()
+        job = self._job
+        if job is not None:
+            job.cancel()
+        self.output.write("\n正在停止批量 Ping...\n")
+
+
+class SubnetSummary:
+    """按 /24（IPv6 为 /64）网段汇总批量 Ping 的存活 / 不通数量"""
+
+    def __init__(self):
+        self.counts = {}    # 网段 -> [存活, 不通]
+
+    def add(self, ip, alive):
+        subnet = subnet_of(ip)
+        counts = self.counts.setdefault("主机名" if subnet == ip else subnet, [0, 0])
+        counts[0 if alive else 1] += 1
+
+    def format(self):
+        if not self.counts:
+            return ""
+        lines = ["\n==== 网段统计 ====\n"]
+        total_alive = total_dead = 0
+        for subnet, (alive, dead) in self.counts.items():
+            lines.append(f"{subnet:<20} 存活: {alive:<6} 不通: {dead}\n")
+            total_alive += alive
+            total_dead += dead
+        lines.append(f"{'合计':<19} 存活: {total_alive:<6} 不通: {total_dead}\n")
+        return "".join(lines)
@@ -0,0 +1,180 @@
+import math
+import threading
+from typing import Dict, List, Optional, Sequence
+
+
+class P2Quantile:
+    """
+    P2Quantile: P² 算法（Jain & Chlamtac, 1985）流式估计单个分位数。
+
+    只保存 5 个标记点，O(1) 内存、O(1) 更新，不需要保留历史样本。
+    样本数不足 5 个时直接对已有样本排序取值。
+    """
+
+    def __init__(self, p: float):
+        self.p = p
+        self._heights: List[float] = []
+        self._positions = [1, 2, 3, 4, 5]
+        self._desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self._increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x: float):
+        heights = self._heights
+        if len(heights) < 5:
+            heights.append(x)
+            heights.sort()
+            return
+
+        # 1. 找到 x 所在的区间并更新两端极值
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= heights[k + 1]:
+                k += 1
+
+        positions = self._positions
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        # 2. 调整中间三个标记点
+        for i in range(1, 4):
+            d = self._desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or (d <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if d > 0 else -1
+                candidate = self._parabolic(i, step)
+                if not heights[i - 1] < candidate < heights[i + 1]:
+                    candidate = heights[i] + step * (heights[i + step] - heights[i]) / (positions[i + step] - positions[i])
+                heights[i] = candidate
+                positions[i] += step
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self._heights, self._positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self) -> Optional[float]:
+        heights = self._heights
+        if not heights:
+            return None
+        if len(heights) < 5:
+            index = min(len(heights) - 1, max(0, math.ceil(self.p * len(heights)) - 1))
+            return heights[index]
+        return heights[2]
+
+
+class StreamingStats:
+    """
+    StreamingStats: 常量内存的在线延迟统计，适合 `ping -t` 这类无限运行的任务。
+
+    - 发送 / 接收 / 丢包率
+    - 最小 / 最大 / 平均 / 标准差（Welford 在线算法）
+    - 抖动（RFC 3550：相邻两次 RTT 差值的指数平滑，J += (|D| - J) / 16）
+    - p50 / p95 / p99（P² 流式分位数估计）
+    - 固定分桶的延迟直方图
+
+    线程安全：ping 线程调用 add_*，界面线程可随时调用 snapshot() / format() 读取。
+    """
+
+    # 直方图上边界（毫秒），最后一个桶收集所有更大的值
+    BUCKETS: Sequence[float] = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+    QUANTILES: Sequence[float] = (0.5, 0.95, 0.99)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.sent = 0
+            self.received = 0
+            self.min: Optional[float] = None
+            self.max: Optional[float] = None
+            self._mean = 0.0
+            self._m2 = 0.0
+            self.jitter = 0.0
+            self._last: Optional[float] = None
+            self._quantiles = {q: P2Quantile(q) for q in self.QUANTILES}
+            self.histogram = [0] * (len(self.BUCKETS) + 1)
+
+    def add_reply(self, rtt: float):
+        """记录一次收到回复的探测，rtt 单位毫秒"""
+        with self._lock:
+            self.sent += 1
+            self.received += 1
+            n = self.received
+
+            self.min = rtt if self.min is None else min(self.min, rtt)
+            self.max = rtt if self.max is None else max(self.max, rtt)
+            delta = rtt - self._mean
+            self._mean += delta / n
+            self._m2 += delta * (rtt - self._mean)
+
+            if self._last is not None:
+                self.jitter += (abs(rtt - self._last) - self.jitter) / 16
+            self._last = rtt
+
+            for estimator in self._quantiles.values():
+                estimator.add(rtt)
+
+            for index, bound in enumerate(self.BUCKETS):
+                if rtt <= bound:
+                    self.histogram[index] += 1
+                    break
+            else:
+                self.histogram[-1] += 1
+
+    def add_loss(self):
+        """记录一次未收到回复的探测（超时 / 不可达）"""
+        with self._lock:
+            self.sent += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            n = self.received
+            return {
+                "sent": self.sent,
+                "received": n,
+                "loss": (self.sent - n) / self.sent * 100 if self.sent else 0.0,
+                "min": self.min,
+                "max": self.max,
+                "last": self._last,
+                "mean": self._mean if n else None,
+                "stddev": math.sqrt(self._m2 / (n - 1)) if n > 1 else (0.0 if n else None),
+                "jitter": self.jitter if n > 1 else None,
+                "p50": self._quantiles[0.5].value(),
+                "p95": self._quantiles[0.95].value(),
+                "p99": self._quantiles[0.99].value(),
+                "histogram": list(zip(list(self.BUCKETS) + [math.inf], self.histogram)),
+            }
+
+    def format(self) -> str:
+        """格式化为多行文本，供结果框显示"""
+        s = self.snapshot()
+        if s["sent"] == 0:
+            return ""
+        text = f"发送: {s['sent']}，接收: {s['received']}，丢包率: {s['loss']:.2f}%\n"
+        if s["received"]:
+            text += (f"最小延迟: {s['min']:g} ms，最大延迟: {s['max']:g} ms，平均延迟: {s['mean']:.2f} ms，"
+                     f"标准差: {s['stddev']:.2f} ms\n")
+            text += f"p50: {s['p50']:.1f} ms，p95: {s['p95']:.1f} ms，p99: {s['p99']:.1f} ms"
+            if s["jitter"] is not None:
+                text += f"，抖动: {s['jitter']:.2f} ms"
+            text += "\n延迟分布: "
+            lower = 0
+            parts = []
+            for bound, count in s["histogram"]:
+                if count:
+                    label = f">{lower:g}" if math.isinf(bound) else f"≤{bound:g}"
+                    parts.append(f"{label}ms:{count}")
+                lower = bound
+            text += "  ".join(parts) + "\n"
+        return text
@@ -0,0 +1,253 @@
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+
+from core.Function.targets import subnet_of
+
+# 在途数已满时建议的重试间隔（秒）：释放时间未知，短暂等待后重试
+_SLOT_WAIT = 0.005
+
+
+class _Bucket:
+    """令牌桶 + 在途计数；rate / limit 为 0 表示不限制"""
+
+    __slots__ = ("rate", "burst", "tokens", "stamp", "limit", "inflight")
+
+    def __init__(self, rate: float, burst: float, limit: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = now
+        self.limit = limit
+        self.inflight = 0
+
+    def full(self) -> bool:
+        """在途数是否已达上限"""
+        return bool(self.limit) and self.inflight >= self.limit
+
+    def wait(self, now: float) -> float:
+        """补充令牌，返回距离下一个令牌还需等待的秒数，0 表示现在即可"""
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+        return 0.0
+
+    def take(self, slot: bool = True):
+        if self.rate:
+            self.tokens -= 1
+        if slot:
+            self.inflight += 1
+
+    def idle(self) -> bool:
+        return self.inflight == 0 and (not self.rate or self.tokens >= self.burst)
+
+
+@lru_cache(maxsize=65536)
+def _subnet_key(host: str) -> str:
+    return subnet_of(host)
+
+
+class RateBudget:
+    """
+    RateBudget: 所有探测引擎共用的发包预算（令牌桶 + 在途上限），全局与按目标网段各一层。
+
+    端口扫描（async / thread 引擎）、批量 Ping（ICMP 引擎 / ping 子进程）、路由追踪都从同一个
+    预算中取令牌，同时运行多个任务时总速率也不会超过设定值。网段按 subnet_of 划分（IPv4 /24，IPv6 /64）。
+
+    构造 / 配置（0 或 None 表示不限制）：
+        budget = RateBudget(rate=500, inflight=200, subnet_rate=50, subnet_inflight=20)
+        budget.configure(rate=1000)            # 运行中也可以调整，只修改传入的项
+        - rate / subnet_rate: 每秒探测数；burst 为令牌桶容量，默认 rate 的 1/10（至少 1）
+        - inflight / subnet_inflight: 同时在途（已发出、未得到结果）的探测数
+
+    取用：
+        wait = budget.try_acquire(host)        # 非阻塞：0 表示已取得，需在探测结束后 release(host)；
+                                                # 否则返回建议等待的秒数（事件循环引擎使用）
+        budget.acquire(host, should_stop)      # 阻塞直到取得（线程引擎使用），被停止时返回 False
+        budget.release(host)
+        budget.pace(host, should_stop)         # 只按速率取令牌、不占在途名额（路由追踪的成批探测）
+
+    状态：
+        budget.snapshot() -> {"configured": {...}, "rate": 最近 1 秒的探测数, "inflight", "subnets", "throttled", "sent"}
+    """
+
+    def __init__(self, rate: float = 0, inflight: int = 0, subnet_rate: float = 0, subnet_inflight: int = 0,
+                 burst: Optional[float] = None):
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        now = time.monotonic()
+        self._global = _Bucket(0, 1, 0, now)
+        self._subnets: Dict[str, _Bucket] = {}
+        self._subnet_config = (0.0, 1.0, 0)
+        self._limited = False
+        self._burst: Optional[float] = None
+        self.configured: Dict = {}
+
+        # 统计：当前这一秒与上一秒的探测数
+        self._second = int(now)
+        self._this_second = 0
+        self._last_second = 0
+        self.sent = 0
+        self.throttled = 0
+
+        self.configure(rate=rate, inflight=inflight, subnet_rate=subnet_rate, subnet_inflight=subnet_inflight,
+                       burst=burst)
+
+    @staticmethod
+    def _burst_for(rate: float, burst: Optional[float]) -> float:
+        if burst:
+            return max(1.0, float(burst))
+        return max(1.0, rate / 10)
+
+    def configure(self, rate: Optional[float] = None, inflight: Optional[int] = None,
+                  subnet_rate: Optional[float] = None, subnet_inflight: Optional[int] = None,
+                  burst: Optional[float] = None):
+        """修改预算；未传入（None）的项保持不变，传 0 表示取消该项限制"""
+        with self._lock:
+            config = dict(self.configured)
+            for key, value in (("rate", rate), ("inflight", inflight),
+                               ("subnet_rate", subnet_rate), ("subnet_inflight", subnet_inflight)):
+                if value is not None:
+                    config[key] = max(0, value)
+                config.setdefault(key, 0)
+            if burst is not None:
+                self._burst = burst or None
+            self.configured = config
+
+            now = time.monotonic()
+            g = self._global
+            g.rate = float(config["rate"])
+            g.burst = self._burst_for(g.rate, self._burst)
+            g.tokens = min(g.tokens, g.burst) if g.rate else g.burst
+            g.stamp = now
+            g.limit = int(config["inflight"])
+
+            sub_rate = float(config["subnet_rate"])
+            self._subnet_config = (sub_rate, self._burst_for(sub_rate, None), int(config["subnet_inflight"]))
+            for bucket in self._subnets.values():
+                bucket.rate, bucket.burst, bucket.limit = self._subnet_config
+                bucket.tokens = min(bucket.tokens, bucket.burst)
+            if not (sub_rate or config["subnet_inflight"]):
+                self._subnets.clear()
+            self._limited = bool(g.rate or g.limit or sub_rate or config["subnet_inflight"])
+            self._released.notify_all()
+
+    def _count(self, now: float):
+        second = int(now)
+        if second != self._second:
+            self._last_second = self._this_second if second == self._second + 1 else 0
+            self._second = second
+            self._this_second = 0
+        self._this_second += 1
+        self.sent += 1
+
+    def _attempt(self, host: str, reserve: bool = False, slot: bool = True) -> float:
+        """
+        在锁内调用：取得返回 0；在途已满返回负数（未取得）；速率不足返回需等待的秒数。
+        在途上限先于速率检查：无论是否 reserve，在途已满时都不取令牌、不占名额。
+        reserve 为 True 时速率不足也直接预约令牌（令牌数可为负），调用方等待返回的秒数后发出，
+        阻塞等待的线程各自按预约时间醒来，不会同时被唤醒争抢。
+        slot 为 False 时只取速率令牌，不检查也不占用在途名额（pace）
+        """
+        now = time.monotonic()
+        if not self._limited:
+            if slot:
+                self._global.inflight += 1
+            self._count(now)
+            return 0.0
+        buckets = [self._global]
+        if self._subnet_config[0] or self._subnet_config[2]:
+            key = _subnet_key(host)
+            sub = self._subnets.get(key)
+            if sub is None:
+                rate, burst, limit = self._subnet_config
+                sub = self._subnets[key] = _Bucket(rate, burst, limit, now)
+            buckets.append(sub)
+        if slot and any(bucket.full() for bucket in buckets):
+            self.throttled += 1
+            return -_SLOT_WAIT
+        wait = max(bucket.wait(now) for bucket in buckets)
+        if wait > 0:
+            self.throttled += 1
+            if not reserve:
+                # 非阻塞取用：令牌到位之前不发出
+                return wait
+        for bucket in buckets:
+            bucket.take(slot)
+        self._count(now)
+        return wait
+
+    def try_acquire(self, host: str) -> float:
+        with self._lock:
+            return abs(self._attempt(host))
+
+    def acquire(self, host: str, should_stop: Optional[Callable[[], bool]] = None) -> bool:
+        return self._acquire(host, should_stop, slot=True)
+
+    def _acquire(self, host: str, should_stop: Optional[Callable[[], bool]], slot: bool) -> bool:
+        while True:
+            with self._lock:
+                wait = self._attempt(host, reserve=True, slot=slot)
+                if wait < 0:
+                    # 在途已满：等待 release 唤醒（每次释放只唤醒一个等待者）
+                    self._released.wait(0.05)
+            if wait >= 0:
+                break
+            if should_stop and should_stop():
+                return False
+        # 已预约：等到预约的时间再发出，期间被停止时归还名额
+        deadline = time.monotonic() + wait
+        while wait > 0:
+            if should_stop and should_stop():
+                if slot:
+                    self.release(host)
+                return False
+            time.sleep(min(wait, 0.05))
+            wait = deadline - time.monotonic()
+        return True
+
+    def release(self, host: str):
+        with self._lock:
+            g = self._global
+            if g.inflight > 0:
+                g.inflight -= 1
+            if self._subnets:
+                key = _subnet_key(host)
+                sub = self._subnets.get(key)
+                if sub is not None:
+                    if sub.inflight > 0:
+                        sub.inflight -= 1
+                    # 空闲且令牌已满的网段不再保留，大范围扫描时字典不会无限增长
+                    sub.wait(time.monotonic())
+                    if sub.idle():
+                        del self._subnets[key]
+            if self._limited:
+                self._released.notify()
+
+    def pace(self, host: str, should_stop: Optional[Callable[[], bool]] = None) -> bool:
+        return self._acquire(host, should_stop, slot=False)
+
+    def current_rate(self) -> int:
+        """最近一个完整秒内的探测数"""
+        with self._lock:
+            second = int(time.monotonic())
+            if second == self._second:
+                return self._last_second
+            return self._this_second if second == self._second + 1 else 0
+
+    def snapshot(self) -> Dict:
+        rate = self.current_rate()
+        with self._lock:
+            return {"configured": dict(self.configured), "rate": rate, "inflight": self._global.inflight,
+                    "subnets": len(self._subnets), "throttled": self.throttled, "sent": self.sent}
+
+
+_shared = RateBudget()
+
+
+def shared_budget() -> RateBudget:
+    """程序内所有引擎默认共用的预算（默认不限制，由界面 / 命令行配置）"""
+    return _shared
@@ -0,0 +1,203 @@
+import ipaddress
+import socket
+import threading
+import time
+import concurrent.futures
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from core.Function.scheduler import Scheduler, shared_scheduler
+
+import logging
+logger = logging.getLogger(__name__)
+
+# 系统解析接口不返回记录的 TTL，缓存按固定时间过期（秒）
+DEFAULT_TTL = 300.0
+# 解析失败的缓存时间（秒）：短时间内不重复查询不存在的名字
+DEFAULT_NEGATIVE_TTL = 30.0
+# 缓存条目超过该数量时清理过期条目
+_PURGE_SIZE = 4096
+# 反向解析（PTR）在缓存键中使用的 family 标记
+_PTR = -1
+
+
+class ResolveError(OSError):
+    """主机名无法解析"""
+
+
+def is_literal(host: str) -> bool:
+    """host 是否为 IP 地址字面量（不需要解析）"""
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+def system_lookup(host: str, family: int) -> str:
+    """
+    系统解析（getaddrinfo）。family 为 AF_UNSPEC 时优先返回 IPv4 地址，
+    与之前直接 connect((主机名, 端口)) 的 IPv4 套接字行为一致，只有 IPv6 地址的名字也能解析
+    """
+    infos = socket.getaddrinfo(host, None, family, socket.SOCK_STREAM)
+    for info in infos:
+        if info[0] == socket.AF_INET:
+            return info[4][0]
+    return infos[0][4][0]
+
+
+def system_reverse(address: str) -> Optional[str]:
+    """系统反向解析（gethostbyaddr），返回 PTR 记录中的主机名；没有记录时抛出 OSError（socket.herror）"""
+    return socket.gethostbyaddr(address)[0]
+
+
+class Resolver:
+    """
+    Resolver: 主机名解析层，带 TTL 缓存与失败缓存，扫描、批量 Ping、路由追踪共用。
+
+    扫描等任务在开始时把目标中的主机名解析一次（多个主机名并发解析），之后探测引擎只使用 IP 地址，
+    不会每个端口 / 每个探测都重新解析。IP 地址字面量直接返回，不查询也不缓存。
+
+    构造：
+        resolver = Resolver(ttl=300, negative_ttl=30, concurrency=16, scheduler=None, lookup=None,
+                            reverse_lookup=None)
+        - ttl / negative_ttl: 解析结果 / 解析失败的缓存时间（秒）
+        - concurrency: resolve_all 同时进行的解析数，在调度器（scheduler 为 None 时为 shared_scheduler()）中执行
+        - lookup(host, family) -> 地址: 可替换的解析函数（测试中使用本地替身），默认 getaddrinfo
+        - reverse_lookup(address) -> 主机名: 可替换的反向解析函数，默认 gethostbyaddr
+
+    方法：
+        resolve(host, family=socket.AF_UNSPEC) -> 地址
+            - 命中缓存直接返回；同一个名字同时被多个线程解析时只查询一次
+            - 无法解析时抛出 ResolveError（OSError 的子类）
+        resolve_all(hosts, family=socket.AF_UNSPEC, should_stop=None) -> ({主机名: 地址}, {主机名: 错误信息})
+            - 并发解析，阻塞直到全部完成；被停止时未开始的解析不再进行
+        reverse(address) -> 主机名或 None
+            - 反向解析（PTR），与正向解析共用缓存与同名合并；没有记录或查询失败时返回 None
+        clear()
+        stats() -> {"entries", "hits", "misses", "negative_hits"}
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+                 concurrency: int = 16, scheduler: Optional[Scheduler] = None,
+                 lookup: Optional[Callable[[str, int], str]] = None,
+                 reverse_lookup: Optional[Callable[[str], Optional[str]]] = None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.concurrency = max(1, int(concurrency))
+        self.scheduler = scheduler or shared_scheduler()
+        self.lookup = lookup or system_lookup
+        self.reverse_lookup = reverse_lookup or system_reverse
+        self._lock = threading.Lock()
+        # (小写主机名, family) -> (过期时间, 地址, 错误信息)；地址为 None 表示解析失败
+        # 反向解析的键为 (地址, _PTR)，值中的“地址”为主机名
+        self._cache: Dict[Tuple[str, int], Tuple[float, Optional[str], Optional[str]]] = {}
+        # 正在解析的名字，后来的线程等待同一个结果
+        self._inflight: Dict[Tuple[str, int], concurrent.futures.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+
+    def resolve(self, host: str, family: int = socket.AF_UNSPEC) -> str:
+        host = host.strip()
+        if is_literal(host):
+            return host
+        address, error = self._cached((host.lower().rstrip("."), family), host, lambda: self.lookup(host, family))
+        if address is None:
+            raise ResolveError(f"无法解析 {host}: {error}")
+        return address
+
+    def reverse(self, address: str) -> Optional[str]:
+        address = address.strip()
+        name, _ = self._cached((address, _PTR), address, lambda: self.reverse_lookup(address))
+        return name or None
+
+    def _cached(self, key: Tuple[str, int], host: str, lookup: Callable[[], Optional[str]]) \
+            -> Tuple[Optional[str], Optional[str]]:
+        """查缓存，未命中时查询一次（同一个键同时只有一个线程查询），返回 (结果, 错误信息)"""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                if entry[1] is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                return entry[1], entry[2]
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = self._inflight[key] = concurrent.futures.Future()
+        if owner:
+            self._lookup(host, key, lookup, future)
+        return future.result()
+
+    def _lookup(self, host: str, key: Tuple[str, int], lookup: Callable[[], Optional[str]],
+                future: concurrent.futures.Future):
+        try:
+            address, error = lookup(), None
+        except (OSError, UnicodeError) as e:
+            address, error = None, str(e)
+        except Exception as e:
+            logger.error(f"解析 {host} 出错: {e}")
+            address, error = None, str(e)
+        ttl = self.ttl if address is not None else self.negative_ttl
+        with self._lock:
+            now = time.monotonic()
+            if len(self._cache) >= _PURGE_SIZE:
+                # 长时间运行时清理过期的条目，缓存不会无限增长
+                self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+            self._cache[key] = (now + ttl, address, error)
+            del self._inflight[key]
+        future.set_result((address, error))
+
+    def resolve_all(self, hosts: Iterable[str], family: int = socket.AF_UNSPEC,
+                    should_stop: Optional[Callable[[], bool]] = None) -> Tuple[Dict[str, str], Dict[str, str]]:
+        hosts = list(dict.fromkeys(host for host in hosts if not is_literal(host)))
+        addresses: Dict[str, str] = {}
+        errors: Dict[str, str] = {}
+        if not hosts:
+            return addresses, errors
+
+        def run(host):
+            if should_stop and should_stop():
+                return
+            try:
+                addresses[host] = self.resolve(host, family)
+            except ResolveError as e:
+                errors[host] = str(e)
+
+        if len(hosts) == 1:
+            run(hosts[0])
+            return addresses, errors
+        job = self.scheduler.job("resolve", limit=self.concurrency)
+        try:
+            for future in [job.submit(run, host) for host in hosts]:
+                try:
+                    future.result()
+                except concurrent.futures.CancelledError:
+                    pass
+        finally:
+            job.close()
+        return addresses, errors
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses,
+                    "negative_hits": self.negative_hits}
+
+
+_shared: Optional[Resolver] = None
+_shared_lock = threading.Lock()
+
+
+def shared_resolver() -> Resolver:
+    """程序内所有功能共用的解析缓存"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Resolver()
+        return _shared
@@ -0,0 +1,456 @@
+import csv
+import json
+import sqlite3
+import threading
+import time
+from collections import deque, namedtuple
+from typing import IO, Dict, Iterator, List, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+# 结果文件格式
+EXPORT_CSV = "csv"
+EXPORT_JSONL = "jsonl"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind     TEXT NOT NULL,
+    target   TEXT NOT NULL,
+    started  REAL NOT NULL,
+    finished REAL,
+    status   TEXT NOT NULL DEFAULT 'running',
+    base     INTEGER,
+    params   TEXT,
+    cursor   INTEGER,
+    done     TEXT,
+    mark     INTEGER
+);
+CREATE TABLE IF NOT EXISTS results (
+    job_id  INTEGER NOT NULL,
+    host    TEXT NOT NULL,
+    port    INTEGER NOT NULL,
+    state   TEXT NOT NULL,
+    rtt_ms  REAL,
+    ts      REAL NOT NULL,
+    service TEXT,
+    banner  TEXT
+);
+CREATE INDEX IF NOT EXISTS results_key ON results (job_id, host, port);
+CREATE TABLE IF NOT EXISTS changes (
+    job_id    INTEGER NOT NULL,
+    host      TEXT NOT NULL,
+    port      INTEGER NOT NULL,
+    old_state TEXT,
+    new_state TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_job ON changes (job_id);
+DROP INDEX IF EXISTS results_job;
+"""
+# 任务结束时与基线任务（同一 kind + target 上一次完成的任务）比较，把变化写入 changes：
+# 每个 (host, port) 只取该任务中最后一次的状态；old_state 为 NULL 表示新出现，new_state 为 NULL 表示消失
+_LATEST = "SELECT host, port, state, MAX(rowid) FROM results WHERE job_id = {} GROUP BY host, port"
+_RECORD_CHANGES = f"""
+WITH cur AS ({_LATEST.format(":job")}), prev AS ({_LATEST.format(":base")})
+INSERT INTO changes (job_id, host, port, old_state, new_state)
+SELECT :job, cur.host, cur.port, prev.state, cur.state
+  FROM cur LEFT JOIN prev ON prev.host = cur.host AND prev.port = cur.port
+ WHERE prev.state IS NOT cur.state
+UNION ALL
+SELECT :job, prev.host, prev.port, prev.state, NULL
+  FROM prev LEFT JOIN cur ON cur.host = prev.host AND cur.port = prev.port
+ WHERE cur.host IS NULL
+"""
+# 不在同一条基线链上的两个任务：直接比较两次的结果（与结果行数成正比）
+_FULL_DIFF = f"""
+WITH a AS ({_LATEST.format(":a")}), b AS ({_LATEST.format(":b")})
+SELECT b.host, b.port, a.state, b.state
+  FROM b LEFT JOIN a ON a.host = b.host AND a.port = b.port
+ WHERE a.state IS NOT b.state
+UNION ALL
+SELECT a.host, a.port, a.state, NULL
+  FROM a LEFT JOIN b ON b.host = a.host AND b.port = a.port
+ WHERE b.host IS NULL
+"""
+_COLUMNS = ("job_id", "host", "port", "state", "rtt_ms", "ts", "service", "banner")
+
+# 写入队列中的任务结束标记、检查点与关闭标记
+_Finish = namedtuple("_Finish", "job_id status ts")
+_Checkpoint = namedtuple("_Checkpoint", "job_id cursor done")
+_CLOSE = object()
+
+
+class ResultStore:
+    """
+    ResultStore: 探测结果的追加式存储（SQLite，WAL 模式）。
+
+    - 每次扫描 / 批量 Ping / 路由追踪是一个任务（job），begin_job() 返回任务编号
+    - add() 只把一行结果追加到内存队列，由后台写入线程每 flush_interval 秒取出，
+      每 batch_size 行一个事务批量写入，探测循环不会因磁盘写入变慢
+    - WAL 模式下读写互不阻塞：任务运行期间也可以 export() 已写入的结果，
+      按游标分批读取直接写到文件，结果再多也不需要全部放进内存
+
+    用法：
+        store = ResultStore("results.db")
+        job = store.begin_job("scan", "10.0.0.0/24 22,80")
+        store.add(job, "10.0.0.1", 22, "open", 0.8)
+        store.finish_job(job, "done")
+        with open("out.csv", "w", newline="", encoding="utf-8") as f:
+            store.export(job, f, "csv")
+        store.close()
+
+    同一 kind + target 的任务（例如每天同一网段的扫描）结束时会记录与上一次的变化，
+    diff() 据此给出任意两次之间新出现、消失和状态变化的主机 / 端口。
+
+    断点续扫：任务运行中定期 checkpoint() 记录目标空间上的游标（见 ScanCursor），
+    检查点与它之前的结果行在同一个事务中写入，并记下此时结果行的 rowid（mark）。
+    停止或崩溃后 reopen_job() 删除 mark 之后写入的结果行、把任务恢复为运行中，
+    探测从检查点继续，不会重复探测也不会留下重复的结果行。
+
+    结果行：job_id, host, port, state, rtt_ms, ts, service, banner
+    （port 对 Ping 为 0，对路由追踪为跳数；service / banner 为开放端口识别出的服务，未识别时为空）
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000, flush_interval: float = 0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # 任务登记与查询使用的连接（任意线程，加锁使用）；结果行只由写入线程写入
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+        self._pending: deque = deque()
+        self._wake = threading.Event()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="result-store", daemon=True)
+        self._writer.start()
+
+    def _migrate(self):
+        """旧版结果库缺少的列：jobs.base / params / cursor / done / mark、results.service / banner"""
+        added = {"jobs": ("base INTEGER", "params TEXT", "cursor INTEGER", "done TEXT", "mark INTEGER"),
+                 "results": ("service TEXT", "banner TEXT")}
+        for table, definitions in added.items():
+            columns = [row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")]
+            if not columns:
+                continue
+            for definition in definitions:
+                if definition.split()[0] not in columns:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
+        self._conn.commit()
+
+    # -------------------------
+    # 写入
+    # -------------------------
+    def begin_job(self, kind: str, target: str, params: Optional[Dict] = None) -> int:
+        """登记一个新任务，返回任务编号；params 为恢复任务所需的参数（可续扫的任务才需要）"""
+        with self._lock:
+            cursor = self._conn.execute("INSERT INTO jobs (kind, target, started, params) VALUES (?, ?, ?, ?)",
+                                        (kind, target, time.time(),
+                                         json.dumps(params, ensure_ascii=False) if params is not None else None))
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def add(self, job_id: int, host: str, port: int, state: str, rtt_ms: Optional[float] = None,
+            service: Optional[str] = None, banner: Optional[str] = None):
+        """追加一行结果：只追加到内存队列（deque.append 无需加锁），不等待写入"""
+        self._pending.append((job_id, host, port, state, rtt_ms, time.time(), service, banner))
+
+    def finish_job(self, job_id: int, status: str = "done"):
+        """任务结束；在该任务已入队的结果全部写入之后才更新状态"""
+        self._pending.append(_Finish(job_id, status, time.time()))
+        self._wake.set()
+
+    def checkpoint(self, job_id: int, cursor: int, done: List[int]):
+        """记录任务的游标（低水位 cursor 与其后已完成的编号 done），与此前加入的结果在同一事务中写入"""
+        self._pending.append(_Checkpoint(job_id, cursor, json.dumps(done)))
+
+    def _write_loop(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        closing = False
+        while not closing:
+            # 每 flush_interval 秒（或有任务结束 / flush / close 时立即）把队列中的结果批量写入
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            rows: List[tuple] = []
+            finished: List[_Finish] = []
+            waiters: List[threading.Event] = []
+            while self._pending:
+                item = self._pending.popleft()
+                if type(item) is tuple:
+                    rows.append(item)
+                    if len(rows) >= self.batch_size:
+                        self._commit(conn, rows, finished)
+                        rows = []
+                elif isinstance(item, _Finish):
+                    finished.append(item)
+                elif isinstance(item, _Checkpoint):
+                    # 检查点只覆盖它之前的结果：先与这些结果一起提交
+                    self._commit(conn, rows, finished, item)
+                    rows = []
+                elif item is _CLOSE:
+                    closing = True
+                else:
+                    waiters.append(item)
+            self._commit(conn, rows, finished)
+            for waiter in waiters:
+                waiter.set()
+        conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, rows: List[tuple], finished: List["_Finish"],
+                checkpoint: Optional["_Checkpoint"] = None):
+        if not rows and not finished and checkpoint is None:
+            return
+        # 结果行与检查点单独一个事务：记录变化出错时不会连带丢弃
+        try:
+            with conn:
+                if rows:
+                    conn.executemany(f"INSERT INTO results ({', '.join(_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                if checkpoint is not None:
+                    # 写入线程是唯一插入结果的连接，此时最大的 rowid 即检查点覆盖到的最后一行
+                    conn.execute("UPDATE jobs SET cursor = ?, done = ?, "
+                                 "mark = (SELECT IFNULL(MAX(rowid), 0) FROM results) WHERE id = ?",
+                                 (checkpoint.cursor, checkpoint.done, checkpoint.job_id))
+        except sqlite3.Error as e:
+            jobs = sorted({row[0] for row in rows} | ({checkpoint.job_id} if checkpoint is not None else set()))
+            logger.error(f"任务 {jobs} 结果写入失败（丢弃 {len(rows)} 行）: {e}")
+        for item in finished:
+            self._finish(conn, item)
+        finished.clear()
+
+    def _finish(self, conn: sqlite3.Connection, item: "_Finish"):
+        """登记任务结束并记录与基线的变化；记录变化出错时仍然登记结束，不设基线，diff 退回逐行比较"""
+        job_id, status, ts = item
+        try:
+            with conn:
+                base = self._find_base(conn, job_id)
+                conn.execute("UPDATE jobs SET finished = ?, status = ?, base = ? WHERE id = ?",
+                             (ts, status, base, job_id))
+                # 续扫的任务会再次结束，先清除上次记录的变化
+                conn.execute("DELETE FROM changes WHERE job_id = ?", (job_id,))
+                if base is not None:
+                    conn.execute(_RECORD_CHANGES, {"job": job_id, "base": base})
+            return
+        except sqlite3.Error as e:
+            logger.error(f"任务 {job_id} 记录变化失败，比较时将逐行比较结果: {e}")
+        try:
+            with conn:
+                conn.execute("DELETE FROM changes WHERE job_id = ?", (job_id,))
+                conn.execute("UPDATE jobs SET finished = ?, status = ?, base = NULL WHERE id = ?",
+                             (ts, status, job_id))
+        except sqlite3.Error as e:
+            logger.error(f"任务 {job_id} 结束状态写入失败: {e}")
+
+    @staticmethod
+    def _find_base(conn: sqlite3.Connection, job_id: int) -> Optional[int]:
+        """同一 kind + target 在 job_id 之前最近一次完成（done）的任务"""
+        row = conn.execute(
+            "SELECT MAX(p.id) FROM jobs j JOIN jobs p ON p.kind = j.kind AND p.target = j.target "
+            "WHERE j.id = ? AND p.id < j.id AND p.status = 'done'", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待此前加入的结果全部写入，返回是否在 timeout 内完成"""
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._pending.append(done)
+        self._wake.set()
+        return done.wait(timeout)
+
+    def close(self):
+        """写完剩余结果并关闭"""
+        if self._closed:
+            return
+        self._closed = True
+        self._pending.append(_CLOSE)
+        self._wake.set()
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+    # -------------------------
+    # 读取与导出
+    # -------------------------
+    def jobs(self, limit: int = 50) -> List[Dict]:
+        """最近的任务（新的在前）"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT id, kind, target, started, finished, status FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+            names = [c[0] for c in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def latest_job(self, kind: Optional[str] = None) -> Optional[int]:
+        with self._lock:
+            if kind:
+                row = self._conn.execute("SELECT MAX(id) FROM jobs WHERE kind = ?", (kind,)).fetchone()
+            else:
+                row = self._conn.execute("SELECT MAX(id) FROM jobs").fetchone()
+            return row[0]
+
+    def job_info(self, job_id: int) -> Optional[Dict]:
+        """任务信息：id, kind, target, status, params（dict 或 None）, cursor, done（检查点）"""
+        # 先等待已入队的检查点 / 任务结束写入，读到的是最新进度
+        self.flush(timeout=5)
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT id, kind, target, status, params, cursor, done FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            info = dict(zip([c[0] for c in cursor.description], row))
+        info["params"] = json.loads(info["params"]) if info["params"] else None
+        info["cursor"] = info["cursor"] or 0
+        info["done"] = json.loads(info["done"]) if info["done"] else []
+        return info
+
+    def resumable_job(self, kind: str) -> Optional[int]:
+        """最近一个可以续扫的任务（已停止，或仍标记为运行中即上次程序异常退出），没有时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(id) FROM jobs WHERE kind = ? AND status IN ('stopped', 'running') "
+                "AND params IS NOT NULL", (kind,)).fetchone()
+            return row[0]
+
+    def reopen_job(self, job_id: int):
+        """
+        准备续扫：删除最后一个检查点之后写入的结果行（这些目标会重新探测），把任务恢复为运行中。
+        没有检查点的任务从头开始，已写入的结果全部删除。
+        """
+        self.flush(timeout=5)
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM results WHERE job_id = ? AND rowid > (SELECT IFNULL(mark, 0) FROM jobs WHERE id = ?)",
+                    (job_id, job_id))
+                self._conn.execute("DELETE FROM changes WHERE job_id = ?", (job_id,))
+                self._conn.execute("UPDATE jobs SET status = 'running', finished = NULL, base = NULL WHERE id = ?",
+                                   (job_id,))
+
+    def previous_job(self, job_id: int) -> Optional[int]:
+        """job_id 的基线任务（同一 kind + target 上一次完成的任务），没有时返回 None"""
+        with self._lock:
+            row = self._conn.execute("SELECT base, finished FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None:
+                return row[0]
+            # 任务仍在运行，基线尚未登记
+            return self._find_base(self._conn, job_id)
+
+    def diff(self, old_job: int, new_job: int) -> Dict:
+        """
+        比较两个任务的结果，返回：
+            {"old_job": old_job, "new_job": new_job,
+             "new":     [{"host", "port", "state"}, ...],       # 只在 new_job 中出现
+             "gone":    [{"host", "port", "state"}, ...],       # 只在 old_job 中出现（state 为原状态）
+             "changed": [{"host", "port", "old", "new"}, ...]}  # 状态变化
+        同一 kind + target 的任务在结束时已逐次记录了与上一次的变化，沿基线链合并这些变化即可，
+        耗时只与两次之间的变化数量有关；不在同一条链上的两个任务才逐行比较全部结果。
+        """
+        self.flush(timeout=5)
+        if old_job == new_job:
+            changes: Dict = {}
+        else:
+            changes = self._chain_changes(old_job, new_job)
+            if changes is None:
+                reverse = self._chain_changes(new_job, old_job)
+                if reverse is not None:
+                    changes = {key: (new, old) for key, (old, new) in reverse.items()}
+                else:
+                    changes = self._full_changes(old_job, new_job)
+
+        result = {"old_job": old_job, "new_job": new_job, "new": [], "gone": [], "changed": []}
+        for (host, port), (old, new) in sorted(changes.items()):
+            if old == new:
+                continue
+            if old is None:
+                result["new"].append({"host": host, "port": port, "state": new})
+            elif new is None:
+                result["gone"].append({"host": host, "port": port, "state": old})
+            else:
+                result["changed"].append({"host": host, "port": port, "old": old, "new": new})
+        return result
+
+    def _chain_changes(self, old_job: int, new_job: int) -> Optional[Dict]:
+        """old_job 在 new_job 的基线链上时，合并链上每个任务记录的变化：(host, port) -> (最早的旧状态, 最新状态)"""
+        with self._lock:
+            chain = []
+            job = new_job
+            while job is not None and job > old_job:
+                row = self._conn.execute("SELECT base, finished FROM jobs WHERE id = ?", (job,)).fetchone()
+                if row is None or row[1] is None:
+                    return None
+                chain.append(job)
+                job = row[0]
+            if job != old_job:
+                return None
+            merged: Dict = {}
+            for job in reversed(chain):
+                cursor = self._conn.execute(
+                    "SELECT host, port, old_state, new_state FROM changes WHERE job_id = ?", (job,))
+                for host, port, old, new in cursor:
+                    key = (host, port)
+                    if key in merged:
+                        merged[key] = (merged[key][0], new)
+                    else:
+                        merged[key] = (old, new)
+            return merged
+
+    def _full_changes(self, old_job: int, new_job: int) -> Dict:
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            cursor = conn.execute(_FULL_DIFF, {"a": old_job, "b": new_job})
+            return {(host, port): (old, new) for host, port, old, new in cursor}
+        finally:
+            conn.close()
+
+    def iter_results(self, job_id: int, chunk: int = 5000) -> Iterator[tuple]:
+        """按写入顺序逐批读取一个任务的结果（使用独立连接，不影响写入）"""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM results WHERE job_id = ? ORDER BY rowid",
+                                  (job_id,))
+            while True:
+                rows = cursor.fetchmany(chunk)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+
+    def export(self, job_id: int, fp: IO[str], fmt: str = EXPORT_CSV) -> int:
+        """把一个任务当前已写入的结果写到文本文件 fp（CSV 或 JSON Lines），返回行数"""
+        if fmt not in (EXPORT_CSV, EXPORT_JSONL):
+            raise ValueError(f"不支持的导出格式: {fmt}")
+        count = 0
+        writer = None
+        if fmt == EXPORT_CSV:
+            writer = csv.writer(fp)
+            writer.writerow(_COLUMNS)
+        for row in self.iter_results(job_id):
+            if writer:
+                writer.writerow(row)
+            else:
+                fp.write(json.dumps(dict(zip(_COLUMNS, row)), ensure_ascii=False) + "\n")
+            count += 1
+        return count
+
+
+def format_diff(diff: Dict) -> str:
+    """把 ResultStore.diff() 的结果格式化为文本"""
+    lines = [f"任务 {diff['old_job']} → 任务 {diff['new_job']}："
+             f"新增 {len(diff['new'])}，消失 {len(diff['gone'])}，变化 {len(diff['changed'])}"]
+    for item in diff["new"]:
+        lines.append(f"  + {item['host']}:{item['port']}  {item['state']}")
+    for item in diff["gone"]:
+        lines.append(f"  - {item['host']}:{item['port']}  {item['state']}")
+    for item in diff["changed"]:
+        lines.append(f"  * {item['host']}:{item['port']}  {item['old']} → {item['new']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,120 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from core.Function.targets import subnet_of
+
+
+class RttEstimator:
+    """
+    RttEstimator: 按 RFC 6298（TCP 重传定时器）维护单个目标的 SRTT / RTTVAR。
+
+        首个样本:  SRTT = R, RTTVAR = R / 2
+        后续样本:  RTTVAR = (1 - beta) * RTTVAR + beta * |SRTT - R|
+                   SRTT   = (1 - alpha) * SRTT + alpha * R
+        超时时间:  RTO = SRTT + K * RTTVAR
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+
+    def __init__(self):
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+        self.samples = 0
+
+    def observe(self, rtt: float):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.samples += 1
+
+    def rto(self) -> Optional[float]:
+        if self.srtt is None:
+            return None
+        return self.srtt + self.K * self.rttvar
+
+
+class AdaptivePacer:
+    """
+    AdaptivePacer: 端口扫描的自适应超时与并发控制。
+
+    超时：
+        - 每个目标主机一个 RttEstimator，样本来自完成的握手（开放）和 RST（关闭）
+        - 主机还没有样本时，使用同一 /24（IPv6 为 /64）网段的估计值
+        - 都没有时使用 initial_timeout；结果限制在 [min_timeout, max_timeout]
+
+    并发：
+        - 用短期 / 长期两条 EWMA 跟踪超时比例，短期明显高于长期（超时突增）
+          时把窗口乘以 0.7；否则每完成 window 个探测窗口加 1，直到 max_window
+        - 全部被过滤的目标超时比例稳定在高位，不算突增，不会拖慢扫描
+
+    线程安全，可同时被多个 worker 线程调用。
+    """
+
+    SHORT_ALPHA = 0.1
+    LONG_ALPHA = 0.01
+    DECREASE_FACTOR = 0.7
+
+    def __init__(self, initial_timeout: float = 1.5, min_timeout: float = 0.05, max_timeout: float = 3.0,
+                 max_window: int = 2000, min_window: int = 16):
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.max_window = max(1, max_window)
+        self.min_window = max(1, min(min_window, self.max_window))
+
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, RttEstimator] = {}
+        self._subnets: Dict[str, RttEstimator] = {}
+
+        self._window = float(self.max_window)
+        self._short_ratio = 0.0
+        self._long_ratio = 0.0
+        self._since_change = 0
+        self._last_decrease = 0.0
+
+    @property
+    def window(self) -> int:
+        return int(self._window)
+
+    def timeout_for(self, host: str) -> float:
+        with self._lock:
+            est = self._hosts.get(host)
+            if est is None or est.srtt is None:
+                est = self._subnets.get(subnet_of(host))
+            rto = est.rto() if est is not None else None
+        if rto is None:
+            return self.initial_timeout
+        return min(self.max_timeout, max(self.min_timeout, rto))
+
+    def record(self, host: str, rtt: Optional[float], timed_out: bool):
+        """
+        记录一次探测结果。
+        - rtt: 握手或 RST 的往返时间（秒），无法作为样本时传 None
+        - timed_out: 是否超时
+        """
+        with self._lock:
+            if rtt is not None:
+                self._hosts.setdefault(host, RttEstimator()).observe(rtt)
+                self._subnets.setdefault(subnet_of(host), RttEstimator()).observe(rtt)
+
+            value = 1.0 if timed_out else 0.0
+            self._short_ratio += self.SHORT_ALPHA * (value - self._short_ratio)
+            self._long_ratio += self.LONG_ALPHA * (value - self._long_ratio)
+            self._since_change += 1
+
+            now = time.monotonic()
+            spike = self._short_ratio > 2 * self._long_ratio + 0.1
+            # 一个超时周期内最多降一次，避免同一批超时把窗口连降到底
+            if spike and now - self._last_decrease > self.initial_timeout:
+                self._window = max(self.min_window, self._window * self.DECREASE_FACTOR)
+                self._last_decrease = now
+                self._since_change = 0
+            elif not spike and self._since_change >= self._window:
+                self._window = min(self.max_window, self._window + 1)
+                self._since_change = 0
@@ -0,0 +1,253 @@
+import concurrent.futures
+import itertools
+import queue
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+# 优先级
+INTERACTIVE = 0     # 单次测试等需要立即响应的任务，总是先于批量任务执行
+BULK = 1            # 批量扫描 / 批量 Ping 的单个探测，按任务轮转公平分配
+
+# 空闲线程保留的时间（秒），超过后退出；之后的任务再按需创建
+_IDLE_TIMEOUT = 60.0
+
+
+class _Work:
+    __slots__ = ("future", "fn", "args")
+
+    def __init__(self, fn: Callable, args: tuple):
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.fn = fn
+        self.args = args
+
+    def run(self):
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = self.fn(*self.args)
+        except BaseException as e:
+            self.future.set_exception(e)
+        else:
+            self.future.set_result(result)
+
+
+def _log_failure(future: concurrent.futures.Future):
+    """驱动任务异常退出时记录异常与调用栈"""
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.error(f"后台任务异常退出: {error!r}", exc_info=error)
+
+
+class Job:
+    """
+    Job: 调度器中的一个批量任务（例如一次扫描），有自己的等待队列和并发上限。
+
+    由 Scheduler.job() 创建，接口与 Executor 相同（submit 返回 Future），可以直接交给 bounded_map：
+        job = scheduler.job("scan", limit=200)
+        for item, fut in bounded_map(job, fn, items, window=400):
+            ...
+        job.cancel()   # 丢弃尚未开始的探测（对应的 Future 被取消）
+        job.close()    # 之后 submit 抛出 RuntimeError
+    """
+
+    def __init__(self, scheduler: "Scheduler", name: str, priority: int, limit: int):
+        self.scheduler = scheduler
+        self.name = name
+        self.priority = priority
+        self.limit = max(1, int(limit))
+        self.running = 0
+        self.closed = False
+        self._pending: Deque[_Work] = deque()
+        self._ready = False      # 是否在调度器的轮转队列中
+
+    def submit(self, fn: Callable, *args: Any) -> concurrent.futures.Future:
+        if self.closed:
+            raise RuntimeError(f"任务 {self.name} 已关闭")
+        work = _Work(fn, args)
+        self.scheduler._enqueue(self, work)
+        return work.future
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def cancel(self):
+        for work in self.scheduler._drain(self):
+            work.future.cancel()
+
+    def close(self):
+        self.closed = True
+        self.cancel()
+
+
+class Scheduler:
+    """
+    Scheduler: 全程序共用的长期线程池，替代每次运行新建 ThreadPoolExecutor 与管理线程。
+
+    - spawn(fn, *args): 运行一个长时间的驱动任务（扫描主循环、持续 Ping、路由追踪等），
+      总是立即分配线程（空闲线程复用，没有时新建），返回 Future，done() 表示已结束；
+      驱动任务的返回值通常没有人读取，异常退出时写入日志（与 threading.Thread 打印异常一致）
+    - submit(fn, *args): 单次交互任务（INTERACTIVE），排在所有批量任务之前，并且不受批量线程上限限制，
+      即使一个 6 万端口的扫描占满了批量线程也会立即执行
+    - job(name, limit, priority=BULK): 创建批量任务，提交的探测进入该任务自己的队列；
+      多个任务之间按轮转方式分配线程（公平共享），每个任务最多 limit 个同时运行，
+      所有批量探测合计最多 bulk_workers 个线程
+    - 线程空闲 60 秒后退出，程序空闲时不占资源；提交任务只需加锁入队，没有创建 / 销毁线程池的开销
+
+    状态：
+        scheduler.stats() -> {"threads", "idle", "bulk_running", "jobs", "queued"}
+    """
+
+    def __init__(self, bulk_workers: int = 256, name: str = "sched"):
+        self.bulk_workers = max(1, int(bulk_workers))
+        self.name = name
+        self._lock = threading.Lock()
+        self._jobs: Deque[Job] = deque()          # 有待执行探测、且未达到并发上限的批量任务（轮转）
+        # 分配给空闲线程的任务：派发时已决定由谁执行，空闲线程只需取走
+        self._handoff: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._idle = 0                            # 等待 _handoff 的空闲线程数（已扣除派发出去的任务）
+        self._threads = 0
+        self._bulk_running = 0
+        self._ids = itertools.count(1)
+
+    # -------------------------
+    # 提交
+    # -------------------------
+    def spawn(self, fn: Callable, *args: Any) -> concurrent.futures.Future:
+        work = _Work(fn, args)
+        work.future.add_done_callback(_log_failure)
+        self._dispatch_urgent(work)
+        return work.future
+
+    def submit(self, fn: Callable, *args: Any) -> concurrent.futures.Future:
+        # 交互任务与驱动任务一样立即分配线程，不进入批量任务的队列；结果（含异常）由调用方读取
+        work = _Work(fn, args)
+        self._dispatch_urgent(work)
+        return work.future
+
+    def job(self, name: str, limit: int, priority: int = BULK) -> Job:
+        return Job(self, name, priority, limit)
+
+    def _dispatch_urgent(self, work: _Work):
+        with self._lock:
+            if self._idle:
+                self._wake((None, work))
+                return
+        self._start_thread((None, work))
+
+    def _enqueue(self, job: Job, work: _Work):
+        if job.priority == INTERACTIVE:
+            self._dispatch_urgent(work)
+            return
+        with self._lock:
+            job._pending.append(work)
+            if not job._ready and job.running < job.limit:
+                job._ready = True
+                self._jobs.append(job)
+            item = self._next_bulk()
+            if item is None:
+                return
+            if self._idle:
+                self._wake(item)
+                return
+        # 没有空闲线程：新建线程直接执行已分配的探测（分配在锁内完成，线程数不会超过上限）
+        self._start_thread(item)
+
+    def _drain(self, job: Job) -> List[_Work]:
+        with self._lock:
+            drained = list(job._pending)
+            job._pending.clear()
+            if job._ready:
+                job._ready = False
+                self._jobs.remove(job)
+        return drained
+
+    # -------------------------
+    # 调度（均在锁内调用）
+    # -------------------------
+    def _next_bulk(self):
+        """按轮转取出下一个批量探测，返回 (job, work)；没有可执行的返回 None"""
+        if self._bulk_running >= self.bulk_workers:
+            return None
+        while self._jobs:
+            job = self._jobs.popleft()
+            if not job._pending:
+                job._ready = False
+                continue
+            work = job._pending.popleft()
+            job.running += 1
+            self._bulk_running += 1
+            if job._pending and job.running < job.limit:
+                self._jobs.append(job)
+            else:
+                job._ready = False
+            return job, work
+        return None
+
+    def _wake(self, item):
+        self._idle -= 1
+        self._handoff.put(item)
+
+    def _start_thread(self, item):
+        with self._lock:
+            self._threads += 1
+            index = next(self._ids)
+        threading.Thread(target=self._worker, args=(item,), name=f"{self.name}-{index}", daemon=True).start()
+
+    # -------------------------
+    # 工作线程
+    # -------------------------
+    def _worker(self, item):
+        while True:
+            if item is None:
+                with self._lock:
+                    item = self._next_bulk()
+                    if item is None:
+                        self._idle += 1
+                while item is None:
+                    try:
+                        item = self._handoff.get(timeout=_IDLE_TIMEOUT)
+                    except queue.Empty:
+                        with self._lock:
+                            # _idle 为 0 说明已有任务派发给了本线程（正在放入队列），继续等待
+                            if self._idle > 0:
+                                self._idle -= 1
+                                self._threads -= 1
+                                return
+            job, work = item
+            try:
+                work.run()
+            except Exception as e:   # Future 已记录异常，这里只防御意外
+                logger.error(f"调度任务出错: {e}")
+            with self._lock:
+                if job is not None:
+                    job.running -= 1
+                    self._bulk_running -= 1
+                    if job._pending and not job._ready:
+                        job._ready = True
+                        self._jobs.append(job)
+                item = self._next_bulk()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"threads": self._threads, "idle": self._idle, "bulk_running": self._bulk_running,
+                    "jobs": len(self._jobs), "queued": sum(len(job._pending) for job in self._jobs)}
+
+
+_shared: Optional[Scheduler] = None
+_shared_lock = threading.Lock()
+
+
+def shared_scheduler() -> Scheduler:
+    """程序内所有功能共用的调度器"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Scheduler()
+        return _shared
@@ -0,0 +1,224 @@
+import ipaddress
+import re
+from typing import Iterator, List, Tuple
+
+
+# 单次任务允许展开的最大主机数（约一个 /8），防止误输入 IPv6 大网段
+MAX_HOSTS = 1 << 24
+
+_SPLIT_RE = re.compile(r"[,\s;]+")
+_HOSTNAME_RE = re.compile(r"^(?=.{1,253}$)[A-Za-z0-9_]([A-Za-z0-9_-]{0,62})(\.[A-Za-z0-9_]([A-Za-z0-9_-]{0,62}))*\.?$")
+
+
+class TargetSet:
+    """
+    TargetSet: 解析目标表达式，惰性地产出主机地址。
+
+    支持的写法（逗号、空格、分号或换行分隔，可混用）：
+        10.0.0.5                 单个地址
+        10.0.0.0/22              CIDR 网段（/31、/32 以外不含网络地址和广播地址）
+        10.1.2.3-10.1.2.200      起止地址，可跨网段
+        10.1.2.3-200             最后一段的简写
+        server01.example.com     主机名（原样产出，任务开始时由 Resolver 统一解析）
+
+    重复或重叠的目标只产出一次（保留首次出现的位置），例如 "10.0.0.1, 10.0.0.0/24" 共 254 个地址；
+    主机名按不区分大小写去重。
+
+    用法：
+        targets = TargetSet("10.0.0.0/30, db01")
+        len(targets)   -> 3
+        list(targets)  -> ['10.0.0.1', '10.0.0.2', 'db01']
+
+    输入非法时抛出 ValueError（消息可直接展示给用户）。
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        # 每一项为 (起始整数, 结束整数, IP 版本) 或 (主机名, None, 0)
+        self._items: List[Tuple] = []
+        covered = {4: [], 6: []}     # 已加入的地址区间，后面的项去掉与之重叠的部分
+        names = set()
+        for token in _SPLIT_RE.split(expression.strip()):
+            if not token:
+                continue
+            first, last, version = self._parse_token(token)
+            if version == 0:
+                name = first.lower().rstrip(".")
+                if name not in names:
+                    names.add(name)
+                    self._items.append((first, last, version))
+                continue
+            for begin, end in _uncovered(first, last, covered[version]):
+                self._items.append((begin, end, version))
+            covered[version].append((first, last))
+        if not self._items:
+            raise ValueError("目标地址为空")
+        if len(self) > MAX_HOSTS:
+            raise ValueError(f"目标数量过多（{len(self)}），单次最多 {MAX_HOSTS} 个")
+
+    @staticmethod
+    def _parse_token(token: str) -> Tuple:
+        try:
+            if "/" in token:
+                net = ipaddress.ip_network(token, strict=False)
+                first, last = int(net.network_address), int(net.broadcast_address)
+                if net.version == 4 and net.prefixlen < 31:
+                    first, last = first + 1, last - 1
+                return first, last, net.version
+        except ValueError:
+            raise ValueError(f"无法识别的网段: {token}")
+
+        try:
+            addr = ipaddress.ip_address(token)
+            return int(addr), int(addr), addr.version
+        except ValueError:
+            pass
+
+        if "-" in token:
+            begin_text, end_text = token.split("-", 1)
+            try:
+                begin = ipaddress.ip_address(begin_text)
+            except ValueError:
+                begin = None  # 不是地址范围，可能是带连字符的主机名
+            if begin is not None:
+                if begin.version == 4 and end_text.isdigit():
+                    # 10.1.2.3-200 简写：替换最后一段
+                    end_text = begin_text.rsplit(".", 1)[0] + "." + end_text
+                try:
+                    end = ipaddress.ip_address(end_text)
+                except ValueError:
+                    raise ValueError(f"无法识别的地址范围: {token}")
+                if begin.version != end.version or int(begin) > int(end):
+                    raise ValueError(f"地址范围不合法（起始<=结束）: {token}")
+                return int(begin), int(end), begin.version
+
+        if _HOSTNAME_RE.match(token) and not token.replace(".", "").isdigit():
+            return token, None, 0
+        raise ValueError(f"无法识别的目标地址: {token}")
+
+    def __len__(self) -> int:
+        return sum(1 if version == 0 else last - first + 1 for first, last, version in self._items)
+
+    def hostnames(self) -> List[str]:
+        """表达式中的主机名（需要解析的目标），按出现顺序"""
+        return [first for first, _, version in self._items if version == 0]
+
+    def has_ipv6(self) -> bool:
+        """表达式中是否有 IPv6 地址（不含主机名解析得到的地址）"""
+        return any(version == 6 for _, _, version in self._items)
+
+    def __iter__(self) -> Iterator[str]:
+        return self.iter_from(0)
+
+    def iter_from(self, offset: int) -> Iterator[str]:
+        """从第 offset 个主机开始产出（跳过前面的整段不需要逐个生成）"""
+        for first, last, version in self._items:
+            if version == 0:
+                if offset:
+                    offset -= 1
+                else:
+                    yield first
+                continue
+            count = last - first + 1
+            if offset >= count:
+                offset -= count
+                continue
+            factory = ipaddress.IPv4Address if version == 4 else ipaddress.IPv6Address
+            for value in range(first + offset, last + 1):
+                yield str(factory(value))
+            offset = 0
+
+
+def _uncovered(first: int, last: int, covered: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """区间 [first, last] 中不在 covered（可相互重叠）内的部分，按升序返回"""
+    pieces = []
+    for begin, end in sorted(covered):
+        if end < first or begin > last:
+            continue
+        if begin > first:
+            pieces.append((first, begin - 1))
+        first = max(first, end + 1)
+        if first > last:
+            return pieces
+    pieces.append((first, last))
+    return pieces
+
+
+class PortSpec:
+    """
+    PortSpec: 解析端口表达式，例如 "22,80,8000-8100"。
+
+    - 重复或重叠的端口会被合并，按端口号升序产出
+    - 输入非法时抛出 ValueError
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        ranges = []
+        for token in _SPLIT_RE.split(expression.strip()):
+            if not token:
+                continue
+            try:
+                if "-" in token:
+                    begin, end = (int(x) for x in token.split("-", 1))
+                else:
+                    begin = end = int(token)
+            except ValueError:
+                raise ValueError(f"端口必须为整数或范围: {token}")
+            if begin < 1 or end > 65535 or begin > end:
+                raise ValueError(f"端口范围不合法（1-65535 且 起始<=结束）: {token}")
+            ranges.append((begin, end))
+        if not ranges:
+            raise ValueError("端口列表为空")
+
+        # 合并重叠区间
+        ranges.sort()
+        merged = [list(ranges[0])]
+        for begin, end in ranges[1:]:
+            if begin <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([begin, end])
+        self._ranges = [range(begin, end + 1) for begin, end in merged]
+
+    def __len__(self) -> int:
+        return sum(len(r) for r in self._ranges)
+
+    def __iter__(self) -> Iterator[int]:
+        return self.iter_from(0)
+
+    def iter_from(self, offset: int) -> Iterator[int]:
+        """从第 offset 个端口开始产出"""
+        for r in self._ranges:
+            if offset >= len(r):
+                offset -= len(r)
+                continue
+            yield from r[offset:]
+            offset = 0
+
+
+def subnet_of(host: str) -> str:
+    """
+    返回主机所在的汇总网段：IPv4 为 /24，IPv6 为 /64；主机名原样返回。
+    用于按网段汇总结果、共享 RTT 估计等。
+    """
+    try:
+        addr = ipaddress.ip_address(host)
+    except ValueError:
+        return host
+    prefix = 24 if addr.version == 4 else 64
+    return str(ipaddress.ip_network(f"{host}/{prefix}", strict=False))
+
+
+def interleave(targets: TargetSet, ports: PortSpec, start: int = 0) -> Iterator[Tuple[str, int]]:
+    """
+    交错产出 (host, port)：外层按端口、内层按主机，
+    相邻两次探测落在不同主机上，单个目标不会被集中连续探测。
+    整个过程是惰性的，内存占用与 主机数 × 端口数 无关。
+    start: 从第 start 个组合开始（断点续扫），直接定位，不逐个跳过。
+    """
+    rounds, offset = divmod(start, len(targets))
+    for port in ports.iter_from(rounds):
+        for host in targets.iter_from(offset):
+            yield host, port
+        offset = 0
@@ -0,0 +1,51 @@
+import concurrent.futures
+import queue
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple, Union
+
+
+def bounded_map(executor: concurrent.futures.Executor, fn: Callable[..., Any], items: Iterable[Any],
+                window: Union[int, Callable[[], int]], should_stop: Optional[Callable[[], bool]] = None
+                ) -> Iterator[Tuple[Any, concurrent.futures.Future]]:
+    """
+    有界窗口的惰性任务提交：从 items 中按需取出任务提交给 executor，
+    任意时刻最多只有 window 个任务在途，按完成顺序产出 (item, future)。
+
+    - items 可以是生成器，不会被一次性展开，内存占用与任务总数无关
+    - fn(item) 为单个任务；若 item 是 tuple 则展开为位置参数
+    - should_stop(): 返回 True 时不再提交新任务，已提交的任务仍会被产出
+    - 第一个任务完成即可产出结果，无需等待全部提交
+    - window 可以是返回当前窗口大小的函数（例如 AdaptivePacer.window），每次补齐前重新读取：
+      窗口缩小后在途数降到新窗口以下才继续提交
+    """
+    current = window if callable(window) else (lambda: window)
+    done_queue: "queue.SimpleQueue[concurrent.futures.Future]" = queue.SimpleQueue()
+    pending = {}
+    item_iter = iter(items)
+    exhausted = False
+
+    while True:
+        # 补齐窗口
+        while not exhausted and len(pending) < max(1, int(current())):
+            if should_stop and should_stop():
+                exhausted = True
+                break
+            try:
+                item = next(item_iter)
+            except StopIteration:
+                exhausted = True
+                break
+            args = item if isinstance(item, tuple) else (item,)
+            try:
+                fut = executor.submit(fn, *args)
+            except RuntimeError:
+                # 线程池已被关闭（例如外部调用了 stop）
+                exhausted = True
+                break
+            pending[fut] = item
+            fut.add_done_callback(done_queue.put)
+
+        if not pending:
+            return
+
+        fut = done_queue.get()
+        yield pending.pop(fut), fut
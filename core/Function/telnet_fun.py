@@ -1,79 +1,224 @@
 import socket
 import threading
+import time
 import concurrent.futures
-import tkinter as tk
-from tkinter import scrolledtext, messagebox
-from typing import Iterable, Optional, List
+from typing import Callable, Dict, Iterable, Iterator, Optional, List, Tuple
+
+from core.Function.async_scan import AsyncConnectEngine, PORT_OPEN, PORT_CLOSED, PORT_TIMEOUT
+from core.Function.banner import BannerGrabber
+from core.Function.cancel import CancelToken, Cancelled, connect
+from core.Function.checkpoint import ScanCursor
+from core.Function.events import EventSink, EVENT_DONE
+from core.Function.name_enricher import NameEnricher, NAME_WAIT
+from core.Function.rate_budget import RateBudget, shared_budget
+from core.Function.resolver import Resolver, is_literal, shared_resolver
+from core.Function.result_store import ResultStore
+from core.Function.rtt import AdaptivePacer
+from core.Function.scheduler import Job, Scheduler, shared_scheduler
+from core.Function.task_window import bounded_map
+from core.Function.targets import TargetSet, PortSpec, interleave
 
 
 class PortScanner:
     """
-    PortScanner: 在 Tkinter 的 ScrolledText 中显示端口检测结果的工具类。
+    PortScanner: 端口检测工具类，结果文本和结构化事件都写入 EventSink
+    （图形界面为 OutputPipe，命令行为 EventStream）。
 
     构造：
-        scanner = PortScanner(result_box)
+        scanner = PortScanner(output, store=None, fingerprint=False, banner_concurrency=32, budget=None,
+                              scheduler=None, resolver=None, reverse_dns=False)
+        - store: 可选的 ResultStore，每次扫描登记为一个任务（kind "scan"），每个端口的结果追加写入
+        - fingerprint: 为 True 时开放端口进入第二阶段（BannerGrabber）：复用刚建立的连接读取 banner
+          或发送协议探测识别服务；该阶段有独立的并发上限 banner_concurrency，慢服务不会拖慢主扫描。
+          开放端口的结果在识别完成后才输出，扫描结束前等待识别全部完成
+        - budget: 发包预算（RateBudget），为 None 时使用全程序共用的 shared_budget()；
+          每个 connect 发起前取令牌，受全局与目标网段的速率 / 在途上限约束
+        - scheduler: 线程调度器（Scheduler），为 None 时使用全程序共用的 shared_scheduler()；
+          扫描主循环、thread 引擎的每个 connect、服务识别与单端口测试都在其中执行，不再每次新建线程池
+        - resolver: 主机名解析缓存（Resolver），为 None 时使用全程序共用的 shared_resolver()；
+          目标中的主机名在扫描开始时并发解析一次，引擎只连接 IP 地址，结果中的 host 为解析得到的地址；
+          无法解析的主机不探测，提示一行并计入已完成
+        - reverse_dns: 为 True 时有开放端口的主机进入反向解析阶段（NameEnricher，经过 resolver 的缓存），
+          与探测并行、有独立的并发上限，查到的主机名随到随输出，并出现在结束时的开放端口列表中
 
     方法：
         test_connect(ip, port, timeout=1.0)
-            - 直接测试单个 ip:port 是否可连通（立即返回 bool，并在结果框显示一行结果）
+            - 测试单个 ip:port 是否可连通，以交互优先级执行（不会排在批量扫描之后），
+              立即返回 Future，result() 为 bool；结果同时在结果框显示一行
 
-        start_range_scan(ip, start_port, end_port, timeout=1.0, max_workers=100)
+        start_range_scan(ip, start_port, end_port, timeout=None, max_workers=200, engine=None)
             - 并发扫描端口范围 [start_port, end_port]（包含端口边界）
-            - 扫描结果会实时写入 result_box
+            - 扫描结果会实时写入输出管道
+            - 三个 start_* 方法在后台线程中扫描，成功启动返回 True，参数错误时提示并返回 False
 
-        start_list_scan(ip, ports: Iterable[int], timeout=1.0, max_workers=100)
+        start_list_scan(ip, ports: Iterable[int], timeout=None, max_workers=200, engine=None)
             - 并发扫描给定端口列表
+            - timeout: 为 None 时按每个目标的 RTT 自适应超时与并发（见 AdaptivePacer），
+              传入数值则所有端口使用固定超时
+            - engine: "async"（事件循环，单线程保持数千个 connect 在途）或 "thread"（线程池）
+              为 None 时使用 self.engine
+
+        start_sweep_scan(targets: str, ports: str, timeout=None, max_workers=200, engine=None)
+            - 多主机 × 多端口扫描，targets 支持 CIDR / 地址范围 / 主机名列表，
+              ports 支持 "22,80,8000-8100"；探测在主机之间交错进行
+
+        resume_scan(job_id=None)
+            - 从检查点继续已停止或中断的扫描任务（需要 store）：扫描期间每 2 秒把探测进度
+              （低水位游标，见 ScanCursor）与结果一起写入结果库，继续时不再探测已完成的目标
 
         stop_scan()
-            - 尝试中止正在进行的扫描（设置停止标志，后续任务检测到后会停止提交或返回）
+            - 中止正在进行的扫描：丢弃排队的探测，正在进行的 connect 与服务识别被直接中断，
+              STOP_SLICE（50 ms）量级内输出 done 事件
+
+    事件：
+        {"type": "port", "host", "port", "state": "open" | "closed" | "timeout" | "error", "elapsed_ms"}
+        （开启 fingerprint 时开放端口的事件另有 "service"、"banner"，未识别时 service 为 None）
+        {"type": "resolve", "host", "address", "error"}     目标中的每个主机名（解析失败时 address 为 None）
+        {"type": "name", "host", "name"}                    开启 reverse_dns 时查到的主机名（PTR）
+        {"type": "done", "task": "scan", "stopped", "total", "completed", "open_ports": [[host, port], ...],
+         "names": {host: 主机名}, "error", "job"}
+        （error 为扫描出错中止时的错误信息，正常结束为 None；job 为 ResultStore 中的任务编号，没有 store 时为 None）
 
     注意：
         - 使用 TCP 连接测试（socket.connect），适合服务端口检测。
-        - GUI 写入通过 self._append_text(...) 调度到主线程，保证线程安全。
+        - GUI 写入通过 self._append_text(...) 放入 OutputPipe 队列，由主线程按节拍批量刷新；
+          进度通过 OutputPipe.set_progress 只更新进度标签，不再逐行写入结果框。
     """
 
-    def __init__(self, result_box: scrolledtext.ScrolledText):
-        self.result_box = result_box
+    # 可选扫描引擎
+    ENGINE_THREAD = "thread"
+    ENGINE_ASYNC = "async"
+
+    def __init__(self, output: EventSink, engine: str = ENGINE_ASYNC,
+                 async_concurrency: int = 2000, store: Optional[ResultStore] = None,
+                 fingerprint: bool = False, banner_concurrency: int = 32,
+                 budget: Optional[RateBudget] = None, scheduler: Optional[Scheduler] = None,
+                 resolver: Optional[Resolver] = None, reverse_dns: bool = False):
+        self.output = output
+        self.budget = budget or shared_budget()
+        self.scheduler = scheduler or shared_scheduler()
+        self.resolver = resolver or shared_resolver()
+        self.store = store
+        self.job_id: Optional[int] = None
+        self.engine = engine
+        self.async_concurrency = async_concurrency
+        self.fingerprint = fingerprint
+        self._grabber = BannerGrabber(concurrency=banner_concurrency, scheduler=self.scheduler)
+        self._grabbing = False                # 本次扫描是否识别服务（启动时取 self.fingerprint）
+        self.reverse_dns = reverse_dns
+        self._enricher = NameEnricher(resolver=self.resolver, scheduler=self.scheduler)
+        self._naming = False                  # 本次扫描是否反查主机名（启动时取 self.reverse_dns）
+        self._cursor: Optional[ScanCursor] = None  # 有结果库时记录探测进度，用于断点续扫
+        # 识别完成的开放端口在 grabber 线程中输出，与扫描线程共用计数
+        self._report_lock = threading.Lock()
 
         # 扫描控制状态
         self._stop_flag = False               # 外部调用 stop_scan() 会把此标志设为 True
-        self._scan_thread: Optional[threading.Thread] = None
-        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._token = CancelToken()           # 本次扫描的停止信号，中断正在等待的 connect
+        self._scan_task: Optional[concurrent.futures.Future] = None   # 扫描主循环（在调度器中运行）
+        self._job: Optional[Job] = None       # thread 引擎的批量探测
+
+        # 自适应超时与并发（timeout 为 None 时每次扫描新建）
+        self._pacer: Optional[AdaptivePacer] = None
 
         # 用于统计（可选）
         self._total = 0
         self._done = 0
-        self._open_ports: List[int] = []
+        self._open_ports: List[Tuple[str, int]] = []
 
     # -------------------------
     # 辅助方法：线程安全地向结果框写文本
     # -------------------------
     def _append_text(self, text: str):
         """
-        把文本插入到 result_box。因为可能从子线程调用，所以用 after 调度到主线程执行。
+        把文本放入输出管道。可从任意线程调用，由主线程按节拍合并写入结果框。
         """
-        try:
-            # schedule on main thread immediately
-            self.result_box.after(0, lambda: (self.result_box.insert(tk.END, text), self.result_box.see(tk.END)))
-        except Exception:
-            # 在极少数情况下（例如 result_box 已销毁），捕获异常避免崩溃
-            pass
+        self.output.write(text)
+
+    def _update_progress(self):
+        self.output.set_progress(f"进度: {self._done}/{self._total}")
+
+    def _report(self, host: str, port: int, state: str, elapsed: Optional[float]):
+        """输出一个端口的探测结果（文本 + 事件），在收集结果的线程中调用"""
+        with self._report_lock:
+            self._done += 1
+            if state == PORT_OPEN:
+                self._open_ports.append((host, port))
+                self._append_text(f"{host}:{port} ✅ 开放\n")
+                self._lookup_name(host)
+            elif state == PORT_TIMEOUT:
+                self._append_text(f"{host}:{port} ❌ 超时/被过滤\n")
+            else:
+                self._append_text(f"{host}:{port} ❌ 关闭/不可达\n")
+            elapsed_ms = round(elapsed * 1000, 3) if elapsed is not None else None
+            self.output.emit("port", host=host, port=port, state=state, elapsed_ms=elapsed_ms)
+            if self.job_id is not None:
+                self.store.add(self.job_id, host, port, state, elapsed_ms)
+                self._advance(host, port)
+            self._update_progress()
+
+    def checkpoint(self):
+        """立即写一个检查点（例如程序退出前）；没有运行中的任务或没有结果库时忽略"""
+        if not self.is_scanning() or self._cursor is None:
+            return
+        with self._report_lock:
+            self.store.checkpoint(self.job_id, *self._cursor.state())
+
+    def _advance(self, host: str, port: int):
+        """标记一个探测完成（结果已加入结果库队列之后），到期时写检查点；在 _report_lock 内调用"""
+        cursor = self._cursor
+        cursor.complete((host, port))
+        if cursor.due():
+            self.store.checkpoint(self.job_id, *cursor.state())
+
+    def _lookup_name(self, host: str):
+        """有开放端口的主机提交反向解析（每个主机一次），不阻塞调用线程"""
+        if self._naming:
+            self._enricher.submit(host, self._on_name)
+
+    def _on_name(self, host: str, name: str):
+        """反向解析线程中调用：输出查到的主机名"""
+        self._append_text(f"{host} 主机名: {name}\n")
+        self.output.emit("name", host=host, name=name)
+
+    def _grab(self, host: str, port: int, sock: socket.socket, elapsed: float):
+        """开放端口：把已建立的连接交给 BannerGrabber，识别完成后再输出该端口"""
+        self._lookup_name(host)
+        def on_service(service: Optional[str], banner: str):
+            with self._report_lock:
+                self._done += 1
+                self._open_ports.append((host, port))
+                label = f"  [{service}] {banner}".rstrip() if service else ""
+                self._append_text(f"{host}:{port} ✅ 开放{label}\n")
+                elapsed_ms = round(elapsed * 1000, 3)
+                self.output.emit("port", host=host, port=port, state=PORT_OPEN, elapsed_ms=elapsed_ms,
+                                 service=service, banner=banner)
+                if self.job_id is not None:
+                    self.store.add(self.job_id, host, port, PORT_OPEN, elapsed_ms, service, banner or None)
+                    self._advance(host, port)
+                self._update_progress()
+
+        self._grabber.submit(host, port, on_service, sock=sock)
 
     # -------------------------
     # 单端口测试
     # -------------------------
-    def test_connect(self, ip: str, port: int, timeout: float = 1.0) -> bool:
+    def test_connect(self, ip: str, port: int, timeout: float = 1.0) -> concurrent.futures.Future:
         """
-        立即测试单个 ip:port 是否可以 TCP 连接。
-        - 返回 True（可连通）或 False（不可连通）
-        - 同时把结果写入 result_box（通过主线程调度）
+        测试单个 ip:port 是否可以 TCP 连接，以交互优先级提交给调度器，不会排在批量扫描之后。
+        - 返回 Future，result() 为 True（可连通）或 False（不可连通）
+        - 同时把结果写入输出管道（由主线程批量刷新）
         """
-        addr = (ip, int(port))
+        return self.scheduler.submit(self._test_connect, ip, port, timeout)
+
+    def _test_connect(self, ip: str, port: int, timeout: float) -> bool:
         status = False
+        begin = time.perf_counter()
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            address = self.resolver.resolve(ip)
+            sock = socket.socket(socket.AF_INET6 if ":" in address else socket.AF_INET, socket.SOCK_STREAM)
             sock.settimeout(timeout)
-            sock.connect(addr)
+            sock.connect((address, int(port)))
             status = True
             sock.close()
         except Exception:
@@ -81,171 +226,440 @@ class PortScanner:
 
         # 输出结果（在 GUI 中显示）
         self._append_text(f"{ip}:{port} {'✅ 开放' if status else '❌ 关闭/不可达'}\n")
+        self.output.emit("port", host=ip, port=int(port), state=PORT_OPEN if status else PORT_CLOSED,
+                         elapsed_ms=round((time.perf_counter() - begin) * 1000, 3))
         return status
 
     # -------------------------
     # 并发单端口任务（内部使用）
     # -------------------------
-    def _scan_single_port(self, ip: str, port: int, timeout: float) -> str:
+    def _scan_single_port(self, ip: str, port: int, timeout: Optional[float]) -> Tuple[str, float]:
         """
-        线程池中运行的单个端口检测任务，返回一行结果字符串。
+        线程池中运行的单个端口检测任务，返回 (状态, 耗时秒)。
         任务必须尽量短小（快速返回），并在开始前检查 stop_flag。
         """
         if self._stop_flag:
-            return ""  # 为空表示不输出
-
+            return "", 0.0  # 状态为空表示不输出
+
+        pacer = self._pacer
+        if timeout is None:
+            timeout = pacer.timeout_for(ip) if pacer else 0.8
+        token = self._token
+        if not self.budget.acquire(ip, token):
+            return "", 0.0
+        begin = time.perf_counter()
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(timeout)
-            sock.connect((ip, port))
+            sock = socket.socket(socket.AF_INET6 if ":" in ip else socket.AF_INET, socket.SOCK_STREAM)
+            # 分片等待握手，停止后 STOP_SLICE 内返回（阻塞的 connect 无法从其它线程中断）
+            connect(sock, (ip, port), timeout, token)
+            elapsed = time.perf_counter() - begin
+            if pacer:
+                pacer.record(ip, elapsed, False)
+            if token.cancelled:
+                sock.close()
+                return "", elapsed
+            if self._grabbing:
+                # 连接交给 BannerGrabber，识别完成后由其输出；这里返回空状态不输出
+                self._grab(ip, port, sock, elapsed)
+                return "", elapsed
+            sock.close()
+            state = PORT_OPEN
+        except ConnectionRefusedError:
+            state = PORT_CLOSED
+            if pacer:
+                pacer.record(ip, time.perf_counter() - begin, False)
+        except socket.timeout:
+            state = PORT_TIMEOUT
+            if pacer:
+                pacer.record(ip, None, True)
+        except Cancelled:
             sock.close()
-            result = f"{ip}:{port} ✅ 开放\n"
-            # 记录到本地开放端口列表（线程安全地追加）
-            self._open_ports.append(port)
+            return "", 0.0
         except Exception:
-            result = f"{ip}:{port} ❌ 关闭/不可达\n"
-
-        # 更新进度计数（最好在主线程更新显示，这里在子线程更新计数）
-        self._done += 1
-        return result
+            state = PORT_CLOSED
+        finally:
+            self.budget.release(ip)
+        return state, time.perf_counter() - begin
 
     # -------------------------
     # 并发扫描（范围或列表）
     # -------------------------
-    def start_range_scan(self, ip: str, start_port: int, end_port: int, timeout: float = 0.8, max_workers: int = 200):
+    def start_range_scan(self, ip: str, start_port: int, end_port: int, timeout: Optional[float] = None, max_workers: int = 200,
+                         engine: Optional[str] = None):
         """
         并发扫描端口范围 [start_port, end_port]（含两端）。
-        结果实时写入 result_box。单次扫描在后台线程中运行（不会阻塞主线程）。
+        结果实时写入输出管道。单次扫描在后台线程中运行（不会阻塞主线程）。
         """
         # 参数校验（基本）
         try:
             start_port = int(start_port); end_port = int(end_port)
         except Exception:
-            messagebox.showwarning("输入错误", "起始端口和结束端口必须为整数")
-            return
+            self.output.notice("输入错误", "起始端口和结束端口必须为整数")
+            return False
         if start_port < 1 or end_port > 65535 or start_port > end_port:
-            messagebox.showwarning("输入错误", "端口范围不合法（1-65535 且 起始<=结束）")
-            return
+            self.output.notice("输入错误", "端口范围不合法（1-65535 且 起始<=结束）")
+            return False
 
-        ports = list(range(start_port, end_port + 1))
-        self.start_list_scan(ip, ports, timeout=timeout, max_workers=max_workers)
+        # range 是惰性的，不会展开成 6 万个元素的列表
+        ports = range(start_port, end_port + 1)
+        return self.start_list_scan(ip, ports, timeout=timeout, max_workers=max_workers, engine=engine)
 
-    def start_list_scan(self, ip: str, ports: Iterable[int], timeout: float = 0.8, max_workers: int = 200):
+    def start_list_scan(self, ip: str, ports: Iterable[int], timeout: Optional[float] = None, max_workers: int = 200,
+                        engine: Optional[str] = None):
         """
         并发扫描指定的端口列表。
         - ip: 目标 IP（字符串）
         - ports: 可迭代的端口集合（如 list、range 等）
-        - timeout: 单端口连接超时（秒）
-        - max_workers: 最大并发数（线程池大小）
+        - timeout: 单端口连接超时（秒），为 None 时按目标 RTT 自适应
+        - max_workers: 最大并发数（线程池大小，仅 thread 引擎使用）
+        - engine: 扫描引擎，"async" 或 "thread"，为 None 时使用 self.engine
         """
-        # 防止重复启动
-        if self._scan_thread and self._scan_thread.is_alive():
-            messagebox.showinfo("提示", "已有扫描任务在运行，请先停止后再启动新的扫描。")
-            return
+        engine = engine or self.engine
+        if engine not in (self.ENGINE_THREAD, self.ENGINE_ASYNC):
+            self.output.notice("输入错误", f"未知的扫描引擎: {engine}")
+            return False
 
-        # 将 ports 转为列表并进行基本校验
-        try:
-            ports_list = [int(p) for p in ports]
-        except Exception:
-            messagebox.showwarning("输入错误", "端口列表包含非法值")
-            return
+        # 防止重复启动
+        if self.is_scanning():
+            self.output.notice("提示", "已有扫描任务在运行，请先停止后再启动新的扫描。", level="info")
+            return False
+
+        # 基本校验：range 只检查边界，其它可迭代对象转为列表逐个检查
+        if isinstance(ports, range):
+            ports_list = ports
+            bad = [p for p in (ports_list[0], ports_list[-1]) if p < 1 or p > 65535] if ports_list else []
+        else:
+            try:
+                ports_list = [int(p) for p in ports]
+            except Exception:
+                self.output.notice("输入错误", "端口列表包含非法值")
+                return False
+            bad = [p for p in ports_list if p < 1 or p > 65535]
         if not ports_list:
-            messagebox.showwarning("输入错误", "端口列表为空")
-            return
-        for p in ports_list:
-            if p < 1 or p > 65535:
-                messagebox.showwarning("输入错误", f"端口 {p} 不在合法范围 1-65535")
-                return
+            self.output.notice("输入错误", "端口列表为空")
+            return False
+        if bad:
+            self.output.notice("输入错误", f"端口 {bad[0]} 不在合法范围 1-65535")
+            return False
+
+        if isinstance(ports_list, range):
+            params = {"mode": "list", "targets": ip, "ports": [ports_list[0], ports_list[-1]], "range": True}
+        else:
+            params = {"mode": "list", "targets": ip, "ports": ports_list, "range": False}
+        return self._start_scan(params, timeout, max_workers, engine)
+
+    def start_sweep_scan(self, targets: str, ports: str, timeout: Optional[float] = None, max_workers: int = 200,
+                         engine: Optional[str] = None):
+        """
+        多主机 × 多端口扫描。
+        - targets: 目标表达式，如 "10.0.0.0/22, 10.1.2.3-10.1.2.200, db01"
+        - ports: 端口表达式，如 "22,80,8000-8100"
+        - 探测按端口分轮、在主机之间交错进行，任务惰性生成，不会展开全部组合
+        """
+        engine = engine or self.engine
+        if engine not in (self.ENGINE_THREAD, self.ENGINE_ASYNC):
+            self.output.notice("输入错误", f"未知的扫描引擎: {engine}")
+            return False
+        if self.is_scanning():
+            self.output.notice("提示", "已有扫描任务在运行，请先停止后再启动新的扫描。", level="info")
+            return False
+        params = {"mode": "sweep", "targets": targets, "ports": ports}
+        try:
+            self._scan_plan(params)
+        except ValueError as e:
+            self.output.notice("输入错误", str(e))
+            return False
+        return self._start_scan(params, timeout, max_workers, engine)
 
+    def resume_scan(self, job_id: Optional[int] = None) -> bool:
+        """
+        从检查点继续一个已停止（或程序异常退出时中断）的扫描任务，需要结果库。
+        - job_id: 为 None 时选择最近一个可以继续的扫描任务
+        - 使用任务原来的目标、端口、超时与引擎设置；已完成的目标不会再次探测，
+          结果继续追加到同一个任务
+        """
+        if self.store is None:
+            self.output.notice("提示", "继续扫描需要结果库。", level="info")
+            return False
+        if self.is_scanning():
+            self.output.notice("提示", "已有扫描任务在运行，请先停止后再启动新的扫描。", level="info")
+            return False
+        if job_id is None:
+            job_id = self.store.resumable_job("scan")
+        info = self.store.job_info(job_id) if job_id is not None else None
+        if not info or info["kind"] != "scan" or not info["params"] or info["status"] not in ("stopped", "running"):
+            self.output.notice("提示", "没有可以继续的扫描任务。", level="info")
+            return False
+        params = info["params"]
+        try:
+            self._scan_plan(params)
+        except (ValueError, KeyError) as e:
+            self.output.notice("提示", f"任务 {job_id} 的参数无法恢复: {e}")
+            return False
+
+        self.store.reopen_job(job_id)
+        opened = [(host, port) for _, host, port, state, *_ in self.store.iter_results(job_id) if state == PORT_OPEN]
+        resume = {"job": job_id, "cursor": ScanCursor(info["cursor"], info["done"]), "open_ports": opened}
+        return self._start_scan(params, params.get("timeout"), params.get("max_workers", 200),
+                                params.get("engine", self.engine), resume=resume)
+
+    @staticmethod
+    def _scan_plan(params: Dict) -> Tuple[int, str, str, Callable[[int], Iterator[Tuple[str, int]]]]:
+        """
+        由任务参数得到 (探测总数, 标题, 结果库中的任务目标, pairs_from)。
+        pairs_from(start) 从第 start 个探测开始惰性产出 (host, port)，顺序固定，供断点续扫定位。
+        参数非法时抛出 ValueError。
+        """
+        ip = params["targets"]
+        if params["mode"] == "list":
+            if params["range"]:
+                begin, end = params["ports"]
+                ports = range(begin, end + 1)
+                spec = f"{ip} {begin}-{end}"
+            else:
+                ports = params["ports"]
+                spec = f"{ip} {','.join(str(p) for p in ports)}"
+            return (len(ports), f"目标 {ip}，共 {len(ports)} 个端口", spec,
+                    lambda start: ((ip, port) for port in ports[start:]))
+
+        target_set = TargetSet(params["targets"])
+        port_spec = PortSpec(params["ports"])
+        hosts, nports = len(target_set), len(port_spec)
+        return (hosts * nports, f"{hosts} 个主机 × {nports} 个端口，共 {hosts * nports} 次探测",
+                f"{params['targets']} {params['ports']}",
+                lambda start: interleave(target_set, port_spec, start))
+
+    def _start_scan(self, params: Dict, timeout: Optional[float], max_workers: int, engine: str,
+                    resume: Optional[Dict] = None) -> bool:
+        """重置状态并在后台线程中启动扫描；params 见 _scan_plan，resume 为续扫时的任务编号、游标与已发现的开放端口"""
+        total, title, spec, pairs_from = self._scan_plan(params)
         # 重置状态
+        self.output.set_progress("")
         self._stop_flag = False
-        self._open_ports = []
-        self._total = len(ports_list)
-        self._done = 0
-
-        # 清空 result_box 并输出起始信息（主线程调度）
-        self._append_text(f"开始并发端口扫描：目标 {ip}，共 {self._total} 个端口\n")
-
-        # 后台线程用于管理线程池与结果收集，确保 GUI 不阻塞
-        def manager():
-            # 根据任务数自适应限制并发数
-            actual_workers = max(1, min(max_workers, self._total))
-            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=actual_workers)
-
-            # 提交任务
-            futures = {self._executor.submit(self._scan_single_port, ip, port, timeout): port for port in ports_list}
+        self._token = CancelToken()
+        self._total = total
+        if resume is None:
+            self._grabbing = self.fingerprint
+            self._naming = self.reverse_dns
+            cursor = ScanCursor()
+            self._open_ports = []
+            self.job_id = self.store.begin_job("scan", spec, {
+                **params, "timeout": timeout, "max_workers": max_workers, "engine": engine,
+                "fingerprint": self._grabbing, "reverse_dns": self._naming}) if self.store else None
+        else:
+            self._grabbing = bool(params.get("fingerprint"))
+            self._naming = bool(params.get("reverse_dns"))
+            cursor = resume["cursor"]
+            self._open_ports = resume["open_ports"]
+            self.job_id = resume["job"]
+            title = f"继续任务 {self.job_id}（已完成 {cursor.completed}/{total}），{title}"
+        self._done = cursor.completed
+        self._enricher.reset()
+        # 有结果库时记录游标，定期写检查点
+        self._cursor = cursor if self.job_id is not None else None
+        # 主机名在扫描线程开始时解析（_resolve_targets 填入 addresses），引擎只拿到 IP 地址；
+        # 游标登记的是替换后的 (地址, 端口)，与引擎回报的结果一致
+        hostnames = self._plan_hostnames(params)
+        addresses: Dict[str, str] = {}
+        pairs = pairs_from(cursor.low)
+        if hostnames:
+            pairs = ((addresses.get(host, host), port) for host, port in pairs)
+        if self._cursor is not None:
+            pairs = cursor.track(pairs)
+        if hostnames:
+            pairs = self._skip_unresolved(pairs, set(hostnames))
+        if timeout is None:
+            window = self.async_concurrency if engine == self.ENGINE_ASYNC else max_workers
+            self._pacer = AdaptivePacer(max_window=window)
+        else:
+            self._pacer = None
+
+        # 输出起始信息（主线程调度）
+        self._append_text(f"开始并发端口扫描：{title}\n")
+
+        # 后台线程用于管理扫描与结果收集，确保 GUI 不阻塞
+        if engine == self.ENGINE_ASYNC:
+            target = self._run_async_scan
+        else:
+            target = self._run_thread_scan
+        self._scan_task = self.scheduler.spawn(self._run_scan, target, hostnames, addresses, pairs, timeout,
+                                               max_workers)
+        return True
+
+    @staticmethod
+    def _plan_hostnames(params: Dict) -> List[str]:
+        """任务目标中需要解析的主机名"""
+        if params["mode"] == "list":
+            return [] if is_literal(params["targets"]) else [params["targets"]]
+        return TargetSet(params["targets"]).hostnames()
+
+    def _run_scan(self, run: Callable, hostnames: List[str], addresses: Dict[str, str],
+                  pairs: Iterator[Tuple[str, int]], timeout: Optional[float], max_workers: int):
+        """
+        扫描主循环：先并发解析目标中的主机名（每个只解析一次，结果进入共用缓存），再交给扫描引擎。
+        无论引擎是否出错都输出总结与 done 事件，命令行 / 界面不会一直等待
+        """
+        error = None
+        try:
+            if hostnames:
+                resolved, errors = self.resolver.resolve_all(hostnames, should_stop=self._token)
+                addresses.update(resolved)
+                for host in hostnames:
+                    if host in resolved:
+                        self._append_text(f"{host} → {resolved[host]}\n")
+                        self.output.emit("resolve", host=host, address=resolved[host], error=None)
+                    elif host in errors:
+                        self._append_text(f"{errors[host]}，跳过该主机\n")
+                        self.output.emit("resolve", host=host, address=None, error=errors[host])
+            # 续扫时之前发现的开放端口也补上主机名
+            for host, _ in list(self._open_ports):
+                self._lookup_name(host)
+            run(pairs, timeout, max_workers)
+        except Exception as e:
+            error = str(e)
+            self._append_text(f"\n扫描出错: {e}\n")
+            raise
+        finally:
+            self._finish_scan(error)
+
+    def _skip_unresolved(self, pairs: Iterator[Tuple[str, int]], hostnames: set) -> Iterator[Tuple[str, int]]:
+        """仍是主机名的探测（解析失败）不交给引擎，直接计入已完成"""
+        for host, port in pairs:
+            if host in hostnames:
+                with self._report_lock:
+                    self._done += 1
+                    if self.job_id is not None:
+                        self._advance(host, port)
+                continue
+            yield host, port
+
+    def _run_thread_scan(self, pairs: Iterator[Tuple[str, int]], timeout: Optional[float], max_workers: int):
+        """线程池引擎：每个调度器线程阻塞执行一个 connect，本次扫描最多 max_workers 个同时运行"""
+        # 根据任务数自适应限制并发数
+        actual_workers = max(1, min(max_workers, self._total))
+        self._job = self.scheduler.job("scan", limit=actual_workers)
 
-            try:
-                # as_completed 会在每个 future 完成时迭代返回
-                for fut in concurrent.futures.as_completed(futures):
-                    if self._stop_flag:
-                        # 如果外部发出停止信号，尽量取消未开始的 future（cancel 返回 True 表示取消成功）
-                        # 线程池中的任务可能已在运行, cancel 只能取消未开始的任务
-                        break
-
-                    try:
-                        line = fut.result()
-                    except Exception as e:
-                        line = f"{ip}:{futures.get(fut)} 错误: {e}\n"
-
-                    if line:
-                        # 把结果写回 GUI（通过 _append_text 安全调度）
-                        self._append_text(line)
-
-                    # 可选：显示进度（例如：done/total）
-                    self._append_text(f"进度: {self._done}/{self._total}\n")
-
-                # 如果 stop_flag 已设，尝试取消尚未开始的任务
+        try:
+            # 有界窗口惰性提交：最多 2 倍线程数的任务在途，按完成顺序返回；
+            # 自适应时每次补齐都重新读取 pacer 窗口，超时突增后在途数随之下降
+            window = actual_workers * 2
+            pacer = self._pacer
+            if pacer:
+                window = lambda: min(actual_workers * 2, pacer.window)
+            tasks = ((ip, port, timeout) for ip, port in pairs)
+            for (ip, port, _), fut in bounded_map(self._job, self._scan_single_port, tasks,
+                                                 window=window,
+                                                 should_stop=lambda: self._stop_flag):
                 if self._stop_flag:
-                    for f in futures:
-                        f.cancel()
-
-            finally:
-                # 关闭线程池
-                if self._executor:
-                    self._executor.shutdown(wait=False)
-                    self._executor = None
-
-                # 最终输出总结信息（开放端口列表）
-                if not self._stop_flag:
-                    self._append_text("\n端口扫描完成。\n")
-                else:
-                    self._append_text("\n端口扫描已停止。\n")
-
-                if self._open_ports:
-                    self._append_text(f"开放端口: {sorted(self._open_ports)}\n")
+                    # 停止后不再提交新任务；正在运行的 connect 已被中断，在 STOP_SLICE 内返回空状态
+                    break
+
+                try:
+                    state, elapsed = fut.result()
+                except Exception as e:
+                    with self._report_lock:
+                        self._done += 1
+                        self._append_text(f"{ip}:{port} 错误: {e}\n")
+                        self.output.emit("port", host=ip, port=port, state="error", elapsed_ms=None, error=str(e))
+                        if self.job_id is not None:
+                            self.store.add(self.job_id, ip, port, "error")
+                            self._advance(ip, port)
+                        self._update_progress()
+                    continue
+
+                if state:
+                    self._report(ip, port, state, elapsed)
+
+        finally:
+            # 丢弃尚未开始的探测（调度器线程由全程序共用，不关闭）
+            self._job.close()
+            self._job = None
+
+    def _run_async_scan(self, pairs: Iterator[Tuple[str, int]], timeout: Optional[float], max_workers: int):
+        """事件循环引擎：单线程内保持大量非阻塞 connect 在途"""
+        engine = AsyncConnectEngine(concurrency=min(self.async_concurrency, self._total))
+        engine.run(pairs, timeout, self._report,
+                   should_stop=self._token, pacer=self._pacer,
+                   on_open=self._grab if self._grabbing else None, budget=self.budget)
+
+    def _finish_scan(self, error: Optional[str] = None):
+        """
+        输出总结信息（开放端口列表）；done 事件总是输出，即使等待识别或写结果库时出错。
+        error 为扫描出错的信息：任务记为 stopped，可以从最后一个检查点继续
+        """
+        names: Dict[str, str] = {}
+        try:
+            if self._grabbing:
+                # 等待服务识别完成（每个端口有期限）；已停止时排队中的端口不再识别
+                if self._stop_flag:
+                    self._grabber.cancel()
+                self._grabber.wait()
+            if self._naming:
+                # 反向解析与探测并行，通常已经完成；最多再等 NAME_WAIT 秒，停止时不等待
+                if self._stop_flag:
+                    self._enricher.cancel()
                 else:
-                    self._append_text("未发现开放端口。\n")
-
-        # 启动后台管理线程
-        self._scan_thread = threading.Thread(target=manager, daemon=True)
-        self._scan_thread.start()
+                    self._enricher.wait(NAME_WAIT)
+            names = self._enricher.names
+            self._update_progress()
+            if error:
+                self._append_text("\n端口扫描已中止。\n")
+            elif not self._stop_flag:
+                self._append_text("\n端口扫描完成。\n")
+            else:
+                self._append_text("\n端口扫描已停止。\n")
+
+            if self._open_ports:
+                by_host = {}
+                for host, port in self._open_ports:
+                    by_host.setdefault(host, []).append(port)
+                for host, ports in by_host.items():
+                    prefix = "" if len(by_host) == 1 else f"{host} "
+                    if host in names:
+                        prefix = f"{host} ({names[host]}) "
+                    self._append_text(f"{prefix}开放端口: {sorted(ports)}\n")
+            else:
+                self._append_text("未发现开放端口。\n")
+
+            if self.job_id is not None:
+                # 最后一个检查点：停止后继续扫描时从这里开始
+                self.store.checkpoint(self.job_id, *self._cursor.state())
+                self.store.finish_job(self.job_id, "stopped" if self._stop_flag or error else "done")
+        finally:
+            self.output.emit(EVENT_DONE, task="scan", stopped=self._stop_flag, total=self._total,
+                             completed=self._done, open_ports=[list(item) for item in self._open_ports],
+                             names=names, error=error, job=self.job_id)
 
     # -------------------------
     # 停止扫描
     # -------------------------
     def stop_scan(self):
         """
-        请求停止正在进行的扫描：设置停止标志并尝试关闭线程池。
-        - 已提交并正在运行的 socket.connect 调用无法被立即中断（但后续任务会被取消）
-        - stop_scan 尽快返回，实际终止需要等待正在运行的任务完成或超时
+        请求停止正在进行的扫描：设置停止标志，取消本次扫描的 CancelToken，丢弃尚未开始的探测。
+        - thread 引擎正在等待的 connect 分片检查停止信号，async 引擎每个节拍检查，
+          服务识别中的连接被 shutdown，扫描在 STOP_SLICE（50 ms）量级内结束并输出 done 事件
+        - 未完成的探测不记入结果，断点续扫时重新探测
+        - stop_scan 立即返回，不等待扫描线程结束
         """
-        if not (self._scan_thread and self._scan_thread.is_alive()):
-            messagebox.showinfo("提示", "当前没有正在运行的扫描任务。")
+        if not self.is_scanning():
+            self.output.notice("提示", "当前没有正在运行的扫描任务。", level="info")
             return
 
         self._append_text("\n正在停止扫描，请稍候...\n")
         self._stop_flag = True
+        self._token.cancel()
+        if self._grabbing:
+            self._grabber.cancel()
+        if self._naming:
+            self._enricher.cancel()
 
-        # 尝试立即关闭线程池（不等待正在运行任务）
-        if self._executor:
-            try:
-                self._executor.shutdown(wait=False)
-            except Exception:
-                pass
+        # 排队中的探测直接取消（不等待正在运行的任务）
+        job = self._job
+        if job is not None:
+            job.cancel()
 
     # -------------------------
     # 可选：返回当前扫描状态（供外部查询）
     # -------------------------
     def is_scanning(self) -> bool:
-        return bool(self._scan_thread and self._scan_thread.is_alive())
+        return bool(self._scan_task and not self._scan_task.done())
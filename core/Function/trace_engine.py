@@ -0,0 +1,660 @@
+import heapq
+import itertools
+import os
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core.Function.cancel import STOP_SLICE
+from core.Function.icmp_engine import build_echo_request, _default_source_address
+from core.Function.ping_stats import StreamingStats
+from core.Function.rate_budget import RateBudget
+from core.Function.scheduler import Scheduler, shared_scheduler
+
+import logging
+logger = logging.getLogger(__name__)
+
+ICMP_ECHO_REPLY = 0
+ICMP_DEST_UNREACHABLE = 3
+ICMP_ECHO_REQUEST = 8
+ICMP_TIME_EXCEEDED = 11
+
+# Linux：IP_RECVERR 选项与扩展错误中 ICMP 来源的取值（socket 模块未导出）
+_IP_RECVERR = 11
+_SO_EE_ORIGIN_ICMP = 2
+
+# 原始套接字的回显 id：每个通道不同，并发追踪时互不干扰
+_IDENTS = itertools.count((os.getpid() + 1) & 0xFFFF)
+
+# 一个探测的应答：seq 为发送时的序号，reached 表示来自目标本身（回显应答 / 目标不可达）
+ProbeReply = namedtuple("ProbeReply", "seq address reached received_at")
+
+
+class ProbeTransport:
+    """
+    ProbeTransport: 路由追踪的探测通道接口。
+
+        open(dest_ip)              准备向 dest_ip 发送探测
+        send(ttl, seq) -> float    以指定 TTL 发送一个探测，返回发送时间（perf_counter）
+        receive(timeout) -> list   最多等待 timeout 秒，返回这段时间内收到的 ProbeReply
+        close()
+    """
+
+    def open(self, dest_ip: str):
+        raise NotImplementedError
+
+    def send(self, ttl: int, seq: int) -> float:
+        raise NotImplementedError
+
+    def receive(self, timeout: float) -> List[ProbeReply]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def parse_icmp_packet(data: bytes) -> Optional[Tuple[int, int, int]]:
+    """
+    解析收到的 ICMP 报文，返回 (类型, id, seq)；不相关的报文返回 None。
+    - 回显应答：id / seq 取自报文本身
+    - 超时 / 目标不可达：id / seq 取自报文中携带的原始回显请求
+    """
+    if len(data) >= 20 and data[0] >> 4 == 4:
+        data = data[(data[0] & 0x0F) * 4:]
+    if len(data) < 8:
+        return None
+    icmp_type = data[0]
+    if icmp_type == ICMP_ECHO_REPLY:
+        ident, seq = struct.unpack("!HH", data[4:8])
+        return icmp_type, ident, seq
+    if icmp_type in (ICMP_TIME_EXCEEDED, ICMP_DEST_UNREACHABLE):
+        inner = data[8:]
+        if len(inner) < 20 or inner[0] >> 4 != 4:
+            return None
+        inner = inner[(inner[0] & 0x0F) * 4:]
+        if len(inner) < 8 or inner[0] != ICMP_ECHO_REQUEST:
+            return None
+        ident, seq = struct.unpack("!HH", inner[4:8])
+        return icmp_type, ident, seq
+    return None
+
+
+class IcmpProbeTransport(ProbeTransport):
+    """
+    IcmpProbeTransport: 用 ICMP 回显请求 + IP_TTL 探测。
+
+    - 优先使用原始套接字（root / 管理员），直接收到路由器返回的 ICMP 超时报文
+    - 否则在 Linux 上使用无需特权的 SOCK_DGRAM + IPPROTO_ICMP，
+      超时报文通过 IP_RECVERR 错误队列（MSG_ERRQUEUE）读取
+    - 都不可用时 available() 返回 False，调用方应退回系统 tracert
+    """
+
+    PAYLOAD = b"Network-tools-trace" + b"\0" * 13
+
+    def __init__(self, local_ip: Optional[str] = None):
+        self.local_ip = local_ip or None
+        self.sock: Optional[socket.socket] = None
+        self.is_dgram = False
+        self.dest = None
+        self.ident = 0
+
+    @staticmethod
+    def _open_socket() -> Tuple[socket.socket, bool]:
+        try:
+            return socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP), False
+        except OSError:
+            if not sys.platform.startswith("linux"):
+                raise
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            sock.setsockopt(socket.SOL_IP, _IP_RECVERR, 1)
+            return sock, True
+
+    @classmethod
+    def available(cls) -> bool:
+        try:
+            sock, _ = cls._open_socket()
+            sock.close()
+            return True
+        except OSError:
+            return False
+
+    def open(self, dest_ip: str):
+        self.dest = dest_ip
+        self.sock, self.is_dgram = self._open_socket()
+        if self.local_ip:
+            self.sock.bind((self.local_ip, 0))
+        elif sys.platform.startswith("win"):
+            # Windows 原始套接字必须先绑定到具体接口地址才能接收
+            self.sock.bind((_default_source_address(), 0))
+        self.sock.setblocking(False)
+        # SOCK_DGRAM 下内核会把 id 改写为本地端口
+        self.ident = self.sock.getsockname()[1] if self.is_dgram else next(_IDENTS) & 0xFFFF
+
+    def send(self, ttl: int, seq: int) -> float:
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, ttl)
+        packet = build_echo_request(self.ident, seq, self.PAYLOAD)
+        sent_at = time.perf_counter()
+        try:
+            self.sock.sendto(packet, (self.dest, 0))
+        except OSError as e:
+            # 例如 Linux 上路由不可达：当作无应答的探测
+            logger.debug(f"路由探测发送失败 ttl={ttl}: {e}")
+        return sent_at
+
+    def receive(self, timeout: float) -> List[ProbeReply]:
+        readable, _, _ = select.select([self.sock], [], [], max(0.0, timeout))
+        if not readable:
+            return []
+        replies = []
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(2048)
+            except BlockingIOError:
+                break
+            except OSError:
+                # SOCK_DGRAM 有待读的扩展错误时，普通读取会先返回一次错误
+                if self.is_dgram:
+                    continue
+                break
+            reply = self._match(data, addr[0])
+            if reply:
+                replies.append(reply)
+        if self.is_dgram:
+            replies.extend(self._read_error_queue())
+        return replies
+
+    def _match(self, data: bytes, address: str) -> Optional[ProbeReply]:
+        parsed = parse_icmp_packet(data)
+        if parsed is None:
+            return None
+        icmp_type, ident, seq = parsed
+        if not self.is_dgram and ident != self.ident:
+            return None     # 原始套接字会收到其它进程的 ICMP
+        if icmp_type == ICMP_ECHO_REPLY and address != self.dest:
+            return None
+        reached = icmp_type == ICMP_ECHO_REPLY or (icmp_type == ICMP_DEST_UNREACHABLE and address == self.dest)
+        return ProbeReply(seq, address, reached, time.perf_counter())
+
+    def _read_error_queue(self) -> List[ProbeReply]:
+        """读取 IP_RECVERR 错误队列：数据为原始回显请求，控制消息中是 ICMP 类型和发出者地址"""
+        replies = []
+        while True:
+            try:
+                data, ancdata, _, _ = self.sock.recvmsg(2048, 512, socket.MSG_ERRQUEUE)
+            except OSError:
+                return replies
+            now = time.perf_counter()
+            if len(data) < 8:
+                continue
+            seq = struct.unpack("!H", data[6:8])[0]
+            for level, kind, cmsg in ancdata:
+                if level != socket.SOL_IP or kind != _IP_RECVERR or len(cmsg) < 24:
+                    continue
+                _, origin, icmp_type, _, _, _, _ = struct.unpack("=IBBBBII", cmsg[:16])
+                if origin != _SO_EE_ORIGIN_ICMP:
+                    continue
+                address = socket.inet_ntoa(cmsg[20:24])   # sockaddr_in：family(2) + port(2) + addr(4)
+                if icmp_type == ICMP_TIME_EXCEEDED:
+                    replies.append(ProbeReply(seq, address, False, now))
+                elif icmp_type == ICMP_DEST_UNREACHABLE:
+                    replies.append(ProbeReply(seq, address, address == self.dest, now))
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class SimulatedTopology(ProbeTransport):
+    """
+    SimulatedTopology: 模拟的路径，用于测试和基准测试，不发出任何报文。
+
+        SimulatedTopology([("10.0.0.1", 0.002), (None, 0), ("10.0.2.1", 0.010)], dest_rtt=0.015)
+
+    - hops[i] 为第 i+1 跳的 (地址, 往返时间秒)，地址为 None 表示该跳不回应
+    - TTL 超过 len(hops) 的探测由目标回应，往返时间 dest_rtt
+    - routes: 可选，{目标: (hops, dest_rtt)}，模拟到多个目标的不同路径；不在其中的目标使用 hops
+    - loss: 每个探测独立丢失的概率（按 seq 确定，结果可复现）
+    """
+
+    def __init__(self, hops: Sequence[Tuple[Optional[str], float]], dest_rtt: float = 0.02, loss: float = 0.0,
+                 routes: Optional[Dict[str, Tuple[Sequence[Tuple[Optional[str], float]], float]]] = None):
+        self.hops = list(hops)
+        self.dest_rtt = dest_rtt
+        self.loss = loss
+        self.routes = routes or {}
+        self.dest = None
+        self._pending: List[Tuple[float, int, str, bool]] = []
+        self.sent = 0
+
+    def open(self, dest_ip: str):
+        self.dest = dest_ip
+        self._pending = []
+        if dest_ip in self.routes:
+            hops, self.dest_rtt = self.routes[dest_ip]
+            self.hops = list(hops)
+
+    def send(self, ttl: int, seq: int) -> float:
+        now = time.perf_counter()
+        self.sent += 1
+        if self.loss and (seq * 2654435761 % 1000) / 1000 < self.loss:
+            return now
+        if ttl <= len(self.hops):
+            address, rtt = self.hops[ttl - 1]
+            if address is not None:
+                heapq.heappush(self._pending, (now + rtt, seq, address, False))
+        else:
+            heapq.heappush(self._pending, (now + self.dest_rtt, seq, self.dest, True))
+        return now
+
+    def receive(self, timeout: float) -> List[ProbeReply]:
+        now = time.perf_counter()
+        if self._pending:
+            wait = min(timeout, self._pending[0][0] - now)
+        else:
+            wait = timeout
+        if wait > 0:
+            time.sleep(wait)
+            now = time.perf_counter()
+        replies = []
+        while self._pending and self._pending[0][0] <= now:
+            due, seq, address, reached = heapq.heappop(self._pending)
+            replies.append(ProbeReply(seq, address, reached, due))
+        return replies
+
+
+class ParallelTracer:
+    """
+    ParallelTracer: 并行路由追踪。一次性发出 TTL 1..max_hops 的全部探测（每跳 probes 个），
+    按 seq 匹配超时 / 回显应答，总耗时约为往返时间的常数倍，而不是 跳数 × 超时。
+
+    - 收到目标的应答后，再最多等待 2 倍目标往返时间 + grace 收集更近的跳，然后结束；
+      只剩比已回应的最远一跳更近的探测未返回时同样处理（不回应的跳不会拖到 timeout）；
+      始终收不到目标应答时等待 timeout
+    - on_hop(hop) 按跳数顺序回调：某一跳的探测全部返回、且之前的跳都已输出时立即输出，
+      其余的跳在结束时补齐（无应答的探测记为 None）
+      hop = {"hop": 跳数, "address": 地址或 None, "rtts_ms": [毫秒或 None, ...], "reached": bool}
+    - trace() 返回按跳数排序的 hop 列表，截止到目标所在的跳
+    - probe(ttls) 只探测指定的 TTL（供 MultiTracer 分段探测使用），调用前需先 open(dest_ip)
+    - budget: 传入 RateBudget 时每个探测发送前按目标取速率令牌（成批发出、不占在途名额）
+    """
+
+    def __init__(self, transport: ProbeTransport, max_hops: int = 20, probes: int = 3,
+                 timeout: float = 1.0, grace: float = 0.05, budget: Optional[RateBudget] = None):
+        self.transport = transport
+        self.budget = budget
+        self.dest: Optional[str] = None
+        self.max_hops = max_hops
+        self.probes = max(1, probes)
+        self.timeout = timeout
+        self.grace = grace
+        self.sent = 0           # 已发送的探测数
+        self._seq = 0           # 多轮探测之间 seq 不重复，迟到的应答不会匹配到新一轮
+
+    def trace(self, dest_ip: str, on_hop: Optional[Callable[[Dict], None]] = None,
+              should_stop: Optional[Callable[[], bool]] = None) -> List[Dict]:
+        self.open(dest_ip)
+        try:
+            return self._trace(on_hop, should_stop)
+        finally:
+            self.transport.close()
+
+    def open(self, dest_ip: str):
+        self.dest = dest_ip
+        self.transport.open(dest_ip)
+
+    def _trace(self, on_hop, should_stop):
+        next_hop = 1        # 下一个按顺序输出的跳
+
+        def release(hops, answered, limit, force):
+            nonlocal next_hop
+            while next_hop <= limit and (force or answered[next_hop] == self.probes):
+                if on_hop:
+                    on_hop(hops[next_hop])
+                next_hop += 1
+
+        def on_update(hops, answered, dest_ttl):
+            # 目标所在的跳只在结束时输出，避免 TTL 更大的目标应答先到时提前输出
+            release(hops, answered, (dest_ttl or self.max_hops + 1) - 1, force=False)
+
+        hops, answered, dest_ttl = self.probe(range(1, self.max_hops + 1), should_stop, on_update)
+        last = dest_ttl or max((ttl for ttl in hops if answered[ttl]), default=0)
+        release(hops, answered, last, force=True)
+        return [hops[ttl] for ttl in range(1, last + 1)]
+
+    def probe(self, ttls: Iterable[int], should_stop: Optional[Callable[[], bool]] = None,
+              on_update: Optional[Callable[[Dict, Dict, Optional[int]], None]] = None,
+              rtt_hint: Optional[float] = None):
+        """
+        对 ttls 中的每个 TTL 同时发出 probes 个探测并收集应答。
+        - rtt_hint: 已知的更远一跳的往返时间（秒），超过其 2 倍 + grace 仍未回应的探测不再等待
+        返回 (hops, answered, dest_ttl)：hops / answered 以 TTL 为键，dest_ttl 为目标应答的最小 TTL（未到达为 None）
+        """
+        transport = self.transport
+        ttls = list(ttls)
+        hops = {ttl: {"hop": ttl, "address": None, "rtts_ms": [None] * self.probes, "reached": False}
+                for ttl in ttls}
+        answered = {ttl: 0 for ttl in ttls}
+        probes: Dict[int, Tuple[int, int, float]] = {}   # seq -> (ttl, 第几个探测, 发送时间)
+
+        budget = self.budget
+        for index in range(self.probes):
+            for ttl in ttls:
+                if budget is not None and not budget.pace(self.dest, should_stop):
+                    break
+                self._seq = self._seq % 0xFFFF + 1
+                probes[self._seq] = (ttl, index, transport.send(ttl, self._seq))
+                self.sent += 1
+
+        deadline = time.perf_counter() + self.timeout
+        if rtt_hint is not None:
+            deadline = min(deadline, time.perf_counter() + 2 * rtt_hint + self.grace)
+        dest_ttl = None
+        far = None          # TTL 最大的应答 (ttl, 收到时间, 往返秒)
+        while probes:
+            now = time.perf_counter()
+            if now >= deadline or (should_stop and should_stop()):
+                break
+            for reply in transport.receive(min(deadline - now, STOP_SLICE)):
+                entry = probes.pop(reply.seq, None)
+                if entry is None:
+                    continue
+                ttl, index, sent_at = entry
+                rtt = (reply.received_at - sent_at) * 1000
+                hop = hops[ttl]
+                hop["address"] = hop["address"] or reply.address
+                hop["rtts_ms"][index] = round(rtt, 3)
+                answered[ttl] += 1
+                if reply.reached:
+                    hop["reached"] = True
+                    if dest_ttl is None or ttl < dest_ttl:
+                        dest_ttl = ttl
+                    deadline = min(deadline, reply.received_at + 2 * rtt / 1000 + self.grace)
+                if far is None or ttl > far[0]:
+                    far = (ttl, reply.received_at, rtt / 1000)
+            # 更远的跳已经回应，更近的跳在 2 倍该往返时间内仍未回应，视为不回应的跳
+            if far is not None and probes and all(ttl < far[0] for ttl, _, _ in probes.values()):
+                deadline = min(deadline, far[1] + 2 * far[2] + self.grace)
+            if on_update:
+                on_update(hops, answered, dest_ttl)
+            if dest_ttl is not None and all(answered[ttl] == self.probes for ttl in ttls if ttl <= dest_ttl):
+                break
+        return hops, answered, dest_ttl
+
+
+class MultiTracer:
+    """
+    MultiTracer: 多目标路由追踪，目标之间共享已知的跳（Doubletree 式停止集合）。
+
+    - 第一个目标完整追踪，得到共同的“主干”
+    - 其余目标在调度器中并发追踪（最多 concurrency 个同时进行；scheduler 为 None 时
+      使用 shared_scheduler()），每个目标：
+        1. 从主干深度 + 1 开始向远端探测：第一段探测到已知目标的最大距离为止，
+           之后每段 forward_step 跳，直到到达目标或 max_hops
+        2. 再从起点向近端分段回退探测（每段 back_step 跳），一旦某一跳 (TTL, 地址)
+           已在缓存中，就认为更近的部分与缓存的路径相同，直接复用，不再探测
+    - 缓存键为 (TTL, 地址)，值为到达该跳的路径前缀
+    - 多个目标共用一段路径时，这段路径只会被探测一次
+
+    用法：
+        tracer = MultiTracer(lambda: IcmpProbeTransport(), max_hops=20)
+        paths = tracer.trace_all(["8.8.8.8", "1.1.1.1"], on_path=None, should_stop=None)
+        tree = build_tree(paths)
+
+    paths: {目标: [hop, ...]}，复用缓存的 hop 带有 "cached": True
+    """
+
+    def __init__(self, transport_factory: Callable[[], ProbeTransport], max_hops: int = 20, probes: int = 3,
+                 timeout: float = 1.0, concurrency: int = 8, forward_step: int = 4, back_step: int = 2,
+                 budget: Optional[RateBudget] = None, scheduler: Optional[Scheduler] = None):
+        self.transport_factory = transport_factory
+        self.budget = budget
+        self.scheduler = scheduler or shared_scheduler()
+        self.max_hops = max_hops
+        self.probes = probes
+        self.timeout = timeout
+        self.concurrency = max(1, concurrency)
+        self.forward_step = max(1, forward_step)
+        self.back_step = max(1, back_step)
+
+        self._lock = threading.Lock()
+        self._cache: Dict[Tuple[int, str], List[Dict]] = {}    # (TTL, 地址) -> 该跳之前的路径
+        self._trunk: Optional[List[Dict]] = None               # 所有已知路径的公共前缀
+        self._max_distance = 0                                 # 已到达目标的最大跳数
+        self.sent = 0
+        self.cached_hops = 0
+
+    def trace_all(self, dests: Sequence[str], on_path: Optional[Callable[[str, List[Dict]], None]] = None,
+                  should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, List[Dict]]:
+        dests = list(dict.fromkeys(dests))
+        paths: Dict[str, List[Dict]] = {}
+
+        def run(dest):
+            if should_stop and should_stop():
+                return
+            path = self._trace_one(dest, should_stop)
+            with self._lock:
+                paths[dest] = path
+            if on_path:
+                on_path(dest, path)
+
+        if not dests:
+            return paths
+        run(dests[0])
+        job = self.scheduler.job("multi_tracert", limit=self.concurrency)
+        try:
+            for future in [job.submit(run, dest) for dest in dests[1:]]:
+                future.result()
+        finally:
+            job.close()
+        return {dest: paths[dest] for dest in dests if dest in paths}
+
+    def _trace_one(self, dest: str, should_stop) -> List[Dict]:
+        tracer = ParallelTracer(self.transport_factory(), max_hops=self.max_hops, probes=self.probes,
+                                timeout=self.timeout, budget=self.budget)
+        tracer.open(dest)
+        try:
+            hops: Dict[int, Dict] = {}
+            dest_ttl = None
+            with self._lock:
+                start = len(self._trunk) + 1 if self._trunk else 1
+                expected = self._max_distance
+            start = min(start, self.max_hops)
+
+            # 1. 向远端分段探测，直到到达目标
+            first = start
+            while first <= self.max_hops and dest_ttl is None:
+                if should_stop and should_stop():
+                    break
+                if first == start and expected >= start:
+                    last = min(self.max_hops, expected)
+                elif first == start and expected == 0:
+                    last = self.max_hops     # 第一个目标：一次探测全部 TTL
+                else:
+                    last = min(self.max_hops, first + self.forward_step - 1)
+                found, _, reached = tracer.probe(range(first, last + 1), should_stop)
+                hops.update(found)
+                dest_ttl = reached
+                first = last + 1
+
+            # 2. 向近端回退探测，遇到缓存中已有的跳即停止
+            prefix: List[Dict] = []
+            ttl = start - 1
+            while ttl >= 1:
+                if should_stop and should_stop():
+                    break
+                low = max(1, ttl - self.back_step + 1)
+                farther = [rtt for k, hop in hops.items() if k > ttl for rtt in hop["rtts_ms"] if rtt is not None]
+                found, _, reached = tracer.probe(range(low, ttl + 1), should_stop,
+                                                 rtt_hint=max(farther) / 1000 if farther else None)
+                if reached is not None:
+                    dest_ttl = reached if dest_ttl is None else min(dest_ttl, reached)
+                hit = None
+                for k in range(ttl, low - 1, -1):
+                    address = found[k]["address"]
+                    if address is not None and not found[k]["reached"]:
+                        with self._lock:
+                            cached = self._cache.get((k, address))
+                        if cached is not None:
+                            hit = k
+                            prefix = [dict(h, cached=True) for h in cached]
+                            break
+                for k in range(max(low, (hit or 0)), ttl + 1):
+                    hops[k] = found[k]
+                if hit is not None:
+                    break
+                ttl = low - 1
+
+            for hop in prefix:
+                hops.setdefault(hop["hop"], hop)
+
+            last = dest_ttl or max((k for k, h in hops.items() if h["address"]), default=0)
+            path = [hops.get(k) or {"hop": k, "address": None, "rtts_ms": [None] * self.probes, "reached": False}
+                    for k in range(1, last + 1)]
+            self._remember(path, reached=dest_ttl is not None)
+            with self._lock:
+                self.sent += tracer.sent
+                self.cached_hops += len(prefix)
+            return path
+        finally:
+            tracer.transport.close()
+
+    def _remember(self, path: List[Dict], reached: bool):
+        """把路径中的每一跳加入缓存，并更新公共主干"""
+        with self._lock:
+            if reached and path:
+                self._max_distance = max(self._max_distance, len(path))
+            for index, hop in enumerate(path):
+                if hop["address"] is not None and not hop["reached"]:
+                    self._cache.setdefault((hop["hop"], hop["address"]), path[:index])
+            routers = [hop for hop in path if not hop["reached"]]
+            if self._trunk is None:
+                self._trunk = routers
+            else:
+                common = 0
+                for old, new in zip(self._trunk, routers):
+                    if old["address"] != new["address"]:
+                        break
+                    common += 1
+                self._trunk = self._trunk[:common]
+
+
+class HopMonitor:
+    """
+    HopMonitor: 持续逐跳监测（类似 mtr）。每轮对每一跳发一个探测，轮与轮之间间隔 interval 秒。
+
+    - 第一轮探测 1..max_hops 找到目标所在的跳，之后每轮只探测到目标为止
+      （目标未回应时探测到最远的有应答的跳 + 1）
+    - 每跳一个 StreamingStats，常量内存，可以连续运行数小时
+    - 每轮结束回调 on_round(round, rows)，rows 为每跳的统计：
+      {"hop", "address", "sent", "received", "loss", "last", "avg", "best", "worst", "stddev"}
+
+    用法：
+        HopMonitor(IcmpProbeTransport(), interval=1.0, budget=None).run(dest_ip, on_round, should_stop, rounds=None)
+    """
+
+    def __init__(self, transport: ProbeTransport, max_hops: int = 30, interval: float = 1.0,
+                 budget: Optional[RateBudget] = None):
+        self.transport = transport
+        self.budget = budget
+        self.max_hops = max_hops
+        self.interval = interval
+        self.hops: Dict[int, Dict] = {}     # 跳数 -> {"address", "stats"}
+
+    def run(self, dest_ip: str, on_round: Callable[[int, List[Dict]], None],
+            should_stop: Optional[Callable[[], bool]] = None, rounds: Optional[int] = None):
+        # 每一轮的等待不超过间隔，保证轮次按固定节奏进行
+        tracer = ParallelTracer(self.transport, max_hops=self.max_hops, probes=1,
+                                timeout=max(0.2, self.interval), budget=self.budget)
+        tracer.open(dest_ip)
+        try:
+            limit = self.max_hops
+            count = 0
+            while not (should_stop and should_stop()) and (rounds is None or count < rounds):
+                begin = time.perf_counter()
+                found, answered, dest_ttl = tracer.probe(range(1, limit + 1), should_stop)
+                if should_stop and should_stop():
+                    break
+                count += 1
+                if dest_ttl is not None:
+                    limit = dest_ttl
+                else:
+                    farthest = max((ttl for ttl in found if answered[ttl]), default=0)
+                    limit = min(self.max_hops, max(limit if count > 1 else 0, farthest + 1))
+                self._record(found, answered, limit)
+                on_round(count, self.rows())
+                remaining = self.interval - (time.perf_counter() - begin)
+                while remaining > 0 and not (should_stop and should_stop()):
+                    time.sleep(min(remaining, STOP_SLICE))
+                    remaining = self.interval - (time.perf_counter() - begin)
+        finally:
+            self.transport.close()
+
+    def _record(self, found, answered, limit):
+        for ttl in list(self.hops):
+            if ttl > limit:
+                del self.hops[ttl]
+        for ttl in range(1, limit + 1):
+            hop = self.hops.get(ttl)
+            if hop is None:
+                hop = self.hops[ttl] = {"address": None, "stats": StreamingStats()}
+            if answered.get(ttl):
+                hop["address"] = found[ttl]["address"]
+                hop["stats"].add_reply(found[ttl]["rtts_ms"][0])
+            else:
+                hop["stats"].add_loss()
+
+    def rows(self) -> List[Dict]:
+        rows = []
+        for ttl in sorted(self.hops):
+            hop = self.hops[ttl]
+            s = hop["stats"].snapshot()
+            rows.append({"hop": ttl, "address": hop["address"], "sent": s["sent"], "received": s["received"],
+                         "loss": round(s["loss"], 1), "last": s["last"], "avg": s["mean"], "best": s["min"],
+                         "worst": s["max"], "stddev": s["stddev"]})
+        return rows
+
+
+def build_tree(paths: Dict[str, List[Dict]]) -> Dict:
+    """
+    把多条路径合并为一棵树：
+        {"address": None, "hop": 0, "children": [{"address", "hop", "children", "destinations", "ends"}, ...]}
+    同一父节点下 (跳数, 地址) 相同的跳合并为一个节点，destinations 为经过该节点的目标，
+    ends 为路径在该节点结束的目标
+    """
+    root = {"hop": 0, "address": None, "children": [], "destinations": [], "ends": []}
+    for dest, path in paths.items():
+        node = root
+        node["destinations"].append(dest)
+        for hop in path:
+            child = next((c for c in node["children"] if c["address"] == hop["address"]), None)
+            if child is None:
+                child = {"hop": hop["hop"], "address": hop["address"], "children": [], "destinations": [], "ends": []}
+                node["children"].append(child)
+            child["destinations"].append(dest)
+            node = child
+        node["ends"].append(dest)
+    return root
+
+
+def format_tree(tree: Dict) -> str:
+    """把 build_tree() 的结果格式化为文本树"""
+    lines = ["本机\n"]
+
+    def walk(node, indent):
+        children = node["children"]
+        for index, child in enumerate(children):
+            last = index == len(children) - 1
+            label = f"{child['hop']:>2}  {child['address'] or '*'}"
+            if child["ends"]:
+                label += f"  ◀ {', '.join(child['ends'])}"
+            lines.append(f"{indent}{'└─ ' if last else '├─ '}{label}\n")
+            walk(child, indent + ("   " if last else "│  "))
+
+    walk(tree, "")
+    return "".join(lines)
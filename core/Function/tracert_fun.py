@@ -1,84 +1,382 @@
+import copy
+import re
+import socket
 import subprocess
-import threading
-import tkinter as tk
-from tkinter import scrolledtext, messagebox
+import sys
+from typing import Optional
+
+from core.Function.cancel import CancelToken, kill_process
+from core.Function.events import EventSink, EVENT_DONE
+from core.Function.rate_budget import RateBudget, shared_budget
+from core.Function.resolver import Resolver, ResolveError, is_literal, shared_resolver
+from core.Function.result_store import ResultStore
+from core.Function.scheduler import Scheduler, shared_scheduler
+from core.Function.targets import TargetSet
+from core.Function.trace_engine import (IcmpProbeTransport, ParallelTracer, MultiTracer, HopMonitor,
+                                        build_tree, format_tree)
+
+_WINDOWS = sys.platform.startswith("win")
+# 跳数行："  3     4 ms     3 ms    <1 ms  10.0.0.1"（tracert）或 " 3  10.0.0.1  0.512 ms ..."（traceroute -n）
+_HOP_PATTERN = re.compile(r'^\s*(\d+)\s+(.*)$')
+_HOP_RTT_PATTERN = re.compile(r'<?\s*(\d+(?:\.\d+)?)\s*(?:ms|毫秒)', re.IGNORECASE)
+_HOP_ADDR_PATTERN = re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}\b|\b[0-9a-fA-F]{0,4}(?::[0-9a-fA-F]{0,4}){2,7}\b')
+
+
+def parse_hop_line(line: str):
+    """解析 tracert / traceroute 的一行输出，返回 {"hop", "address", "rtts_ms"}，不是跳数行时返回 None"""
+    match = _HOP_PATTERN.match(line)
+    if not match:
+        return None
+    rest = match.group(2)
+    addresses = _HOP_ADDR_PATTERN.findall(rest)
+    return {
+        "hop": int(match.group(1)),
+        "address": addresses[-1] if addresses else None,
+        "rtts_ms": [float(v) for v in _HOP_RTT_PATTERN.findall(rest)],
+    }
+
+
+def format_hop(hop) -> str:
+    """按 tracert 的格式输出一跳"""
+    rtts = "".join("     *   " if rtt is None else f"{rtt:>6.1f} ms" for rtt in hop["rtts_ms"])
+    return f"{hop['hop']:>3} {rtts}  {hop['address'] or '请求超时。'}\n"
+
+
+def format_mtr(rows) -> str:
+    """按 mtr 报告的格式输出每跳统计"""
+    def ms(value):
+        return f"{value:>7.1f}" if value is not None else "      -"
+    lines = [f"{'Hop':>4}  {'Host':<16} {'Loss%':>6} {'Snt':>6}{'Last':>7}{'Avg':>7}{'Best':>7}{'Wrst':>7}{'StDev':>7}\n"]
+    for row in rows:
+        lines.append(f"{row['hop']:>4}  {row['address'] or '???':<16} {row['loss']:>6.1f} {row['sent']:>6}"
+                     f"{ms(row['last'])}{ms(row['avg'])}{ms(row['best'])}{ms(row['worst'])}{ms(row['stddev'])}\n")
+    return "".join(lines)
 
 
 class TracertFun:
-    def __init__(self, result_box: scrolledtext.ScrolledText):
-        self.result_box = result_box
+    """
+    TracertFun: 路由追踪。
+
+    - 优先使用进程内并行追踪（ParallelTracer + IcmpProbeTransport）：所有 TTL 的探测一次发出，
+      总耗时约为往返时间的常数倍
+    - ICMP 套接字不可用（无权限）时退回系统命令（Windows tracert，其它系统 traceroute）
+    - transport: 可替换的探测通道（例如 SimulatedTopology），传入后总是使用并行追踪
+    - start_multi_tracert(targets): 多目标并发追踪，共享已探测过的跳，最后输出合并的路径树
+      （需要进程内追踪，每个目标使用 transport 的一个副本）
+    - store: 可选的 ResultStore，单目标与多目标追踪分别记为任务 "tracert" / "multi_tracert"，
+      每一跳一行：host 为目标，port 为跳数，state 为该跳的地址（不回应为 "*"），rtt_ms 为最小往返时间
+    - start_mtr(target, interval): 持续逐跳监测（类似 mtr），每轮通过 "mtr" 事件给出每跳的完整统计，
+      界面据此原地刷新表格，文本框只在结束时输出一次报告
+    - budget: 进程内追踪的发包预算（RateBudget），为 None 时使用全程序共用的 shared_budget()
+    - scheduler: 线程调度器（Scheduler），为 None 时使用全程序共用的 shared_scheduler()；
+      追踪主循环与多目标追踪的各个目标都在其中执行
+    - resolver: 主机名解析缓存（Resolver），为 None 时使用全程序共用的 shared_resolver()，
+      与扫描、Ping 共用解析结果；多目标追踪时目标中的主机名并发解析
+    - stop_tracert(): 直接结束 traceroute 子进程，进程内追踪在 STOP_SLICE（50 ms）内检查停止标志，
+      done 事件在 50 ms 量级内输出
+
+    事件：
+        {"type": "hop", "target", "hop", "address", "rtts_ms"}
+        {"type": "done", "task": "tracert", "target", "stopped", "error", "job"}
+        {"type": "path", "target", "hops": [hop, ...]}                      多目标模式每完成一个目标
+        {"type": "done", "task": "multi_tracert", "stopped", "tree", "probes", "cached_hops", "error", "job"}
+        {"type": "mtr", "target", "round", "hops": [{"hop", "address", "sent", "received", "loss",
+                                                  "last", "avg", "best", "worst", "stddev"}, ...]}
+        {"type": "done", "task": "mtr", "target", "rounds", "hops", "stopped", "error"}
+    """
+
+    # 多目标追踪一次最多的目标数
+    MAX_MULTI_TARGETS = 256
+
+    def __init__(self, output: EventSink, transport=None, max_hops: int = 20, store: Optional[ResultStore] = None,
+                 budget: Optional[RateBudget] = None, scheduler: Optional[Scheduler] = None,
+                 resolver: Optional[Resolver] = None):
+        self.output = output
+        self.budget = budget or shared_budget()
+        self.scheduler = scheduler or shared_scheduler()
+        self.resolver = resolver or shared_resolver()
+        self.store = store
+        self.job_id = None
         self.process = None
         self.stop_flag = False
+        self._token = CancelToken()     # 本次运行的停止信号（结束 traceroute 子进程）
+        self.target = None
+        self.task = None        # 追踪主循环（在调度器中运行）的 Future
+
+        self.transport = transport
+        self.max_hops = max_hops
+        self.use_native = True
 
     def _append_text(self, text: str):
-        """线程安全地输出到文本框"""
-        self.result_box.after(0, lambda: (
-            self.result_box.insert(tk.END, text),
-            self.result_box.see(tk.END)
-        ))
-
-    def start_tracert(self, target: str):
-        """开始追踪"""
-        if self.process:
-            messagebox.showwarning("警告", "⚠️ 正在运行，请先停止再启动。")
-            return
+        """线程安全地输出到文本框（经输出管道合并刷新）"""
+        self.output.write(text)
+
+    def _record_hop(self, target: str, hop: int, address, rtts):
+        """一跳写入结果库（没有 store 时忽略）"""
+        if self.job_id is not None:
+            rtts = [rtt for rtt in rtts if rtt is not None]
+            self.store.add(self.job_id, target, hop, address or "*", min(rtts) if rtts else None)
+
+    def _finish_job(self, error):
+        if self.job_id is not None:
+            self.store.finish_job(self.job_id, "failed" if error else "stopped" if self.stop_flag else "done")
+
+    def start_tracert(self, target: str) -> bool:
+        """开始追踪，成功启动返回 True"""
+        if self.is_running():
+            self.output.notice("警告", "⚠️ 正在运行，请先停止再启动。")
+            return False
 
         if not target.strip():
-            messagebox.showwarning("提示", "请输入目标地址！")
-            return
+            self.output.notice("提示", "请输入目标地址！")
+            return False
 
-        cmd = f'tracert -d -w 500 -h 20 {target}'
         self.stop_flag = False
+        self._token = CancelToken()
+        self.target = target
 
         self._append_text(f"\n=== 开始追踪 {target} ===\n\n")
+        self.job_id = self.store.begin_job("tracert", target) if self.store else None
+
+        if self.transport is not None or (self.use_native and IcmpProbeTransport.available()):
+            self.task = self.scheduler.spawn(self._run_native, target)
+        else:
+            self.task = self.scheduler.spawn(self._run_system_tracert, target, self._token)
+        return True
+
+    def is_running(self) -> bool:
+        return bool(self.task and not self.task.done())
+
+    def _run_native(self, target: str):
+        """进程内并行追踪"""
+        error = None
+        try:
+            dest = self.resolver.resolve(target, socket.AF_INET)
+            self._append_text(f"通过最多 {self.max_hops} 个跃点跟踪到 {target} [{dest}] 的路由（并行探测）:\n\n")
+
+            def on_hop(hop):
+                self._append_text(format_hop(hop))
+                self.output.emit("hop", target=self.target, hop=hop["hop"], address=hop["address"],
+                                 rtts_ms=[rtt for rtt in hop["rtts_ms"] if rtt is not None])
+                self._record_hop(self.target, hop["hop"], hop["address"], hop["rtts_ms"])
 
-        thread = threading.Thread(target=self._run_tracert, args=(cmd,))
-        thread.daemon = True
-        thread.start()
+            tracer = ParallelTracer(self.transport or IcmpProbeTransport(), max_hops=self.max_hops,
+                                    budget=self.budget)
+            hops = tracer.trace(dest, on_hop=on_hop, should_stop=lambda: self.stop_flag)
+            if not self.stop_flag and not (hops and hops[-1]["reached"]):
+                self._append_text("\n目标未响应。\n")
+        except Exception as e:
+            error = str(e)
+            self._append_text(f"\n❌ 错误: {e}\n")
+        finally:
+            if self.stop_flag:
+                self._append_text("\n=== 已停止追踪 ===\n")
+            else:
+                self._append_text("\n--- 追踪结束 ---\n")
+            try:
+                self._finish_job(error)
+            finally:
+                self.output.emit(EVENT_DONE, task="tracert", target=self.target, stopped=self.stop_flag,
+                                 error=error, job=self.job_id)
+
+    def start_multi_tracert(self, targets: str) -> bool:
+        """多目标追踪，targets 支持 CIDR / 地址范围 / 主机名列表（见 TargetSet），成功启动返回 True"""
+        if self.is_running():
+            self.output.notice("警告", "⚠️ 正在运行，请先停止再启动。")
+            return False
+        try:
+            target_set = TargetSet(targets)
+        except ValueError as e:
+            self.output.notice("输入错误", str(e))
+            return False
+        if len(target_set) > self.MAX_MULTI_TARGETS:
+            self.output.notice("输入错误", f"目标过多（{len(target_set)} 个），多目标追踪最多 {self.MAX_MULTI_TARGETS} 个")
+            return False
+        if self.transport is None and not IcmpProbeTransport.available():
+            self.output.notice("错误", "多目标追踪需要 ICMP 套接字权限（管理员 / root）", level="error")
+            return False
+
+        self.stop_flag = False
+        self._token = CancelToken()
+        self.target = targets
+        self._append_text(f"\n=== 开始多目标追踪 {targets}（共 {len(target_set)} 个目标）===\n\n")
+        self.job_id = self.store.begin_job("multi_tracert", targets) if self.store else None
+        self.task = self.scheduler.spawn(self._run_multi, list(target_set))
+        return True
 
-    def _run_tracert(self, cmd: str):
+    def _run_multi(self, targets):
+        """多目标并发追踪，完成后输出合并的路径树"""
+        error = None
+        tree = None
+        tracer = None
+        try:
+            addresses, errors = self.resolver.resolve_all(targets, socket.AF_INET, should_stop=lambda: self.stop_flag)
+            resolved = {}
+            for target in targets:
+                dest = addresses.get(target, target)
+                if is_literal(dest):
+                    resolved.setdefault(dest, target)
+                elif target in errors:
+                    self._append_text(f"{errors[target]}\n")
+
+            template = self.transport or IcmpProbeTransport()
+            tracer = MultiTracer(lambda: copy.copy(template), max_hops=self.max_hops, budget=self.budget,
+                                 scheduler=self.scheduler)
+            done = 0
+
+            def on_path(dest, hops):
+                nonlocal done
+                done += 1
+                target = resolved[dest]
+                route = " → ".join(hop["address"] or "*" for hop in hops)
+                reached = hops and hops[-1]["reached"]
+                self._append_text(f"{target}（{len(hops)} 跳{'' if reached else '，未到达'}）: {route}\n")
+                self.output.emit("path", target=target, hops=hops)
+                for hop in hops:
+                    self._record_hop(target, hop["hop"], hop["address"], hop["rtts_ms"])
+                self.output.set_progress(f"进度: {done}/{len(resolved)}")
+
+            paths = tracer.trace_all(list(resolved), on_path=on_path, should_stop=lambda: self.stop_flag)
+            tree = build_tree({resolved[dest]: hops for dest, hops in paths.items()})
+            self._append_text("\n==== 合并路径 ====\n" + format_tree(tree))
+            self._append_text(f"\n共发送 {tracer.sent} 个探测，复用已知的跳 {tracer.cached_hops} 次\n")
+        except Exception as e:
+            error = str(e)
+            self._append_text(f"\n❌ 错误: {e}\n")
+        finally:
+            if self.stop_flag:
+                self._append_text("\n=== 已停止追踪 ===\n")
+            else:
+                self._append_text("\n--- 追踪结束 ---\n")
+            try:
+                self._finish_job(error)
+            finally:
+                self.output.emit(EVENT_DONE, task="multi_tracert", stopped=self.stop_flag, tree=tree,
+                                 probes=tracer.sent if tracer else 0,
+                                 cached_hops=tracer.cached_hops if tracer else 0, error=error, job=self.job_id)
+
+    def start_mtr(self, target: str, interval: float = 1.0, rounds=None) -> bool:
+        """持续逐跳监测，rounds 为 None 时一直运行到停止，成功启动返回 True"""
+        if self.is_running():
+            self.output.notice("警告", "⚠️ 正在运行，请先停止再启动。")
+            return False
+        if not target.strip():
+            self.output.notice("提示", "请输入目标地址！")
+            return False
+        if interval <= 0:
+            self.output.notice("输入错误", "探测间隔必须大于 0")
+            return False
+        if self.transport is None and not IcmpProbeTransport.available():
+            self.output.notice("错误", "持续监测需要 ICMP 套接字权限（管理员 / root）", level="error")
+            return False
+
+        self.stop_flag = False
+        self._token = CancelToken()
+        self.target = target
+        self.job_id = None
+        self._append_text(f"\n=== 开始持续监测 {target}（每 {interval:g} 秒一轮）===\n")
+        self.task = self.scheduler.spawn(self._run_mtr, target, interval, rounds)
+        return True
+
+    def _run_mtr(self, target: str, interval: float, rounds):
+        """持续监测循环，每轮只发事件，结束时把最终统计写入文本框"""
+        error = None
+        monitor = None
+        count = 0
+        try:
+            dest = self.resolver.resolve(target, socket.AF_INET)
+            monitor = HopMonitor(self.transport or IcmpProbeTransport(), max_hops=self.max_hops, interval=interval,
+                                 budget=self.budget)
+
+            def on_round(n, rows):
+                nonlocal count
+                count = n
+                self.output.emit("mtr", target=self.target, round=n, hops=rows)
+                self.output.set_progress(f"第 {n} 轮")
+
+            monitor.run(dest, on_round, should_stop=lambda: self.stop_flag, rounds=rounds)
+        except Exception as e:
+            error = str(e)
+            self._append_text(f"\n❌ 错误: {e}\n")
+        finally:
+            rows = []
+            try:
+                rows = monitor.rows() if monitor else []
+                if rows:
+                    self._append_text(f"\n{target}，共 {count} 轮:\n" + format_mtr(rows))
+                if self.stop_flag:
+                    self._append_text("\n=== 已停止监测 ===\n")
+                else:
+                    self._append_text("\n--- 监测结束 ---\n")
+            finally:
+                self.output.emit(EVENT_DONE, task="mtr", target=self.target, rounds=count, hops=rows,
+                                 stopped=self.stop_flag, error=error)
+
+    def _run_system_tracert(self, target: str, token: CancelToken):
+        """在调度器线程中解析目标（使用共用缓存）后执行系统命令；无法解析时交给系统命令报告错误"""
+        try:
+            address = self.resolver.resolve(target, socket.AF_INET)
+        except ResolveError:
+            address = target
+        if _WINDOWS:
+            cmd = ['tracert', '-d', '-w', '500', '-h', str(self.max_hops), address]
+        else:
+            cmd = ['traceroute', '-n', '-w', '1', '-m', str(self.max_hops), address]
+        self._run_tracert(cmd, token)
+
+    def _run_tracert(self, cmd, token: CancelToken):
         """执行 tracert 命令"""
+        error = None
+        process = None
+        key = None
         try:
-            self.process = subprocess.Popen(
+            self.process = process = subprocess.Popen(
                 cmd,
-                shell=True,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
                 text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW  # 隐藏控制台窗口
+                creationflags=subprocess.CREATE_NO_WINDOW if _WINDOWS else 0  # 隐藏控制台窗口
             )
+            # 停止时直接结束子进程（已停止时立即结束），读取随即遇到 EOF
+            key = token.register(lambda: kill_process(process))
 
-            for line in self.process.stdout:
+            for line in process.stdout:
                 if self.stop_flag:
                     break
                 self._append_text(line)
+                hop = parse_hop_line(line)
+                if hop:
+                    self.output.emit("hop", target=self.target, **hop)
+                    self._record_hop(self.target, hop["hop"], hop["address"], hop["rtts_ms"])
 
         except Exception as e:
+            error = str(e)
             self._append_text(f"\n❌ 错误: {e}\n")
 
         finally:
-            # 安全关闭进程
-            if self.process:
-                try:
-                    self.process.terminate()
-                except Exception:
-                    pass
-                self.process = None
+            # 安全关闭进程（只由本线程关闭，stop_tracert 通过 token 结束进程）
+            if process is not None:
+                token.unregister(key)
+                kill_process(process)
+                process.wait()
+                process.stdout.close()
+            self.process = None
 
             if self.stop_flag:
                 self._append_text("\n=== 已停止追踪 ===\n")
             else:
                 self._append_text("\n--- 追踪结束 ---\n")
+            try:
+                self._finish_job(error)
+            finally:
+                self.output.emit(EVENT_DONE, task="tracert", target=self.target, stopped=self.stop_flag,
+                                 error=error, job=self.job_id)
 
     def stop_tracert(self):
         """停止追踪"""
-        if self.process:
+        if self.is_running():
             self.stop_flag = True
-            try:
-                self.process.terminate()
-            except Exception:
-                pass
-            self.process = None
+            self._token.cancel()
             self._append_text("\n=== 已手动停止追踪 ===\n")
         else:
-            messagebox.showinfo("提示", "当前没有正在运行的追踪任务。")
+            self.output.notice("提示", "当前没有正在运行的追踪任务。", level="info")
@@ -0,0 +1,266 @@
+"""
+命令行入口：不启动 Tk，直接运行各功能类，结果以 JSON Lines 输出到标准输出。
+
+    python -m core.cli scan 10.0.0.0/24 22,80,443
+    python -m core.cli scan 10.0.0.5 1-1024 --banner           # 开放端口识别服务（ssh / http / tls / redis ...）
+    python -m core.cli sweep "192.168.1.0/24, db01"
+    python -m core.cli sweep 10.0.0.0/24 --names                # 存活的地址反查主机名（PTR）
+    python -m core.cli ping 8.8.8.8 --count 10
+    python -m core.cli trace 8.8.8.8
+    python -m core.cli trace-multi "8.8.8.8, 1.1.1.1, 223.5.5.5"
+    python -m core.cli mtr 8.8.8.8 --count 10
+    python -m core.cli ifaces
+    python -m core.cli --store results.db scan 10.0.0.0/16 22,80    # 结果同时写入结果库
+    python -m core.cli export results.db --format csv > latest.csv  # 导出最近一个任务（运行中也可导出）
+    python -m core.cli --store results.db resume                    # 继续最近一个停止或中断的扫描 / 批量 Ping
+    python -m core.cli diff results.db                              # 最近一个任务与同目标上一次的变化
+    python -m core.cli --rate 500 --subnet-inflight 50 scan 10.0.0.0/16 22,80   # 限制发包速率与在途数
+
+每行一个事件（见 core.Function.events.EventSink），最后一行为 {"type": "done", ...}。
+加 --text 时改为输出与图形界面相同的文本。按 Ctrl+C 会停止任务并输出已有结果。
+
+退出码：0 正常结束（任务本身的错误见 done 事件的 error 字段），1 运行失败，2 参数错误，130 被中断。
+"""
+import argparse
+import json
+import os
+import sys
+
+from core.Function.events import EventStream, EVENT_DONE
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m core.cli", description="Network-tools 命令行（无界面）")
+    parser.add_argument("--text", action="store_true", help="输出文本而不是 JSON Lines")
+    parser.add_argument("--store", default=None, help="结果库文件（SQLite），扫描 / Ping / 追踪的结果追加写入")
+    parser.add_argument("--rate", type=float, default=0, help="全局每秒探测数上限，0 为不限")
+    parser.add_argument("--inflight", type=int, default=0, help="全局在途探测数上限，0 为不限")
+    parser.add_argument("--subnet-rate", type=float, default=0, help="每个目标网段（/24、/64）每秒探测数上限")
+    parser.add_argument("--subnet-inflight", type=int, default=0, help="每个目标网段的在途探测数上限")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("scan", help="多主机 × 多端口 TCP 扫描")
+    p.add_argument("targets", help="目标，如 10.0.0.0/24, 10.0.1.1-10.0.1.20, db01")
+    p.add_argument("ports", help="端口，如 22,80,8000-8100")
+    p.add_argument("--timeout", type=float, default=None, help="固定超时（秒），默认按 RTT 自适应")
+    p.add_argument("--engine", choices=["async", "thread"], default="async")
+    p.add_argument("--concurrency", type=int, default=2000, help="最大在途连接数")
+    p.add_argument("--banner", action="store_true", help="开放端口读取 banner / 发送协议探测识别服务")
+    p.add_argument("--banner-concurrency", type=int, default=32, help="服务识别的最大并发数")
+    p.add_argument("--names", action="store_true", help="有开放端口的主机反查主机名（PTR）")
+
+    p = sub.add_parser("sweep", help="批量 Ping")
+    p.add_argument("targets", help="目标，如 192.168.1.0/24, 10.0.0.1-10.0.0.50, db01")
+    p.add_argument("--local-ip", default=None)
+    p.add_argument("--subprocess", action="store_true", help="不使用进程内 ICMP 引擎，调用系统 ping")
+    p.add_argument("--names", action="store_true", help="存活的地址反查主机名（PTR）")
+
+    p = sub.add_parser("ping", help="Ping 单个目标")
+    p.add_argument("host")
+    p.add_argument("--count", type=int, default=4)
+    p.add_argument("--local-ip", default=None)
+
+    p = sub.add_parser("trace", help="路由追踪")
+    p.add_argument("host")
+
+    p = sub.add_parser("trace-multi", help="多目标路由追踪（共享已知的跳，输出合并的路径树）")
+    p.add_argument("targets", help="目标，如 8.8.8.8, 1.1.1.1, 10.0.0.0/28")
+
+    p = sub.add_parser("mtr", help="持续逐跳监测（类似 mtr），每轮输出每跳的丢包与延迟统计")
+    p.add_argument("host")
+    p.add_argument("--interval", type=float, default=1.0, help="每轮间隔（秒）")
+    p.add_argument("--count", type=int, default=None, help="轮数，默认一直运行到 Ctrl+C")
+
+    p = sub.add_parser("resume", help="从检查点继续已停止或中断的扫描 / 批量 Ping（需要 --store）")
+    p.add_argument("--job", type=int, default=None, help="任务编号，默认最近一个可以继续的任务")
+
+    p = sub.add_parser("export", help="把结果库中的一个任务导出为 CSV / JSON Lines（输出到标准输出）")
+    p.add_argument("db", help="结果库文件")
+    p.add_argument("--job", type=int, default=None, help="任务编号，默认最近一个任务")
+    p.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+
+    p = sub.add_parser("diff", help="对比结果库中的两个任务：新增、消失和状态变化的主机 / 端口")
+    p.add_argument("db", help="结果库文件")
+    p.add_argument("--old", type=int, default=None, help="旧任务编号，默认新任务的上一次同目标任务")
+    p.add_argument("--new", type=int, default=None, help="新任务编号，默认最近一个任务")
+
+    sub.add_parser("ifaces", help="列出网卡配置")
+    return parser
+
+
+def _print_json(obj):
+    sys.stdout.write(json.dumps(obj, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def _start(args, stream, store):
+    """启动对应的后台任务，返回 (是否启动, 停止函数)"""
+    if args.command == "scan":
+        from core.Function.telnet_fun import PortScanner
+        scanner = PortScanner(stream, engine=args.engine, async_concurrency=args.concurrency, store=store,
+                              fingerprint=args.banner, banner_concurrency=args.banner_concurrency,
+                              reverse_dns=args.names)
+        return scanner.start_sweep_scan(args.targets, args.ports, timeout=args.timeout), scanner.stop_scan
+    if args.command == "sweep":
+        from core.Function.ping_fun import PingFun
+        pinger = PingFun(stream, store=store, reverse_dns=args.names)
+        pinger.use_native = not args.subprocess
+        return pinger.start_batch_ping(args.targets, local_ip=args.local_ip), pinger.stop_batch_ping
+    if args.command == "resume":
+        return _resume(args, stream, store)
+    if args.command == "ping":
+        from core.Function.ping_fun import PingFun
+        pinger = PingFun(stream, store=store)
+        pinger.strat_ping(args.host, local_ip=args.local_ip, count=args.count)
+        return True, pinger.stop_ping
+    from core.Function.tracert_fun import TracertFun
+    tracer = TracertFun(stream, store=store)
+    if args.command == "trace-multi":
+        return tracer.start_multi_tracert(args.targets), tracer.stop_tracert
+    if args.command == "mtr":
+        return tracer.start_mtr(args.host, interval=args.interval, rounds=args.count), tracer.stop_tracert
+    return tracer.start_tracert(args.host), tracer.stop_tracert
+
+
+def _resume(args, stream, store):
+    """继续结果库中已停止或中断的扫描 / 批量 Ping（默认最近的一个）"""
+    from core.Function.ping_fun import PingFun
+    from core.Function.telnet_fun import PortScanner
+    if store is None:
+        sys.stderr.write("resume 需要用 --store 指定结果库\n")
+        return False, None
+    job = args.job
+    if job is None:
+        candidates = [j for j in (store.resumable_job("scan"), store.resumable_job("batch_ping")) if j is not None]
+        job = max(candidates) if candidates else None
+    info = store.job_info(job) if job is not None else None
+    if info and info["kind"] == "batch_ping":
+        pinger = PingFun(stream, store=store)
+        return pinger.resume_batch_ping(job), pinger.stop_batch_ping
+    scanner = PortScanner(stream, store=store)
+    return scanner.resume_scan(job), scanner.stop_scan
+
+
+def main(argv=None) -> int:
+    args = _build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    if args.command == "ifaces":
+        from core.Function.network_fun import NetworkManager
+        from core.Function.iface_cache import InterfaceCache
+        try:
+            adapters = InterfaceCache(fallback=NetworkManager(EventStream()).get_network_info).load()
+        except Exception as e:
+            sys.stderr.write(f"获取网卡信息失败: {e}\n")
+            return 1
+        for adapter in adapters:
+            if args.text:
+                sys.stdout.write("".join(f"{key}: {', '.join(value) if isinstance(value, list) else value}\n"
+                                         for key, value in adapter.items()) + "\n")
+            else:
+                _print_json(dict(type="interface", **adapter))
+        return 0
+
+    if args.command == "export":
+        return _export(args)
+    if args.command == "diff":
+        return _diff(args)
+
+    limits = dict(rate=args.rate, inflight=args.inflight, subnet_rate=args.subnet_rate,
+                  subnet_inflight=args.subnet_inflight)
+    if any(limits.values()):
+        from core.Function.rate_budget import shared_budget
+        shared_budget().configure(**limits)
+
+    store = None
+    if args.store:
+        from core.Function.result_store import ResultStore
+        store = ResultStore(args.store)
+    try:
+        return _run(args, store)
+    finally:
+        if store:
+            store.close()
+
+
+def _export(args) -> int:
+    from core.Function.result_store import ResultStore
+    if not os.path.exists(args.db):
+        sys.stderr.write(f"结果库不存在: {args.db}\n")
+        return 2
+    store = ResultStore(args.db)
+    try:
+        job = args.job if args.job is not None else store.latest_job()
+        if job is None:
+            sys.stderr.write("结果库中没有任务\n")
+            return 2
+        count = store.export(job, sys.stdout, args.format)
+        sys.stdout.flush()
+        sys.stderr.write(f"任务 {job}：导出 {count} 条结果\n")
+        return 0
+    finally:
+        store.close()
+
+
+def _diff(args) -> int:
+    from core.Function.result_store import ResultStore, format_diff
+    if not os.path.exists(args.db):
+        sys.stderr.write(f"结果库不存在: {args.db}\n")
+        return 2
+    store = ResultStore(args.db)
+    try:
+        new = args.new if args.new is not None else store.latest_job()
+        old = args.old if args.old is not None else (store.previous_job(new) if new is not None else None)
+        if new is None or old is None:
+            sys.stderr.write("没有可对比的两个任务（同一目标需要至少一次已完成的任务）\n")
+            return 2
+        diff = store.diff(old, new)
+        if args.text:
+            sys.stdout.write(format_diff(diff))
+            return 0
+        for change in ("new", "gone", "changed"):
+            for item in diff[change]:
+                print(json.dumps({"type": "change", "change": change, **item}, ensure_ascii=False))
+        print(json.dumps({"type": "done", "task": "diff", "old_job": old, "new_job": new,
+                          **{change: len(diff[change]) for change in ("new", "gone", "changed")}}))
+        return 0
+    finally:
+        store.close()
+
+
+def _run(args, store) -> int:
+    stream = EventStream(on_text=sys.stdout.write if args.text else None)
+    started, stop = _start(args, stream, store)
+    if not started:
+        return 2
+
+    interrupted = False
+    while True:
+        try:
+            # 带超时等待，保证 Windows 上也能及时响应 Ctrl+C
+            event = stream.get(timeout=0.5)
+        except KeyboardInterrupt:
+            if interrupted:
+                return 130
+            interrupted = True
+            stop()
+            continue
+        if event is None:
+            continue
+        if not args.text:
+            _print_json(event)
+        if event["type"] == EVENT_DONE:
+            break
+    if args.text:
+        sys.stdout.flush()
+    if args.rate or args.inflight or args.subnet_rate or args.subnet_inflight:
+        from core.Function.rate_budget import shared_budget
+        sys.stderr.write(f"发包预算: {json.dumps(shared_budget().snapshot(), ensure_ascii=False)}\n")
+    return 130 if interrupted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,9 @@ import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
+from core.Function.result_store import format_diff
+from core.Function.scheduler import shared_scheduler
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -109,4 +112,52 @@ class BasicUI:
                 "frame": group_frame,
                 "btn": btn,
             }
-        
\ No newline at end of file
+        
+    def export_job(self, store, job_id, output):
+        """
+        把结果库中一个任务的结果导出为 CSV / JSON Lines 文件。
+        - 在调度器线程中按游标分批写文件，任务仍在运行时也可以导出（只包含已写入的结果）
+        - output: 当前页的 OutputPipe，用于输出导出结果
+        """
+        if store is None or job_id is None:
+            messagebox.showinfo("提示", "还没有可导出的结果，请先运行一次任务。")
+            return
+        path = filedialog.asksaveasfilename(
+            title="导出结果", defaultextension=".csv", initialfile=f"job_{job_id}.csv",
+            filetypes=[("CSV 文件", "*.csv"), ("JSON Lines", "*.jsonl")])
+        if not path:
+            return
+        fmt = "jsonl" if path.lower().endswith(".jsonl") else "csv"
+
+        def run():
+            try:
+                store.flush(timeout=5)
+                with open(path, "w", newline="", encoding="utf-8-sig" if fmt == "csv" else "utf-8") as f:
+                    count = store.export(job_id, f, fmt)
+                output.write(f"\n已导出任务 {job_id} 的 {count} 条结果到 {path}\n")
+            except Exception as e:
+                logger.error(f"导出结果失败: {e}")
+                output.write(f"\n导出结果失败: {e}\n")
+
+        shared_scheduler().submit(run)
+
+    def diff_job(self, store, job_id, output):
+        """
+        对比一个任务与同一目标上一次完成的任务，在 output 中列出新增、消失和状态变化的主机 / 端口
+        """
+        if store is None or job_id is None:
+            messagebox.showinfo("提示", "还没有可对比的结果，请先运行一次任务。")
+            return
+
+        def run():
+            try:
+                base = store.previous_job(job_id)
+                if base is None:
+                    output.write(f"\n任务 {job_id} 之前没有同一目标已完成的任务，无法对比\n")
+                    return
+                output.write("\n" + format_diff(store.diff(base, job_id)))
+            except Exception as e:
+                logger.error(f"对比结果失败: {e}")
+                output.write(f"\n对比结果失败: {e}\n")
+
+        shared_scheduler().submit(run)
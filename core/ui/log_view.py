@@ -0,0 +1,190 @@
+import os
+import tkinter as tk
+from tkinter import scrolledtext
+from typing import List, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class TextView:
+    """默认视图：直接追加到文本框，不做任何限制"""
+
+    def __init__(self, result_box: scrolledtext.ScrolledText):
+        self.result_box = result_box
+
+    def append(self, text: str):
+        self.result_box.insert(tk.END, text)
+        self.result_box.see(tk.END)
+
+    def clear(self):
+        self.result_box.delete('1.0', tk.END)
+
+
+class BoundedLogView(TextView):
+    """
+    BoundedLogView: 有界、可翻页的日志视图，用于长时间运行的 ping / 路由追踪输出。
+
+    - 所有输出按行追加写入磁盘日志文件 log_path，文本框里最多只保留 max_lines 行，
+      超出的旧行直接从控件中删除（磁盘上仍有完整记录）
+    - 每 page_lines 行记录一次文件偏移，内存中只有这份稀疏索引，
+      与运行时长无关；翻页时按偏移 seek 后读取一页
+    - 跟随模式下新输出实时显示；翻看历史时新输出只写入磁盘，
+      调用 follow() 后重新加载最新的 max_lines 行并恢复跟随
+
+    构造（主线程）：
+        view = BoundedLogView(result_box, log_path, max_lines=2000, status_var=None)
+        - status_var: 可选 StringVar，显示当前位置说明（见 status()）
+
+    方法（主线程）：
+        append(text) / clear()     供 OutputPipe 调用
+        page_back() / page_forward()  向前 / 向后翻一页历史
+        follow()                   回到最新输出
+        status() -> str            当前显示位置的说明文字
+    """
+
+    def __init__(self, result_box: scrolledtext.ScrolledText, log_path: str,
+                 max_lines: int = 2000, page_lines: Optional[int] = None,
+                 status_var: Optional[tk.StringVar] = None):
+        super().__init__(result_box)
+        self.log_path = log_path
+        self.status_var = status_var
+        self.max_lines = max(1, max_lines)
+        self.page_lines = page_lines or self.max_lines
+
+        self.total_lines = 0              # 已写入磁盘的完整行数
+        self._partial = False             # 最后一行尚未以换行结束
+        self._page_offsets: List[int] = [0]   # 第 i 页（第 i*page_lines 行）在文件中的字节偏移
+        self._widget_lines = 0            # 文本框中当前的行数（跟随模式）
+        self._page: Optional[int] = None  # None 表示跟随最新输出，否则为正在浏览的页号
+
+        os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+        self._file = open(log_path, "w+b")
+
+    # -------------------------
+    # OutputPipe 接口
+    # -------------------------
+    def append(self, text: str):
+        data = text.encode("utf-8")
+        self._file.seek(0, os.SEEK_END)
+        base = self._file.tell()
+        self._file.write(data)
+
+        # 只在跨越页边界时记录偏移
+        newlines = data.count(b"\n")
+        if newlines:
+            next_page_line = len(self._page_offsets) * self.page_lines
+            if self.total_lines + newlines >= next_page_line:
+                pos = -1
+                line = self.total_lines
+                while True:
+                    pos = data.find(b"\n", pos + 1)
+                    if pos < 0:
+                        break
+                    line += 1
+                    if line == len(self._page_offsets) * self.page_lines:
+                        self._page_offsets.append(base + pos + 1)
+            self.total_lines += newlines
+        self._partial = not data.endswith(b"\n")
+
+        if self._page is not None:
+            self._update_status()
+            return  # 浏览历史中，新输出只写入磁盘
+
+        self.result_box.insert(tk.END, text)
+        self._widget_lines += newlines
+        excess = self._widget_lines - self.max_lines
+        if excess > 0:
+            self.result_box.delete('1.0', f'{excess + 1}.0')
+            self._widget_lines -= excess
+        self.result_box.see(tk.END)
+        self._update_status()
+
+    def clear(self):
+        self.result_box.delete('1.0', tk.END)
+        self._file.seek(0)
+        self._file.truncate()
+        self.total_lines = 0
+        self._partial = False
+        self._page_offsets = [0]
+        self._widget_lines = 0
+        self._page = None
+        self._update_status()
+
+    # -------------------------
+    # 翻页
+    # -------------------------
+    def _last_page(self) -> int:
+        return max(0, (self.total_lines - 1) // self.page_lines) if self.total_lines else 0
+
+    def _read_lines(self, first_line: int, count: int) -> str:
+        """从磁盘读取 [first_line, first_line + count) 行"""
+        self._file.flush()
+        page = first_line // self.page_lines
+        self._file.seek(self._page_offsets[page])
+        skip = first_line - page * self.page_lines
+        chunks = []
+        for index, raw in enumerate(self._file):
+            if index < skip:
+                continue
+            if index >= skip + count:
+                break
+            chunks.append(raw)
+        self._file.seek(0, os.SEEK_END)
+        return b"".join(chunks).decode("utf-8", errors="replace")
+
+    def _show_page(self, page: int):
+        self._page = page
+        self.result_box.delete('1.0', tk.END)
+        self.result_box.insert(tk.END, self._read_lines(page * self.page_lines, self.page_lines))
+        self.result_box.see('1.0')
+        self._update_status()
+
+    def page_back(self):
+        if self._page is None:
+            # 当前可见的最早一行之前的一页
+            first_visible = self.total_lines - self._widget_lines
+            if first_visible <= 0:
+                return
+            page = (first_visible - 1) // self.page_lines
+        else:
+            page = self._page - 1
+        if page >= 0:
+            self._show_page(page)
+
+    def page_forward(self):
+        if self._page is None:
+            return
+        if self._page + 1 > self._last_page():
+            self.follow()
+        else:
+            self._show_page(self._page + 1)
+
+    def follow(self):
+        """回到跟随模式：重新加载最新的 max_lines 行"""
+        self._page = None
+        complete = self.total_lines + (1 if self._partial else 0)
+        first = max(0, complete - self.max_lines)
+        self.result_box.delete('1.0', tk.END)
+        self.result_box.insert(tk.END, self._read_lines(first, complete - first))
+        self._widget_lines = self.total_lines - first
+        self.result_box.see(tk.END)
+        self._update_status()
+
+    def status(self) -> str:
+        if self._page is None:
+            hidden = self.total_lines - self._widget_lines
+            return f"显示最新 {self._widget_lines} 行（更早的 {hidden} 行已保存到日志）" if hidden else ""
+        first = self._page * self.page_lines + 1
+        last = min(self.total_lines, first + self.page_lines - 1)
+        return f"正在查看第 {first}-{last} 行 / 共 {self.total_lines} 行"
+
+    def _update_status(self):
+        if self.status_var is not None:
+            self.status_var.set(self.status())
+
+    def close(self):
+        try:
+            self._file.close()
+        except Exception:
+            pass
@@ -0,0 +1,152 @@
+import queue
+import tkinter as tk
+from tkinter import messagebox, scrolledtext
+from typing import Callable, Dict, Optional
+
+from core.Function.events import EventSink
+from core.ui.log_view import TextView
+
+import logging
+logger = logging.getLogger(__name__)
+
+# 队列中的控制标记
+_CLEAR = object()
+
+
+class OutputPipe(EventSink):
+    """
+    OutputPipe: 结果框的合并输出管道。
+
+    工作线程只往线程安全的队列里放文本，主线程按固定节拍（默认 50ms）
+    一次性取出所有待输出内容，合并成一次 insert + 一次 see，
+    进度只保留最新的一条、每个节拍最多更新一次进度标签。
+    这样无论后台每秒产生多少行结果，Tk 每秒最多只处理 1000/interval 次刷新。
+
+    构造（必须在主线程中创建）：
+        output = OutputPipe(result_box, progress_var=None, interval=50, view=None, on_event=None)
+        - view: 实际写入结果框的视图，默认 TextView（不限行数），
+          长时间运行的输出可使用 BoundedLogView
+        - on_event: 可选，在主线程中接收功能类发出的结构化事件（见 EventSink）
+
+    方法（任意线程均可调用）：
+        write(text)          追加文本
+        clear()              清空结果框（在队列中排队，之前写入的内容不会在清空后出现）
+        set_progress(text)   更新进度标签（只保留最新值）
+        post(func)           在主线程中按顺序执行 func()（例如任务结束后恢复按钮状态）
+        emit(kind, **fields) 结构化事件，有 on_event 时排队到主线程按顺序交给它
+
+    方法（主线程）：
+        notice(title, message, level="warning")  弹出提示框
+    """
+
+    def __init__(self, result_box: scrolledtext.ScrolledText, progress_var: Optional[tk.StringVar] = None,
+                 interval: int = 50, max_batch: int = 20000, view: Optional[TextView] = None,
+                 on_event: Optional[Callable[[Dict], None]] = None):
+        super().__init__(on_event)
+        self.result_box = result_box
+        self.view = view or TextView(result_box)
+        self.progress_var = progress_var
+        self.interval = interval
+        self.max_batch = max_batch
+
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._progress: Optional[str] = None
+        self._shown_progress: Optional[str] = None
+
+        # 统计：实际执行的刷新次数与写入条数
+        self.flushes = 0
+        self.items = 0
+
+        self.result_box.after(self.interval, self._tick)
+
+    # -------------------------
+    # 生产端（任意线程）
+    # -------------------------
+    def write(self, text: str):
+        if text:
+            self._queue.put(text)
+
+    def clear(self):
+        self._queue.put(_CLEAR)
+
+    def post(self, func):
+        self._queue.put(func)
+
+    def set_progress(self, text: str):
+        # 单个引用赋值是原子的，主线程每个节拍读取最新值
+        self._progress = text
+
+    def emit(self, kind: str, **fields):
+        if self.on_event is not None:
+            event = {"type": kind}
+            event.update(fields)
+            self._queue.put(event)
+
+    def notice(self, title: str, message: str, level: str = "warning"):
+        if level == "error":
+            messagebox.showerror(title, message)
+        elif level == "info":
+            messagebox.showinfo(title, message)
+        else:
+            messagebox.showwarning(title, message)
+
+    # -------------------------
+    # 消费端（主线程）
+    # -------------------------
+    def _tick(self):
+        try:
+            self.flush()
+        except tk.TclError:
+            return  # 控件已销毁，停止节拍
+        except Exception as e:
+            logger.error(f"输出刷新失败: {e}")
+        self.result_box.after(self.interval, self._tick)
+
+    def flush(self):
+        """取出队列中所有待输出内容并合并写入（只能在主线程调用）"""
+        batch = []
+        events = []
+        for _ in range(self.max_batch):
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, str):
+                batch.append(item)
+            elif isinstance(item, dict):
+                # 事件不打断文本合并，在本批文本写入后统一交付
+                events.append(item)
+            elif item is _CLEAR:
+                batch.clear()
+                self.view.clear()
+            else:
+                # 回调要在它之前写入的文本和事件之后执行
+                self._insert(batch)
+                self._deliver(events)
+                batch = []
+                events = []
+                try:
+                    item()
+                except Exception as e:
+                    logger.error(f"输出管道回调执行失败: {e}")
+
+        self._insert(batch)
+        self._deliver(events)
+
+        progress = self._progress
+        if progress != self._shown_progress and self.progress_var is not None:
+            self.progress_var.set(progress)
+            self._shown_progress = progress
+
+    def _insert(self, batch):
+        if batch:
+            self.view.append("".join(batch))
+            self.flushes += 1
+            self.items += len(batch)
+
+    def _deliver(self, events):
+        for event in events:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                logger.error(f"输出管道事件处理失败: {e}")
@@ -1,11 +1,12 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import threading
-import re
 
 import logging
 from core.ui.basic_ui import BasicUI
 from core.Function.network_fun import NetworkManager  
+from core.Function.iface_cache import InterfaceCache
+from core.ui.output_pipe import OutputPipe
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +18,13 @@ class NetworkTab(ttk.Frame, BasicUI):
         
         self.networkname_list = []
         self.networkconfig = []
+        self.networkconfigs = []
         self.build_ui()
-        self.netmgr = NetworkManager(self.result_box)
+        self.netmgr = NetworkManager(self.output)
+        # 网卡信息缓存：原生接口读取，系统报告变化时自动更新；不可用时退回 ipconfig /all
+        self.iface_cache = InterfaceCache(fallback=self.netmgr.get_network_info)
+        self.iface_cache.subscribe(self.on_adapters_changed)
+        self.iface_cache.start()
 
     def build_ui(self):
         self.create_iface_section()
@@ -27,24 +33,31 @@ class NetworkTab(ttk.Frame, BasicUI):
         self.create_output_section()
 
     def refresh_allnetwork(self):
-        '''刷新网卡列表'''
-        self.networkname_list = []
-        try:
-            self.networkconfigs = self.netmgr.get_network_info()
-            for config in self.networkconfigs:
-                self.networkname_list.append(config.get("name", "未知网卡"))
-            self.iface_cb['combobox']['values'] = self.networkname_list
-            if self.iface_cb['var'].get() == "" :
-                self.iface_cb['var'].set(self.networkname_list[0])
-            self.result_box.insert(tk.END, f"获取网卡信息完成，共:{len(self.networkname_list)}个启用网卡\n")
-            self.refresh_network_callback()
-
-            logger.info(f"获取网卡信息完成，共:{len(self.networkname_list)}个启用网卡")
-            logger.info(f"所有获取网卡信息：{self.networkconfigs}")
-        except Exception as e:
-            messagebox.showerror("错误", f"获取网卡信息失败: {e}")
-            logger.error(f"获取网卡信息失败: {e}")
-            self.networkconfigs = []
+        '''刷新网卡列表：立即显示缓存；系统不提供变化通知时在后台重新读取'''
+        adapters = self.iface_cache.adapters()
+        if adapters is not None:
+            self.show_adapters(adapters)
+        self.iface_cache.refresh()
+
+    def on_adapters_changed(self, adapters):
+        '''网卡缓存更新（后台线程），转到主线程刷新界面'''
+        self.output.post(lambda: self.show_adapters(adapters))
+
+    def show_adapters(self, adapters):
+        '''用缓存的网卡信息刷新下拉框与详细信息'''
+        self.networkconfigs = adapters
+        self.networkname_list = [config.get("name", "未知网卡") for config in adapters]
+        self.iface_cb['combobox']['values'] = self.networkname_list
+        if not self.networkname_list:
+            self.output.write("未找到网卡\n")
+            return
+        if self.iface_cb['var'].get() not in self.networkname_list:
+            self.iface_cb['var'].set(self.networkname_list[0])
+        self.output.write(f"获取网卡信息完成，共:{len(self.networkname_list)}个网卡（{self.iface_cache.backend}）\n")
+        self.refresh_network_callback()
+
+        logger.info(f"获取网卡信息完成，共:{len(self.networkname_list)}个网卡")
+        logger.info(f"所有获取网卡信息：{self.networkconfigs}")
 
     # ---------------- UI 构建 ----------------
     def create_iface_section(self):
@@ -84,6 +97,7 @@ class NetworkTab(ttk.Frame, BasicUI):
 
         self.result_box = scrolledtext.ScrolledText(frame, width=100, height=12)
         self.result_box.pack(fill='both', expand=True, padx=4, pady=4)
+        self.output = OutputPipe(self.result_box)
 
 
     # ---------------- 事件回调 ----------------
@@ -93,7 +107,7 @@ class NetworkTab(ttk.Frame, BasicUI):
         #self.refresh_allnetwork()
         # 获取选中的网卡信息
         iface_name = self.iface_cb['var'].get()
-        config = self.get_network_config(iface_name)
+        config = self.get_network_config(iface_name) or {}
         # 不可修改配置
         self.description_entry['var'].set(config.get("description", ""))
         self.mac_entry['var'].set(config.get("mac", ""))
@@ -135,8 +149,10 @@ class NetworkTab(ttk.Frame, BasicUI):
 
     def get_network_settings(self):
         '''获取当前输入的网卡配置信息'''
+        # netsh 使用连接名（如 "以太网"、"Ethernet"），而不是 ipconfig 的标题行
+        config = self.get_network_config(self.iface_cb['var'].get()) or {}
         self.networkconfig = {
-            "name": re.sub(r"^(.*?(适配器))\s*", "", self.iface_cb['var'].get()).strip(),
+            "name": config.get("interface", self.iface_cb['var'].get()),
             "ipv4": self.ip_entry['var'].get(),
             "netmask": self.mask_entry['var'].get(),
             "gateway": self.gw_entry['var'].get(),
@@ -147,10 +163,9 @@ class NetworkTab(ttk.Frame, BasicUI):
 
     def output_network_settings(self):
         '''输出当前网卡配置信息到日志框'''
-        self.result_box.insert(tk.END, f"当前网卡配置：\n")
+        self.output.write(f"当前网卡配置：\n")
         for key, value in self.networkconfig.items():
-            self.result_box.insert(tk.END, f"  {key}: {value}\n")
-        self.result_box.see(tk.END)
+            self.output.write(f"  {key}: {value}\n")
 
     def apply_btn_callback(self):
         '''应用当前网卡配置信息'''
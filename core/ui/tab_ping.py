@@ -1,17 +1,22 @@
+import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 
 from core.ui.basic_ui import BasicUI
 from core.Function.ping_fun import PingFun
+from core.ui.output_pipe import OutputPipe
+from core.ui.log_view import BoundedLogView
+from core.logger_config import get_base_dir
 
 import logging
 logger = logging.getLogger(__name__)
 
 class PingTab(ttk.Frame, BasicUI):
-    def __init__(self, parent):
+    def __init__(self, parent, store=None):
         super().__init__(parent)   
+        self.store = store
         self.ping_ui()
-        self.ping_fun = PingFun(self.result_box)
+        self.ping_fun = PingFun(self.output, store=store)
 
     def ping_ui(self):
         """ping界面布局"""
@@ -28,6 +33,7 @@ class PingTab(ttk.Frame, BasicUI):
         self.entry_assignIP_B = self.add_input(frame, "目标IP", row=0, col=1, inivar="127.0.0.1") 
         self.assignIP_startPing = self.add_button(frame, "开始", row=0, col=2, command=self.btn_assignIP_startPing)
         self.assignIP_stopPing = self.add_button(frame, "停止", row=0, col=3, command=self.btn_assignIP_stopPing)
+        self.assignIP_stats = self.add_button(frame, "统计", row=0, col=4, command=self.btn_assignIP_stats)
 
     def create_batchIP_section(self):
         # 区域标签
@@ -35,19 +41,41 @@ class PingTab(ttk.Frame, BasicUI):
         frame.pack(side='top', fill='x', padx=10, pady=5)
 
         self.entry_batchIP_A = self.add_input(frame, "本地IP", row=0, col=0) 
-        self.entry_batchIP_B = self.add_input(frame, "C类网段", row=0, col=1, inivar="192.168.1.", entry_width=15) 
-        self.entry_batchIP_B_begin = self.add_input(frame, "起始地址", row=0, col=2, inivar="1", entry_width=5) 
-        self.entry_batchIP_B_end = self.add_input(frame, "结束地址", row=0, col=3, inivar="255", entry_width=5) 
-        self.batchIP_startPing = self.add_button(frame, "开始", row=0, col=4, command=self.btn_batchIP_startPing)
-        self.batchIP_stopPing = self.add_button(frame, "停止", row=0, col=5, command=self.btn_batchIP_stopPing)
+        # 支持 192.168.1.0/24、10.0.0.0/16、192.168.1.10-192.168.2.20、主机名，逗号分隔
+        self.entry_batchIP_B = self.add_input(frame, "目标", row=0, col=1, inivar="192.168.1.0/24", entry_width=24) 
+        self.batchIP_import = self.add_button(frame, "导入", row=0, col=2, command=self.btn_batchIP_import)
+        self.batchIP_startPing = self.add_button(frame, "开始", row=0, col=3, command=self.btn_batchIP_startPing)
+        self.batchIP_stopPing = self.add_button(frame, "停止", row=0, col=4, command=self.btn_batchIP_stopPing)
+        self.batchIP_resume = self.add_button(frame, "继续上次", row=0, col=5, command=self.btn_batchIP_resume, width=8)
 
     def create_outputping_section(self):
         # 区域标签
         frame = ttk.LabelFrame(self, text="PING 结果输出")
         frame.pack(side='top', fill='x', padx=10, pady=5)
 
-        self.result_box = scrolledtext.ScrolledText(frame, width=100, height=20)
-        self.result_box.pack(pady=10)
+        self.result_box = scrolledtext.ScrolledText(frame, width=100, height=19)
+        self.result_box.pack(pady=(10, 0))
+
+        # 状态栏：进度 / 日志位置 / 翻页按钮
+        bar = ttk.Frame(frame)
+        bar.pack(fill='x', pady=(2, 4))
+        self.progress_var = tk.StringVar()
+        self.log_status_var = tk.StringVar()
+        ttk.Label(bar, textvariable=self.progress_var, anchor='w').pack(side='left')
+        ttk.Button(bar, text="导出结果", width=8, command=self.btn_export).pack(side='right', padx=(5, 0))
+        ttk.Button(bar, text="对比上次", width=8, command=self.btn_diff).pack(side='right', padx=(5, 0))
+        ttk.Button(bar, text="最新", width=5, command=lambda: self.log_view.follow()).pack(side='right')
+        ttk.Button(bar, text="下一页", width=6, command=lambda: self.log_view.page_forward()).pack(side='right')
+        ttk.Button(bar, text="上一页", width=6, command=lambda: self.log_view.page_back()).pack(side='right')
+        ttk.Label(bar, textvariable=self.log_status_var, anchor='e').pack(side='right', padx=5)
+        # 批量 Ping 存活的地址反查主机名（PTR），与探测并行
+        self.reverse_dns_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(bar, text="反查主机名", variable=self.reverse_dns_var).pack(side='right', padx=(0, 5))
+
+        # 文本框只保留最近 2000 行，更早的输出写入日志文件并可翻页查看
+        self.log_view = BoundedLogView(self.result_box, os.path.join(get_base_dir(), 'logs', 'ping_output.log'),
+                                       max_lines=2000, status_var=self.log_status_var)
+        self.output = OutputPipe(self.result_box, progress_var=self.progress_var, view=self.log_view)
 # --------------------------------------按钮回调函数--------------------------------------
     def btn_assignIP_startPing(self):         
         if not self.entry_assignIP_B['var'].get():
@@ -63,60 +91,66 @@ class PingTab(ttk.Frame, BasicUI):
         self.ping_fun.stop_ping()
         self.assignIP_startPing['btn'].config(state='normal')
 
+    def btn_assignIP_stats(self):
+        """运行中实时查看统计（不停止 ping）"""
+        self.ping_fun.show_statistics()
+
     def assignIP_ping_callback(self):
         self.assignIP_startPing['btn'].config(state='normal')
 
     def btn_batchIP_startPing(self):
-        net_prefix = self.entry_batchIP_B['var'].get()
-        start = self.entry_batchIP_B_begin['var'].get()
-        end = self.entry_batchIP_B_end['var'].get()
+        targets = self.entry_batchIP_B['var'].get().strip()
         local_ip = self.entry_batchIP_A['var'].get()
         # ========= 输入参数检查 =========
-        if not net_prefix or start is None or end is None:
-            messagebox.showwarning("输入错误", "请输入完整的网段、起始地址和结束地址！")
-            return
-        try:
-            start = int(start)
-            end = int(end)
-        except ValueError:
-            messagebox.showwarning("输入错误", "起始地址和结束地址必须是整数！")
-            return
-        if start < 1 or end > 255:
-            messagebox.showwarning("输入错误", "起始地址最小为1，结束地址最大为255！")
-            return
-        if start > end:
-            messagebox.showwarning("输入错误", "起始地址不能大于结束地址！")
-            return
-        if not net_prefix.endswith('.'):
-            messagebox.showwarning("输入错误", "网段必须以 '.' 结尾，例如：192.168.1.")
+        if not targets:
+            messagebox.showwarning("输入错误", "请输入目标网段、地址范围或主机列表！")
             return
         if local_ip == "":
-            logger.info(f"开始批量 Ping {net_prefix}{start} - {net_prefix}{end}")
+            logger.info(f"开始批量 Ping {targets}")
         else:
-            logger.info(f"开始由{local_ip} 批量 Ping {net_prefix}{start} - {net_prefix}{end}")
-        
-        self.ping_fun.start_batch_ping(net_prefix, start, end, local_ip=local_ip, callback=self.batchIP_ping_callback)
-        self.batchIP_startPing['btn'].config(state='disabled')
+            logger.info(f"开始由{local_ip} 批量 Ping {targets}")
+
+        self.ping_fun.reverse_dns = self.reverse_dns_var.get()
+        if self.ping_fun.start_batch_ping(targets, local_ip=local_ip, callback=self.batchIP_ping_callback):
+            self.batchIP_startPing['btn'].config(state='disabled')
+
+    def btn_batchIP_import(self):
+        """从文本文件导入主机列表（每行一个地址 / 网段 / 主机名，# 开头为注释）"""
+        path = filedialog.askopenfilename(title="导入主机列表", filetypes=[("文本文件", "*.txt"), ("所有文件", "*.*")])
+        if not path:
+            return
+        try:
+            with open(path, encoding="utf-8-sig", errors="ignore") as f:
+                hosts = [line.split('#', 1)[0].strip() for line in f]
+        except OSError as e:
+            messagebox.showerror("错误", f"读取主机列表失败: {e}")
+            return
+        hosts = [h for h in hosts if h]
+        self.entry_batchIP_B['var'].set(", ".join(hosts))
+        logger.info(f"从 {path} 导入 {len(hosts)} 个目标")
 
     def btn_batchIP_stopPing(self):   
-        net_prefix = self.entry_batchIP_B['var'].get()
-        start = self.entry_batchIP_B_begin['var'].get()
-        end = self.entry_batchIP_B_end['var'].get()
+        targets = self.entry_batchIP_B['var'].get()
         local_ip = self.entry_batchIP_A['var'].get()
         if local_ip == "":
-            logger.info(f"停止批量 Ping {net_prefix}{start} - {net_prefix}{end}")
+            logger.info(f"停止批量 Ping {targets}")
         else:
-            logger.info(f"停止由{local_ip} 批量 Ping {net_prefix}{start} - {net_prefix}{end}")
+            logger.info(f"停止由{local_ip} 批量 Ping {targets}")
         self.ping_fun.stop_batch_ping()
         self.batchIP_startPing['btn'].config(state='normal')
 
+    def btn_batchIP_resume(self):
+        """从检查点继续最近一次停止或中断的批量 Ping"""
+        if self.ping_fun.resume_batch_ping(callback=self.batchIP_ping_callback):
+            self.batchIP_startPing['btn'].config(state='disabled')
+
     def batchIP_ping_callback(self):
         self.batchIP_startPing['btn'].config(state='normal')
 
+    def btn_export(self):
+        """导出最近一次 Ping / 批量 Ping 的结果"""
+        self.export_job(self.store, self.ping_fun.job_id, self.output)
 
-
-
-
-
-   
-        
\ No newline at end of file
+    def btn_diff(self):
+        """对比最近一次批量 Ping 与同一目标上一次的结果"""
+        self.diff_job(self.store, self.ping_fun.job_id, self.output)
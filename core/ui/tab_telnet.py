@@ -3,15 +3,17 @@ from tkinter import ttk, filedialog, messagebox, scrolledtext
 
 from core.ui.basic_ui import BasicUI
 from core.Function.telnet_fun import PortScanner
+from core.ui.output_pipe import OutputPipe
 
 import logging
 logger = logging.getLogger(__name__)
 
 class TelnetTab(ttk.Frame, BasicUI):
-    def __init__(self, parent):
+    def __init__(self, parent, store=None):
         super().__init__(parent)   
+        self.store = store
         self.telnet_ui()
-        self.telnet_fun = PortScanner(self.result_box)
+        self.telnet_fun = PortScanner(self.output, store=store)
 
     def telnet_ui(self):
         """端口扫描界面布局"""
@@ -32,13 +34,14 @@ class TelnetTab(ttk.Frame, BasicUI):
 
     def create_listtelnet_section(self):
         # 区域标签
-        frame = ttk.LabelFrame(self, text="批量端口连接测试")
+        frame = ttk.LabelFrame(self, text="多目标端口扫描（支持 10.0.0.0/24、10.0.0.1-10.0.0.50、主机名，端口支持 80,8000-8100）")
         frame.pack(side='top', fill='x', padx=10, pady=5)
 
-        self.listtelnet_IP = self.add_input(frame, "目标IP", row=0, col=0, inivar="202.89.233.100") 
-        self.listtelnet_ports = self.add_input(frame, "端口列表", row=0, col=1, inivar="21,22,23,25,80,110,143,443,1433,3306,3389", entry_width=40) 
+        self.listtelnet_IP = self.add_input(frame, "目标", row=0, col=0, inivar="202.89.233.100", entry_width=24) 
+        self.listtelnet_ports = self.add_input(frame, "端口列表", row=0, col=1, inivar="21,22,23,25,80,110,143,443,1433,3306,3389", entry_width=36) 
         self.listtelnet_start = self.add_button(frame, "开始", row=0, col=2, command=self.btn_listTelnet_start)
         self.listtelnet_stop = self.add_button(frame, "停止", row=0, col=3, command=self.btn_listTelnet_stop)
+        self.listtelnet_resume = self.add_button(frame, "继续上次", row=0, col=4, command=self.btn_resume, width=8)
     
     def create_batchtelnet_section(self):
         # 区域标签
@@ -56,8 +59,21 @@ class TelnetTab(ttk.Frame, BasicUI):
         frame = ttk.LabelFrame(self, text="端口扫描结果输出")
         frame.pack(side='top', fill='x', padx=10, pady=5)
 
-        self.result_box = scrolledtext.ScrolledText(frame, width=100, height=20)
-        self.result_box.pack(pady=10)
+        self.result_box = scrolledtext.ScrolledText(frame, width=100, height=18)
+        self.result_box.pack(pady=(10, 0))
+        bar = ttk.Frame(frame)
+        bar.pack(fill='x', pady=(2, 4))
+        self.progress_var = tk.StringVar()
+        ttk.Label(bar, textvariable=self.progress_var, anchor='w').pack(side='left')
+        ttk.Button(bar, text="导出结果", width=8, command=self.btn_export).pack(side='right')
+        ttk.Button(bar, text="对比上次", width=8, command=self.btn_diff).pack(side='right', padx=(0, 5))
+        # 开放端口再读取 banner / 发送协议探测识别服务（独立并发上限，不拖慢扫描）
+        self.fingerprint_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(bar, text="识别服务", variable=self.fingerprint_var).pack(side='right', padx=(0, 10))
+        # 有开放端口的主机反查主机名（PTR），与扫描并行
+        self.reverse_dns_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(bar, text="反查主机名", variable=self.reverse_dns_var).pack(side='right', padx=(0, 5))
+        self.output = OutputPipe(self.result_box, progress_var=self.progress_var)
 # --------------------------------------按钮回调函数--------------------------------------
     def btn_assignTelnet_test(self):  
         self.IP = self.assignTelnet_IP['var'].get()  
@@ -99,6 +115,8 @@ class TelnetTab(ttk.Frame, BasicUI):
             messagebox.showwarning("输入错误", "起始端口最小为1，结束端口最大为65535！")
             return
         logger.info(f"开始测试{self.IP} 的 {port_begin} 到 {port_end} 端口连接情况")
+        self.telnet_fun.fingerprint = self.fingerprint_var.get()
+        self.telnet_fun.reverse_dns = self.reverse_dns_var.get()
         self.telnet_fun.start_range_scan(self.IP, port_begin, port_end)
         
     def btn_batchTelnet_stop(self):
@@ -109,27 +127,32 @@ class TelnetTab(ttk.Frame, BasicUI):
         self.IP = self.listtelnet_IP['var'].get()  
         self.ports = self.listtelnet_ports['var'].get()   
         
-        if not self.ports:
-            messagebox.showwarning("输入错误", "请输入端口号或范围！")
+        if not self.IP.strip():
+            messagebox.showwarning("输入错误", "请输入目标IP、网段或域名！")
             return
-
-        # 支持格式：例如 "22,80,443,8080"
-        try:
-            ports = [int(p.strip()) for p in self.ports.split(',') if p.strip()]
-        except ValueError:
-            messagebox.showwarning("输入错误", "端口必须为整数，用逗号分隔")
+        if not self.ports.strip():
+            messagebox.showwarning("输入错误", "请输入端口号或范围！")
             return
 
-        logger.info(f"开始测试{self.IP} 的 {ports} 端口连接情况")
-        self.telnet_fun.start_list_scan(self.IP, ports)
+        # 支持格式：目标 "10.0.0.0/24, 10.0.1.1-10.0.1.20, db01"；端口 "22,80,8000-8100"
+        logger.info(f"开始测试{self.IP} 的 {self.ports} 端口连接情况")
+        self.telnet_fun.fingerprint = self.fingerprint_var.get()
+        self.telnet_fun.reverse_dns = self.reverse_dns_var.get()
+        self.telnet_fun.start_sweep_scan(self.IP, self.ports)
 
     def btn_listTelnet_stop(self):
         logger.info(f"停止测试{self.IP} 的端口连接情况")
         self.telnet_fun.stop_scan()
 
+    def btn_resume(self):
+        """从检查点继续最近一次停止或中断的扫描（使用原来的目标与端口）"""
+        logger.info("继续上次的端口扫描")
+        self.telnet_fun.resume_scan()
 
+    def btn_export(self):
+        """导出最近一次扫描的结果（扫描中也可导出已完成的部分）"""
+        self.export_job(self.store, self.telnet_fun.job_id, self.output)
 
-
-
-   
-        
\ No newline at end of file
+    def btn_diff(self):
+        """对比最近一次扫描与同一目标上一次扫描：新增、消失和状态变化的端口"""
+        self.diff_job(self.store, self.telnet_fun.job_id, self.output)
@@ -1,21 +1,28 @@
+import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 
 from core.ui.basic_ui import BasicUI
 from core.Function.tracert_fun import TracertFun    
+from core.ui.output_pipe import OutputPipe
+from core.ui.log_view import BoundedLogView
+from core.logger_config import get_base_dir
 
 import logging
 logger = logging.getLogger(__name__)
 
 class TracertTab(ttk.Frame, BasicUI):
-    def __init__(self, parent):
+    def __init__(self, parent, store=None):
         super().__init__(parent)   
+        self.store = store
         self.tracert_ui()
-        self.tracert_fun = TracertFun(self.result_box)
+        self.tracert_fun = TracertFun(self.output, store=store)
 
     def tracert_ui(self):
         """tracert界面布局"""
         self.create_targetadd_section()
+        self.create_multitarget_section()
+        self.create_mtr_section()
 
         self.create_output_section()
 # --------------------------------------UI界面布局函数--------------------------------------
@@ -28,13 +35,67 @@ class TracertTab(ttk.Frame, BasicUI):
         self.but_tracert_start = self.add_button(frame, "开始追踪", row=0, col=1, width=8, command=self.tracert_start_callback)
         self.but_tracert_stop = self.add_button(frame, "停止追踪", row=0, col=2, width=8, command=self.tracert_stop_callback)
 
+    def create_multitarget_section(self):
+        # 区域标签
+        frame = ttk.LabelFrame(self, text="多目标追踪（支持 10.0.0.0/28、10.0.0.1-10.0.0.20、主机名，逗号分隔；共用的路径只探测一次）")
+        frame.pack(side='top', fill='x', padx=10, pady=5)
+
+        self.entry_tracert_multi = self.add_input(frame, "目标列表", row=0, col=0, entry_width=40, inivar="202.89.233.100, 223.5.5.5, 114.114.114.114")
+        self.but_tracert_multi = self.add_button(frame, "开始追踪", row=0, col=1, width=8, command=self.tracert_multi_callback)
+        self.but_tracert_multi_stop = self.add_button(frame, "停止追踪", row=0, col=2, width=8, command=self.tracert_stop_callback)
+
+    def create_mtr_section(self):
+        # 区域标签
+        frame = ttk.LabelFrame(self, text="持续监测（MTR：按固定间隔逐跳探测，表格原地刷新每跳的丢包与延迟）")
+        frame.pack(side='top', fill='x', padx=10, pady=5)
+
+        self.entry_mtr_add = self.add_input(frame, "目标地址", row=0, col=0, entry_width=40, inivar="202.89.233.100")
+        self.combo_mtr_interval = self.add_combobox(frame, "间隔(秒)", row=0, col=1, listbox=["0.5", "1", "2", "5"],
+                                                    inivar=1, width=5, label_width=8)
+        self.but_mtr_start = self.add_button(frame, "开始监测", row=0, col=2, width=8, command=self.mtr_start_callback)
+        self.but_mtr_stop = self.add_button(frame, "停止监测", row=0, col=3, width=8, command=self.tracert_stop_callback)
+
+        columns = (("hop", "跳数", 50), ("address", "地址", 200), ("loss", "丢包率%", 80), ("sent", "发送", 60),
+                   ("last", "最近", 80), ("avg", "平均", 80), ("best", "最好", 80), ("worst", "最差", 80),
+                   ("stddev", "标准差", 80))
+        table_frame = ttk.Frame(frame)
+        table_frame.grid(row=1, column=0, columnspan=4, sticky='we', padx=5, pady=(0, 5))
+        self.mtr_table = ttk.Treeview(table_frame, columns=[c[0] for c in columns], show='headings', height=8)
+        for key, text, width in columns:
+            self.mtr_table.heading(key, text=text)
+            self.mtr_table.column(key, width=width, anchor='w' if key == "address" else 'e', stretch=key == "address")
+        scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.mtr_table.yview)
+        self.mtr_table.configure(yscrollcommand=scrollbar.set)
+        self.mtr_table.pack(side='left', fill='x', expand=True)
+        scrollbar.pack(side='right', fill='y')
+        # 跳数 -> 表格行，每轮只更新行的值，不重建表格
+        self.mtr_items = {}
+
     def create_output_section(self):
         # 区域标签
         frame = ttk.LabelFrame(self, text="结果输出")
         frame.pack(side='top', fill='x', padx=10, pady=5)
 
-        self.result_box = scrolledtext.ScrolledText(frame, width=100, height=25)
-        self.result_box.pack(pady=10)
+        self.result_box = scrolledtext.ScrolledText(frame, width=100, height=14)
+        self.result_box.pack(pady=(10, 0))
+
+        # 状态栏：日志位置 / 翻页按钮
+        bar = ttk.Frame(frame)
+        bar.pack(fill='x', pady=(2, 4))
+        self.log_status_var = tk.StringVar()
+        ttk.Label(bar, textvariable=self.log_status_var, anchor='w').pack(side='left')
+        ttk.Button(bar, text="导出结果", width=8, command=self.btn_export).pack(side='right', padx=(5, 0))
+        ttk.Button(bar, text="最新", width=5, command=lambda: self.log_view.follow()).pack(side='right')
+        ttk.Button(bar, text="下一页", width=6, command=lambda: self.log_view.page_forward()).pack(side='right')
+        ttk.Button(bar, text="上一页", width=6, command=lambda: self.log_view.page_back()).pack(side='right')
+
+        # 文本框只保留最近 2000 行，更早的输出写入日志文件并可翻页查看
+        self.log_view = BoundedLogView(self.result_box, os.path.join(get_base_dir(), 'logs', 'tracert_output.log'),
+                                       max_lines=2000, status_var=self.log_status_var)
+        self.progress_var = tk.StringVar()
+        ttk.Label(bar, textvariable=self.progress_var, anchor='w').pack(side='left', padx=(10, 0))
+        self.output = OutputPipe(self.result_box, progress_var=self.progress_var, view=self.log_view,
+                                 on_event=self.on_tracert_event)
 # --------------------------------------按钮回调函数--------------------------------------
     def tracert_start_callback(self):
         """开始追踪按钮回调"""
@@ -44,10 +105,58 @@ class TracertTab(ttk.Frame, BasicUI):
             return
         self.tracert_fun.start_tracert(target)
 
+    def tracert_multi_callback(self):
+        """多目标追踪按钮回调"""
+        targets = self.entry_tracert_multi['var'].get().strip()
+        if not targets:
+            messagebox.showwarning("输入错误", "请输入目标地址列表！")
+            return
+        logger.info(f"开始多目标追踪 {targets}")
+        self.tracert_fun.start_multi_tracert(targets)
+
+    def mtr_start_callback(self):
+        """开始持续监测按钮回调"""
+        target = self.entry_mtr_add['var'].get().strip()
+        if not target:
+            messagebox.showwarning("输入错误", "请输入目标地址！")
+            return
+        interval = float(self.combo_mtr_interval['var'].get())
+        if self.tracert_fun.start_mtr(target, interval=interval):
+            logger.info(f"开始持续监测 {target}，间隔 {interval} 秒")
+            self.mtr_table.delete(*self.mtr_table.get_children())
+            self.mtr_items.clear()
+
     def tracert_stop_callback(self):
         """停止追踪按钮回调"""
         self.tracert_fun.stop_tracert()
 
+    def btn_export(self):
+        """导出最近一次追踪的结果"""
+        self.export_job(self.store, self.tracert_fun.job_id, self.output)
+
+    def on_tracert_event(self, event):
+        """主线程中接收功能类事件：持续监测的每轮统计原地刷新到表格"""
+        if event["type"] == "mtr" or (event["type"] == "done" and event.get("task") == "mtr"):
+            self.update_mtr_table(event["hops"])
+
+    def update_mtr_table(self, rows):
+        """按跳数更新表格行，新出现的跳追加，已不在路径上的跳删除"""
+        def ms(value):
+            return "" if value is None else f"{value:.1f}"
+
+        seen = set()
+        for row in rows:
+            hop = row["hop"]
+            seen.add(hop)
+            values = (hop, row["address"] or "???", f"{row['loss']:.1f}", row["sent"], ms(row["last"]),
+                      ms(row["avg"]), ms(row["best"]), ms(row["worst"]), ms(row["stddev"]))
+            if hop in self.mtr_items:
+                self.mtr_table.item(self.mtr_items[hop], values=values)
+            else:
+                self.mtr_items[hop] = self.mtr_table.insert('', 'end', values=values)
+        for hop in [hop for hop in self.mtr_items if hop not in seen]:
+            self.mtr_table.delete(self.mtr_items.pop(hop))
+
 
 
 
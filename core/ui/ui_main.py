@@ -1,3 +1,4 @@
+import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
@@ -6,6 +7,9 @@ from core.ui.tab_ping import PingTab
 from core.ui.tab_telnet import TelnetTab
 from core.ui.tab_network import NetworkTab
 from core.ui.tab_tracert import TracertTab
+from core.Function.rate_budget import shared_budget
+from core.Function.result_store import ResultStore
+from core.logger_config import get_base_dir
 
 import logging
 logger = logging.getLogger(__name__)
@@ -14,18 +18,91 @@ class MainUI(BasicUI):
     def __init__(self, root):
         self.root = root
         self.root.title("Network tools")   # 窗口标题
-        self.root.geometry("800x500")  # 窗口大小
+        self.root.geometry("800x525")  # 窗口大小
         root.resizable(False, False)    # 禁止水平和垂直调整大小
+        # 底部状态栏：各工具共用的发包预算（当前速率 / 在途数 / 限速设置）
+        self.budget = shared_budget()
+        self.create_status_bar()
         # 创建 Notebook 作为多标签页容器
         self.tab_control = ttk.Notebook(root)
         self.tab_control.pack(expand=1, fill="both")
+        # 各功能页共用的结果库（SQLite，WAL 模式），扫描 / 批量 Ping / 路由追踪的结果追加写入
+        self.store = ResultStore(os.path.join(get_base_dir(), "results.db"))
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         # 实例化各个功能页
         self.tabs = {
             "网卡设置": NetworkTab(self.tab_control),
-            "Ping测试": PingTab(self.tab_control),
-            "端口扫描": TelnetTab(self.tab_control),
-            "路由追踪": TracertTab(self.tab_control),
+            "Ping测试": PingTab(self.tab_control, store=self.store),
+            "端口扫描": TelnetTab(self.tab_control, store=self.store),
+            "路由追踪": TracertTab(self.tab_control, store=self.store),
         }
         # 添加到 Notebook
         for name, tab in self.tabs.items():
-            self.tab_control.add(tab, text=name)
\ No newline at end of file
+            self.tab_control.add(tab, text=name)
+
+    def create_status_bar(self):
+        status_frame = ttk.Frame(self.root)
+        status_frame.pack(side="bottom", fill="x")
+        self.budget_var = tk.StringVar()
+        ttk.Label(status_frame, textvariable=self.budget_var, anchor='w').pack(side="left", padx=5)
+        ttk.Button(status_frame, text="限速", command=self.open_budget_dialog, width=5).pack(side="right", padx=5)
+        self.update_budget_status()
+
+    @staticmethod
+    def _limit_text(value, unit=""):
+        return f"{value:g}{unit}" if value else "不限"
+
+    def update_budget_status(self):
+        """每秒刷新一次状态栏"""
+        snap = self.budget.snapshot()
+        conf = snap["configured"]
+        self.budget_var.set(
+            f"发包速率: {snap['rate']}/s  在途: {snap['inflight']}  |  "
+            f"上限 {self._limit_text(conf['rate'], '/s')}，在途 {self._limit_text(conf['inflight'])}；"
+            f"每网段 {self._limit_text(conf['subnet_rate'], '/s')}，在途 {self._limit_text(conf['subnet_inflight'])}")
+        self.root.after(1000, self.update_budget_status)
+
+    def open_budget_dialog(self):
+        """限速设置：0 表示不限，运行中的任务立即按新设置发包"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("发包限速")
+        dialog.resizable(False, False)
+        dialog.transient(self.root)
+        conf = self.budget.configured
+        fields = [
+            ("rate", "每秒探测", float),
+            ("inflight", "在途上限", int),
+            ("subnet_rate", "每网段/秒", float),
+            ("subnet_inflight", "每网段在途", int),
+        ]
+        inputs = {}
+        for row, (key, label, _) in enumerate(fields):
+            inputs[key] = self.add_input(dialog, label, row=row, inivar=f"{conf[key]:g}", label_width=10,
+                                         entry_width=10)
+        ttk.Label(dialog, text="0 表示不限；每网段按 IPv4 /24、IPv6 /64 计算").grid(row=len(fields), column=0, padx=5)
+
+        def apply():
+            values = {}
+            for key, label, kind in fields:
+                try:
+                    values[key] = kind(inputs[key]["var"].get().strip() or 0)
+                except ValueError:
+                    messagebox.showerror("输入错误", f"{label} 必须为数字", parent=dialog)
+                    return
+                if values[key] < 0:
+                    messagebox.showerror("输入错误", f"{label} 不能为负数", parent=dialog)
+                    return
+            self.budget.configure(**values)
+            dialog.destroy()
+
+        self.add_button(dialog, "确定", row=len(fields) + 1, command=apply, sticky='e')
+
+    def on_close(self):
+        """关闭窗口：为运行中的扫描 / 批量 Ping 写检查点（下次可继续），写完结果库中剩余的结果再退出"""
+        try:
+            self.tabs["端口扫描"].telnet_fun.checkpoint()
+            self.tabs["Ping测试"].ping_fun.checkpoint()
+            self.store.close()
+        except Exception as e:
+            logger.error(f"关闭结果库失败: {e}")
+        self.root.destroy()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 与 bench.run 相同：从仓库根目录导入 core / bench
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
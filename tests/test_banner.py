@@ -0,0 +1,119 @@
+import socket
+import threading
+import time
+
+from bench.farm import ServiceFarm
+from core.Function import banner as banner_module
+from core.Function.banner import BannerGrabber
+from core.Function.events import EventSink
+from core.Function.result_store import ResultStore
+from core.Function.telnet_fun import PortScanner
+
+
+def _grab_all(grabber, targets):
+    """targets: [(host, port)]，重新连接后识别，返回 {(host, port, 序号): (service, banner)}"""
+    results = {}
+    lock = threading.Lock()
+    for index, (host, port) in enumerate(targets):
+        def callback(service, text, key=(host, port, index)):
+            with lock:
+                results[key] = (service, text)
+        grabber.submit(host, port, callback)
+    assert grabber.wait(10)
+    return results
+
+
+def test_services_are_identified(monkeypatch):
+    with ServiceFarm(ssh=1, http=1, redis=1, silent=1) as farm:
+        # 模拟的 Redis 不在 6379 端口：按端口提示发送 PING 探测
+        monkeypatch.setitem(banner_module._PORT_HINTS, farm.ports["redis"][0], "redis")
+        grabber = BannerGrabber(concurrency=4, timeout=0.5)
+        targets = [("127.0.0.1", farm.ports[service][0]) for service in ("ssh", "http", "redis", "silent")]
+        results = _grab_all(grabber, targets)
+        grabber.shutdown()
+
+    by_port = {port: result for (_, port, _), result in results.items()}
+    ssh, http, redis, silent = (by_port[port] for _, port in targets)
+    assert ssh == ("ssh", "SSH-2.0-OpenSSH_9.6 stand-in")
+    assert http == ("http", "HTTP/1.0 200 OK; Server: stand-in/1.0")
+    assert redis == ("redis", "+PONG")
+    # 不发言的服务在期限内结束，记为无响应
+    assert silent == (None, "")
+
+
+def test_scan_stores_service_per_result(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"))
+    done = threading.Event()
+    try:
+        with ServiceFarm(ssh=2, http=2, redis=1, silent=1) as farm:
+            scanner = PortScanner(EventSink(on_event=lambda e: e["type"] == "done" and done.set()),
+                                  engine="async", store=store, fingerprint=True)
+            ports = ",".join(str(port) for port in farm.all_ports())
+            assert scanner.start_sweep_scan("127.0.0.1", ports)
+            assert done.wait(15)
+        store.flush(timeout=5)
+        rows = list(store.iter_results(scanner.job_id))
+    finally:
+        store.close()
+
+    stored = {row[2]: row[6] for row in rows}        # port -> service
+    expected = {port: service for service, ports in farm.ports.items() for port in ports}
+    expected = {port: None if service == "silent" else service for port, service in expected.items()}
+    assert stored == expected
+    assert all(row[3] == "open" for row in rows)
+
+
+def test_overflowed_connections_are_reconnected():
+    with ServiceFarm(ssh=1, silent=1) as farm:
+        grabber = BannerGrabber(concurrency=1, timeout=0.5)
+        ssh_port, silent_port = farm.ports["ssh"][0], farm.ports["silent"][0]
+        sockets = [socket.create_connection(("127.0.0.1", silent_port))]
+        sockets += [socket.create_connection(("127.0.0.1", ssh_port)) for _ in range(7)]
+        targets = [("127.0.0.1", silent_port)] + [("127.0.0.1", ssh_port)] * 7
+
+        results = {}
+        lock = threading.Lock()
+        for index, ((host, port), sock) in enumerate(zip(targets, sockets)):
+            def callback(service, text, index=index):
+                with lock:
+                    results[index] = service
+            grabber.submit(host, port, callback, sock=sock)
+        # 唯一的名额被不发言的服务占住：排队达到 concurrency * 4 之后交来的连接立即关闭，轮到时重新连接
+        closed = [sock.fileno() == -1 for sock in sockets]
+        assert grabber.wait(10)
+        grabber.shutdown()
+        for sock in sockets:
+            sock.close()
+
+    assert closed == [False] * 4 + [True] * 4
+    assert results == {0: None, **{index: "ssh" for index in range(1, 8)}}
+
+
+def test_banner_concurrency_is_capped(monkeypatch):
+    running = [0]
+    peak = [0]
+    lock = threading.Lock()
+    fingerprint = banner_module.fingerprint
+
+    def counted(*args, **kwargs):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        try:
+            return fingerprint(*args, **kwargs)
+        finally:
+            with lock:
+                running[0] -= 1
+
+    monkeypatch.setattr(banner_module, "fingerprint", counted)
+    with ServiceFarm(silent=8) as farm:
+        grabber = BannerGrabber(concurrency=2, timeout=0.2)
+        begin = time.perf_counter()
+        results = _grab_all(grabber, [("127.0.0.1", port) for port in farm.ports["silent"]])
+        elapsed = time.perf_counter() - begin
+        grabber.shutdown()
+
+    assert len(results) == 8
+    assert peak[0] == 2
+    # 8 个不发言的服务、每次 2 个：至少 4 轮识别期限
+    assert elapsed >= 4 * 0.2 * 0.9
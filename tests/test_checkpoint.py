@@ -0,0 +1,79 @@
+from core.Function.checkpoint import ScanCursor
+from core.Function.result_store import ResultStore
+
+
+def test_out_of_order_completion_advances_low():
+    cursor = ScanCursor()
+    assert list(cursor.track(range(6))) == list(range(6))
+
+    cursor.complete(2)
+    cursor.complete(1)
+    assert cursor.state() == (0, [1, 2])
+    assert cursor.completed == 2
+
+    cursor.complete(0)
+    assert cursor.state() == (3, [])
+    cursor.complete(5)
+    cursor.complete(3)
+    assert cursor.state() == (4, [5])
+
+
+def test_duplicate_keys_complete_in_issue_order():
+    cursor = ScanCursor()
+    items = [("10.0.0.1", 22), ("10.0.0.2", 22), ("10.0.0.1", 22)]
+    assert list(cursor.track(items)) == items
+
+    cursor.complete(("10.0.0.1", 22))
+    assert cursor.state() == (1, [])
+    cursor.complete(("10.0.0.1", 22))
+    assert cursor.state() == (1, [2])
+    cursor.complete(("10.0.0.2", 22))
+    assert cursor.state() == (3, [])
+    # 没有在途编号的 key 忽略
+    cursor.complete(("10.0.0.1", 22))
+    assert cursor.state() == (3, [])
+
+
+def test_resume_skips_completed_indices():
+    cursor = ScanCursor(3, [1, 5, 6])
+    assert cursor.state() == (3, [5, 6])
+    assert list(cursor.track(range(3, 10))) == [3, 4, 7, 8, 9]
+
+
+def test_reopen_job_resumes_from_checkpoint_without_duplicates(tmp_path):
+    targets = [f"10.0.0.{i}" for i in range(10)]
+    store = ResultStore(str(tmp_path / "results.db"), flush_interval=0.01)
+    try:
+        job = store.begin_job("batch_ping", "10.0.0.0-10.0.0.9", {"targets": "10.0.0.0-10.0.0.9"})
+        cursor = ScanCursor()
+        issued = cursor.track(iter(targets))
+        probed = [next(issued) for _ in range(6)]
+        # 乱序完成 0, 1, 2, 4：检查点为 (3, [4])
+        for ip in (probed[0], probed[1], probed[2], probed[4]):
+            store.add(job, ip, 0, "alive")
+            cursor.complete(ip)
+        store.checkpoint(job, *cursor.state())
+        # 检查点之后写入的结果（随后中断）：续扫时删除并重新探测
+        store.add(job, probed[5], 0, "alive")
+        store.finish_job(job, "stopped")
+
+        assert store.resumable_job("batch_ping") == job
+        info = store.job_info(job)
+        assert (info["cursor"], info["done"]) == (3, [4])
+        store.reopen_job(job)
+        assert store.job_info(job)["status"] == "running"
+
+        resumed = ScanCursor(info["cursor"], info["done"])
+        again = list(resumed.track(iter(targets[resumed.low:])))
+        for ip in again:
+            store.add(job, ip, 0, "alive")
+            resumed.complete(ip)
+        store.finish_job(job, "done")
+        store.flush(timeout=5)
+        hosts = [row[1] for row in store.iter_results(job)]
+    finally:
+        store.close()
+
+    assert again == [ip for i, ip in enumerate(targets) if i >= 3 and i != 4]
+    assert sorted(hosts) == sorted(targets)
+    assert resumed.state() == (10, [])
@@ -0,0 +1,48 @@
+import socket
+
+import pytest
+
+from core.Function.icmp_engine import IcmpPinger
+
+
+def _ipv6_available():
+    try:
+        sock, _ = IcmpPinger._open_socket(socket.AF_INET6)
+    except OSError:
+        return False
+    sock.close()
+    return True
+
+
+pytestmark = pytest.mark.skipif(not IcmpPinger.available(), reason="ICMP 套接字不可用")
+
+
+@pytest.mark.skipif(not _ipv6_available(), reason="ICMPv6 套接字不可用")
+def test_sweep_answers_ipv4_and_ipv6_targets():
+    results = {}
+    IcmpPinger(timeout=1.0).sweep(["127.0.0.1", "::1", "0:0:0:0:0:0:0:1"],
+                                  lambda ip, rtt: results.setdefault(ip, rtt))
+
+    assert set(results) == {"127.0.0.1", "::1", "0:0:0:0:0:0:0:1"}
+    assert all(rtt is not None for rtt in results.values())
+
+
+def test_unsupported_family_is_skipped_not_dead():
+    results, skipped = [], []
+    pinger = IcmpPinger(timeout=1.0)
+    pinger.open(ipv6=False)
+    try:
+        pinger.sweep(["::1", "127.0.0.1"], lambda ip, rtt: results.append((ip, rtt)), on_skipped=skipped.append)
+    finally:
+        pinger.close()
+
+    assert skipped == ["::1"]
+    assert [ip for ip, _ in results] == ["127.0.0.1"]
+
+
+def test_open_fails_before_sending_on_bad_local_ip():
+    pinger = IcmpPinger(local_ip="192.0.2.77")
+    with pytest.raises(OSError):
+        pinger.open()
+    # 打开失败后不保留半打开的套接字
+    assert pinger._socks == {}
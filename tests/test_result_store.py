@@ -0,0 +1,42 @@
+from core.Function import result_store
+from core.Function.result_store import ResultStore
+
+
+def _scan(store, states):
+    job = store.begin_job("scan", "10.0.0.1 22,80,443")
+    for port, state in states.items():
+        store.add(job, "10.0.0.1", port, state)
+    store.finish_job(job, "done")
+    store.flush(timeout=5)
+    return job
+
+
+def test_diff_follows_recorded_changes(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"))
+    try:
+        first = _scan(store, {22: "open", 80: "closed"})
+        second = _scan(store, {22: "open", 80: "open", 443: "open"})
+        assert store.previous_job(second) == first
+        diff = store.diff(first, second)
+    finally:
+        store.close()
+    assert diff["new"] == [{"host": "10.0.0.1", "port": 443, "state": "open"}]
+    assert diff["changed"] == [{"host": "10.0.0.1", "port": 80, "old": "closed", "new": "open"}]
+
+
+def test_failed_change_recording_still_finishes_job(tmp_path, monkeypatch, caplog):
+    store = ResultStore(str(tmp_path / "results.db"))
+    try:
+        first = _scan(store, {22: "open", 80: "closed"})
+        monkeypatch.setattr(result_store, "_RECORD_CHANGES", "INSERT INTO no_such_table VALUES (:job, :base)")
+        second = _scan(store, {22: "open", 80: "open"})
+        info = store.job_info(second)
+        rows = list(store.iter_results(second))
+        diff = store.diff(first, second)
+    finally:
+        store.close()
+    # 结果行照常写入，任务登记为完成；没有基线与变化记录，diff 逐行比较仍然正确
+    assert info["status"] == "done"
+    assert len(rows) == 2
+    assert diff["changed"] == [{"host": "10.0.0.1", "port": 80, "old": "closed", "new": "open"}]
+    assert f"任务 {second}" in caplog.text
@@ -0,0 +1,82 @@
+import concurrent.futures
+import sys
+import threading
+
+import pytest
+
+from bench.farm import LoopbackFarm
+from core.Function.events import EventSink
+from core.Function.task_window import bounded_map
+from core.Function.telnet_fun import PortScanner
+
+
+class _ImmediateExecutor:
+    """bounded_map 用的替身：submit 时立即完成，记录每次提交时的在途数（已提交、尚未产出）"""
+
+    def __init__(self):
+        self.submitted = 0
+        self.yielded = 0
+        self.in_flight_at_submit = []
+
+    def submit(self, fn, *args):
+        self.in_flight_at_submit.append(self.submitted - self.yielded)
+        self.submitted += 1
+        future = concurrent.futures.Future()
+        future.set_result(args[0])
+        return future
+
+
+def test_bounded_map_rereads_callable_window():
+    executor = _ImmediateExecutor()
+    window = [8]
+    results = bounded_map(executor, None, range(100), window=lambda: window[0])
+
+    next(results)
+    executor.yielded += 1
+    assert executor.submitted == 8
+
+    # 窗口缩小到 3：在途数降到 3 以下之前不再提交，之后也不超过 3
+    window[0] = 3
+    before = executor.submitted
+    for _ in range(20):
+        next(results)
+        executor.yielded += 1
+    assert executor.in_flight_at_submit[before] == 2
+    assert max(executor.in_flight_at_submit[before:]) <= 2
+    assert len(list(results)) + 21 == 100
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="黑洞端口依赖 Linux 丢弃 SYN 的行为")
+def test_thread_engine_backs_off_on_filtered_target():
+    """全部被过滤的目标：超时突增后 pacer 窗口下降，thread 引擎的在途 connect 数随之下降"""
+    with LoopbackFarm(0, 0, 150) as farm:
+        done = threading.Event()
+        scanner = PortScanner(EventSink(on_event=lambda e: e["type"] == "done" and done.set()), engine="thread")
+        lock = threading.Lock()
+        running = [0]
+        samples = []        # (开始时 pacer 窗口, 开始后在运行的 connect 数)
+        scan_one = scanner._scan_single_port
+
+        def counted(ip, port, timeout):
+            with lock:
+                running[0] += 1
+                samples.append((scanner._pacer.window, running[0]))
+            try:
+                return scan_one(ip, port, timeout)
+            finally:
+                with lock:
+                    running[0] -= 1
+
+        scanner._scan_single_port = counted
+        assert scanner.start_list_scan("127.0.0.1", farm.blackholed, max_workers=64)
+        assert done.wait(30)
+
+    start_window = samples[0][0]
+    assert start_window == 64
+    assert max(count for _, count in samples) == 64
+    reduced = [(window, count) for window, count in samples if window < start_window]
+    assert reduced, "超时突增后 pacer 窗口应当下降"
+    # 下降前已提交的 connect 可能稍后才开始；之后开始的 connect 同时运行的数量不超过当时的窗口
+    # （窗口没有新的超时突增时会逐个回升，所以与每次采样时的窗口比较）
+    assert max(count for _, count in reduced) < start_window
+    assert all(count <= window for window, count in reduced[-20:])
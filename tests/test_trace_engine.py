@@ -0,0 +1,60 @@
+import time
+
+from core.Function.trace_engine import MultiTracer, ParallelTracer, SimulatedTopology
+
+# 远处的跳往返时间更短：应答乱序到达，输出仍须按跳数排列
+HOPS = [("10.0.0.1", 0.030), ("10.0.1.1", 0.020), ("10.0.2.1", 0.010), ("10.0.3.1", 0.005)]
+
+
+def test_hops_are_reported_in_order():
+    reported = []
+    tracer = ParallelTracer(SimulatedTopology(HOPS, dest_rtt=0.004), max_hops=10, probes=2, timeout=1.0)
+    path = tracer.trace("192.0.2.9", on_hop=reported.append)
+
+    assert [hop["hop"] for hop in reported] == [1, 2, 3, 4, 5]
+    assert reported == path
+    assert [hop["address"] for hop in path] == [address for address, _ in HOPS] + ["192.0.2.9"]
+    assert all(rtt is not None for hop in path for rtt in hop["rtts_ms"])
+
+
+def test_silent_hop_does_not_wait_for_timeout():
+    hops = [("10.0.0.1", 0.005), (None, 0), ("10.0.2.1", 0.010)]
+    tracer = ParallelTracer(SimulatedTopology(hops, dest_rtt=0.012), max_hops=10, probes=3, timeout=2.0)
+    started = time.perf_counter()
+    path = tracer.trace("192.0.2.9")
+    elapsed = time.perf_counter() - started
+
+    assert [hop["address"] for hop in path] == ["10.0.0.1", None, "10.0.2.1", "192.0.2.9"]
+    assert path[1]["rtts_ms"] == [None, None, None]
+    assert not path[1]["reached"]
+    assert elapsed < 1.0
+
+
+def test_trace_stops_at_destination():
+    tracer = ParallelTracer(SimulatedTopology(HOPS[:2], dest_rtt=0.008), max_hops=20, probes=1, timeout=2.0)
+    path = tracer.trace("192.0.2.9")
+
+    assert len(path) == 3
+    assert path[-1] == {"hop": 3, "address": "192.0.2.9", "rtts_ms": path[-1]["rtts_ms"], "reached": True}
+    assert not any(hop["reached"] for hop in path[:-1])
+
+
+def test_multi_tracer_probes_shared_prefix_once():
+    trunk = [("10.0.0.1", 0.002), ("10.0.1.1", 0.003), ("10.0.2.1", 0.004), ("10.0.3.1", 0.005)]
+    routes = {f"192.0.2.{i}": (trunk + [(f"10.1.{i}.1", 0.006)], 0.007) for i in range(1, 6)}
+    dests = list(routes)
+
+    separate = 0
+    expected = {}
+    for dest in dests:
+        tracer = ParallelTracer(SimulatedTopology(trunk, routes=routes), max_hops=12, probes=2, timeout=1.0)
+        expected[dest] = [hop["address"] for hop in tracer.trace(dest)]
+        separate += tracer.sent
+
+    multi = MultiTracer(lambda: SimulatedTopology(trunk, routes=routes), max_hops=12, probes=2, timeout=1.0,
+                        concurrency=4)
+    paths = multi.trace_all(dests)
+
+    assert {dest: [hop["address"] for hop in path] for dest, path in paths.items()} == expected
+    assert multi.cached_hops > 0
+    assert multi.sent < separate